@@ -325,6 +325,11 @@ CREATE TABLE "ai_player" (
 	"remaining_ticks_long" INTEGER NOT NULL
 );
 
+CREATE TABLE "ai_player_pending_settlement_manager" (
+	"player" INTEGER NOT NULL,
+	"settlement_manager" INTEGER NOT NULL
+);
+
 CREATE TABLE "ai_pirate" (
 	"remaining_ticks" INTEGER NOT NULL DEFAULT 1,
 	"remaining_ticks_long" INTEGER NOT NULL
@@ -486,6 +491,11 @@ CREATE TABLE "ai_village_builder_plan" (
 	"seq_no" INT
 );
 
+CREATE TABLE "ai_village_builder_pending_plan" (
+	"village_builder" INT NOT NULL,
+	"remaining_ticks" INT NOT NULL
+);
+
 CREATE TABLE "building_collector" (
 	"home_building" INT,
 	"creation_tick" INT NOT NULL
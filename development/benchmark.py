@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+"""Headless benchmark of the game simulation.
+
+Every benchmark case runs an AI game in a SPTestSession (no engine, no gui) for a fixed amount
+of ticks, each one in a separate process. Reported are ticks per second, peak memory usage,
+the time spent in the subsystems of the game, the time needed to save and load the game at
+the end and the checkup hash of the world (which has to stay the same as long as the game
+logic isn't changed on purpose).
+
+Usage (from the uh root dir or the development dir):
+	python development/benchmark.py -o new.json
+	python development/benchmark.py --seeds 1,2,3 --seconds 1200 random huge
+	python development/benchmark.py -o new.json --compare old.json
+
+	python development/benchmark.py --save tests/game/fixtures/large.sqlite.bz2
+
+With --compare, the exit code is non-zero if a case got slower by more than --threshold
+percent or if its checkup hash changed.
+"""
+
+import hashlib
+import json
+import os
+import os.path
+import subprocess
+import sys
+import tempfile
+import time
+
+from optparse import OptionParser
+
+try:
+	import resource
+except ImportError: # not available on windows
+	resource = None
+
+# make this script work both when started inside development and in the uh root dir
+if not os.path.exists('content'):
+	os.chdir('..')
+assert os.path.exists('content'), 'Content dir not found.'
+sys.path.append('.')
+
+# case name: name of the map generator in horizons.util.random_map
+CASES = {
+	'random': 'generate_map_from_seed',
+	'huge': 'generate_huge_map_from_seed',
+}
+
+# subsystem: module prefixes of the scheduled functions, the first match counts
+# pathfinding and messages have categories of their own in the TickProfiler.
+# The breakdown uses the own time of the sections, so e.g. the pathfinding done in a scheduled
+# callback only counts for pathfinding and the subsystems add up to the tick time.
+SUBSYSTEMS = (
+	('pathfinding', ('horizons.util.pathfinding', )),
+	('production', ('horizons.world.production', 'horizons.component.collectingcomponent')),
+	('collectors', ('horizons.world.units.collectors', )),
+	('ai', ('horizons.ai', )),
+	('units', ('horizons.world.units', )),
+	('buildings', ('horizons.world.building', )),
+)
+
+
+def get_subsystem(profiler, category, name):
+	if category == 'pathfinding':
+		return 'pathfinding'
+	elif category == 'message':
+		return 'messages'
+	elif category in ('tick', 'timer_test'):
+		return None # not part of the breakdown of the scheduler tick
+	module = profiler.modules.get(name, '')
+	for subsystem, prefixes in SUBSYSTEMS:
+		if module.startswith(prefixes):
+			return subsystem
+	return 'other'
+
+def get_peak_rss():
+	"""Returns the peak resident set size of this process in kB or None if it is unknown."""
+	if resource is None:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == 'darwin': # bytes instead of kB
+		rss //= 1024
+	return rss
+
+def setup_game():
+	"""Prepares running games in this process the same way as the tests do."""
+	import gettext
+	gettext.install('', unicode=True) # no translations here
+
+	import run_tests
+	run_tests.setup_horizons()
+
+	import horizons.globals
+	import horizons.main
+	horizons.globals.db = horizons.main._create_main_db()
+
+def run_case(case, seed, ticks, ai_players):
+	"""Runs one benchmark case in this process.
+	@return: dict with the results"""
+	setup_game()
+
+	from functools import partial
+
+	from horizons.scheduler import Scheduler
+	from horizons.util import random_map
+	from horizons.util.tickprofiler import TickProfiler
+	from tests.game import SPTestSession, load_session, new_session
+
+	mapgen = partial(getattr(random_map, CASES[case]), seed)
+
+	start = time.time()
+	session = new_session(mapgen=mapgen, human_player=False, ai_players=ai_players)[0]
+	load_time = time.time() - start
+
+	TickProfiler.create_instance()
+	start = time.time()
+	session.run(ticks=ticks)
+	run_time = time.time() - start
+	profiler = TickProfiler()
+	TickProfiler.destroy_instance()
+
+	# this consumes a random number, therefore it must not be done while the game is timed
+	checkup_hash = hashlib.md5(repr(session.world.get_checkup_hash())).hexdigest()
+	settlements = len(session.world.settlements)
+
+	subsystems = {}
+	for (category, name), (calls, seconds, work, own_seconds) in profiler.totals.iteritems():
+		subsystem = get_subsystem(profiler, category, name)
+		if subsystem is not None:
+			subsystems[subsystem] = subsystems.get(subsystem, 0.0) + own_seconds
+	tick_time = profiler.totals[('tick', 'tick')][1]
+
+	fd, filename = tempfile.mkstemp()
+	os.close(fd)
+	start = time.time()
+	assert session.save(savegamename=filename)
+	save_time = time.time() - start
+	session.end(keep_map=True)
+
+	start = time.time()
+	session = load_session(filename)
+	Scheduler().before_ticking()
+	saved_game_load_time = time.time() - start
+	session.end()
+	SPTestSession.cleanup()
+
+	return {
+		'case': case,
+		'seed': seed,
+		'ai_players': ai_players,
+		'ticks': ticks,
+		'ticks_per_second': ticks / run_time,
+		'run_time': run_time,
+		'tick_time': tick_time,
+		'map_load_time': load_time,
+		'save_time': save_time,
+		'load_time': saved_game_load_time,
+		'peak_rss_kb': get_peak_rss(),
+		'subsystems': subsystems,
+		'settlements': settlements,
+		'checkup_hash': checkup_hash,
+	}
+
+def run_save_benchmark(savegame, repeat):
+	"""Loads the savegame and saves it repeatedly, once with the plain DbReader that has
+	been used for saving before and once with the batching SavegameWriter.
+	Prints the fastest save time of each."""
+	setup_game()
+
+	import bz2
+	from tests.game import SPTestSession, load_session
+	import horizons.session
+	from horizons.util.dbreader import DbReader
+	from horizons.util.savegamewriter import SavegameWriter
+
+	print 'Saving %s %d times' % (savegame, repeat)
+	fd, filename = tempfile.mkstemp()
+	os.close(fd)
+	if savegame.endswith('.bz2'):
+		with open(filename, 'wb') as f:
+			f.write(bz2.decompress(open(savegame, 'rb').read()))
+		savegame = filename
+
+	fd, target = tempfile.mkstemp()
+	os.close(fd)
+	session = load_session(savegame)
+	session.run(ticks=1)
+	for writer in (DbReader, SavegameWriter):
+		horizons.session.SavegameWriter = writer # the writer that Session._do_save uses
+		times = []
+		for i in xrange(repeat):
+			start = time.time()
+			assert session.save(savegamename=target)
+			times.append(time.time() - start)
+		print '%-16s %.3fs' % (writer.__name__, min(times))
+	horizons.session.SavegameWriter = SavegameWriter
+	session.end(remove_savegame=False)
+	SPTestSession.cleanup()
+	os.remove(target)
+	os.remove(filename)
+
+def run_case_process(case, seed, ticks, ai_players):
+	"""Runs a benchmark case in a new process, so the processes don't influence each other."""
+	fd, filename = tempfile.mkstemp(suffix='.json')
+	os.close(fd)
+	try:
+		args = [sys.executable, os.path.join('development', 'benchmark.py'), '--run-case',
+		        case, str(seed), str(ticks), str(ai_players), filename]
+		with open(os.devnull, 'w') as dev_null:
+			returncode = subprocess.call(args, stdout=dev_null)
+		if returncode != 0:
+			return {'case': case, 'seed': seed, 'ai_players': ai_players, 'ticks': ticks, 'error': returncode}
+		with open(filename) as f:
+			return json.load(f)
+	finally:
+		os.remove(filename)
+
+def get_revision():
+	try:
+		return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def show_result(result):
+	if 'error' in result:
+		print '%-8s seed %3d: failed with exit code %d' % (result['case'], result['seed'], result['error'])
+		return
+	print '%-8s seed %3d: %8.1f ticks/s  %7s kB  save %.2fs  load %.2fs  hash %s' % (
+		result['case'], result['seed'], result['ticks_per_second'], result['peak_rss_kb'],
+		result['save_time'], result['load_time'], result['checkup_hash'])
+	total = result['tick_time'] or 1.0
+	for subsystem, seconds in sorted(result['subsystems'].iteritems(), key=lambda x: -x[1]):
+		print '    %-12s %8.2fs %5.1f%%' % (subsystem, seconds, 100 * seconds / total)
+
+def compare(results, old_results, threshold):
+	"""Prints the differences to the old results.
+	@return: whether there are no regressions"""
+	old = dict(((r['case'], r['seed'], r['ai_players'], r['ticks']), r) for r in old_results)
+	ok = True
+	print
+	for result in results:
+		key = (result['case'], result['seed'], result['ai_players'], result['ticks'])
+		if key not in old or 'error' in old[key]:
+			continue
+		old_result = old[key]
+		if 'error' in result:
+			ok = False
+			continue
+		change = 100.0 * (result['ticks_per_second'] / old_result['ticks_per_second'] - 1)
+		problems = []
+		if change < -threshold:
+			problems.append('SLOWER')
+		if result['checkup_hash'] != old_result['checkup_hash']:
+			problems.append('HASH CHANGED')
+		print '%-8s seed %3d: %+6.1f%% ticks/s %s' % (result['case'], result['seed'], change, ' '.join(problems))
+		ok = ok and not problems
+	return ok
+
+def main():
+	parser = OptionParser(usage='%prog [options] [case ...]\ncases: ' + ', '.join(sorted(CASES)))
+	parser.add_option('--seeds', dest='seeds', default='1',
+	    help='Comma separated list of map seeds to run every case with.')
+	parser.add_option('--seconds', dest='seconds', type='int', default=600,
+	    help='Ingame seconds to run each game for.')
+	parser.add_option('--ai-players', dest='ai_players', type='int', default=2,
+	    help='Number of AI players.')
+	parser.add_option('-o', '--output', dest='output', metavar='<filename>',
+	    help='Write the results to <filename> as json.')
+	parser.add_option('--compare', dest='compare', metavar='<filename>',
+	    help='Compare the results to the results in <filename>.')
+	parser.add_option('--threshold', dest='threshold', type='float', default=10.0,
+	    help='Percentage of ticks/s that a case may be slower than before when comparing.')
+	parser.add_option('--save', dest='save', metavar='<savegame>',
+	    help='Benchmark saving the given savegame (can be bz2 compressed) instead of running games, '
+	         'e.g. tests/game/fixtures/large.sqlite.bz2')
+	parser.add_option('--repeat', dest='repeat', type='int', default=5,
+	    help='Number of times to save the game with --save.')
+	parser.add_option('--run-case', dest='run_case', action='store_true', default=False,
+	    help='Internal: run a single case in this process.')
+	(options, args) = parser.parse_args()
+
+	if options.run_case:
+		case, seed, ticks, ai_players, filename = args
+		result = run_case(case, int(seed), int(ticks), int(ai_players))
+		with open(filename, 'w') as f:
+			json.dump(result, f)
+		return 0
+
+	if options.save:
+		run_save_benchmark(options.save, options.repeat)
+		return 0
+
+	cases = args or sorted(CASES)
+	for case in cases:
+		if case not in CASES:
+			parser.error('unknown case: %s' % case)
+
+	from horizons.constants import GAME_SPEED
+	ticks = options.seconds * GAME_SPEED.TICKS_PER_SECOND
+
+	results = []
+	for case in cases:
+		for seed in options.seeds.split(','):
+			result = run_case_process(case, int(seed), ticks, options.ai_players)
+			show_result(result)
+			results.append(result)
+
+	if options.output:
+		data = {
+			'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+			'revision': get_revision(),
+			'python': sys.version,
+			'platform': sys.platform,
+			'results': results,
+		}
+		with open(options.output, 'w') as f:
+			json.dump(data, f, indent=1, sort_keys=True)
+
+	ok = all('error' not in result for result in results)
+	if options.compare:
+		with open(options.compare) as f:
+			ok = compare(results, json.load(f)['results'], options.threshold) and ok
+	return 0 if ok else 1
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+
+"""
+This script builds the binary snapshot of the game data db
+(see horizons/util/dbsnapshot.py) and prints its path.
+
+The game builds it on demand as well, running this e.g. after
+installing or in a test setup just saves the first start the work.
+Run from uh root dir. Pass --force to rebuild an existing snapshot.
+"""
+
+import os
+import sys
+
+sys.path.append(".")
+
+try:
+	from horizons.constants import PATHS
+	from horizons.util import dbsnapshot
+except ImportError as e:
+	print e.message
+	print 'Please run from uh root dir'
+	sys.exit(1)
+
+path = dbsnapshot.get_snapshot_path(PATHS.DB_FILES)
+if '--force' in sys.argv[1:] and os.path.exists(path):
+	os.remove(path)
+if os.path.exists(path):
+	print 'Snapshot is up to date:', path
+else:
+	dbsnapshot.build_snapshot(PATHS.DB_FILES, path)
+	print 'Built', path
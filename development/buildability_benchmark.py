@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+"""Compares the set and the bit array representation of the buildability caches.
+
+A random island is created and both representations run the same operations on it:
+creating the terrain cache, growing a settlement area in large steps, placing buildings
+(removing a few tiles at a time), intersecting the layers like the AI does and looking
+up single coordinates. The results of both are checked to be equal.
+
+Usage (from the uh root dir or the development dir):
+	python development/buildability_benchmark.py
+	python development/buildability_benchmark.py --size 250 --seed 2
+"""
+
+import os
+import os.path
+import random
+import sys
+import time
+
+from optparse import OptionParser
+
+# make this script work both when started inside development and in the uh root dir
+if not os.path.exists('content'):
+	os.chdir('..')
+assert os.path.exists('content'), 'Content dir not found.'
+sys.path.append('.')
+
+
+class Tile(object):
+	def __init__(self, classes):
+		self.classes = classes
+
+
+class RandomIsland(object):
+	"""Roughly round island of land with a ring of coast and some lakes of coast."""
+
+	def __init__(self, rng, size):
+		from horizons.util.shapes import Rect
+		self.position = Rect.init_from_topleft_and_size(0, 0, size, size)
+		self.ground_map = {}
+		center = size / 2.0
+		for x in xrange(size):
+			for y in xrange(size):
+				distance = ((x - center) ** 2 + (y - center) ** 2) ** 0.5 / center
+				distance += rng.uniform(-0.05, 0.05)
+				if distance < 0.9 and rng.random() > 0.02:
+					self.ground_map[(x, y)] = Tile(('constructible', ))
+				elif distance < 1.0:
+					self.ground_map[(x, y)] = Tile(('coastline', ))
+
+
+def run(name, terrain_class, binary_class, island, rng):
+	"""Runs all operations on one representation.
+	@return: (dict {operation: seconds}, list of results to compare)"""
+	times = {}
+	results = []
+
+	start = time.time()
+	terrain_cache = terrain_class(island)
+	times['create terrain cache'] = time.time() - start
+	land = sorted(terrain_cache.land_or_coast)
+
+	# grow a settlement and the production area inside of it in steps of a few hundred tiles
+	# like warehouses and storages do
+	settlement_area = [(x, y) for (x, y) in land if x < island.position.width * 0.7]
+	production_area = [coords for coords in settlement_area if rng.random() < 0.9]
+	caches = [binary_class(terrain_cache), binary_class(terrain_cache)]
+	start = time.time()
+	for cache, area in zip(caches, [settlement_area, production_area]):
+		for i in xrange(0, len(area), 300):
+			cache.add_area(area[i:i + 300])
+	times['add area'] = time.time() - start
+
+	# place buildings: remove the tiles of small rectangles
+	start = time.time()
+	for x, y in rng.sample(land, 300):
+		for cache in caches:
+			coords_list = [(x + dx, y + dy) for dx in xrange(2) for dy in xrange(2) if (x + dx, y + dy) in cache.coords_set]
+			if coords_list:
+				cache.remove_area(coords_list)
+	times['remove area'] = time.time() - start
+
+	from horizons.world.buildability.terraincache import TerrainRequirement
+	start = time.time()
+	for size in [(2, 2), (3, 3), (2, 4)]:
+		for i in xrange(20):
+			result = terrain_cache.get_buildability_intersection(TerrainRequirement.LAND, size, *caches)
+		results.append(sorted(result))
+	times['intersection'] = time.time() - start
+
+	start = time.time()
+	queries = rng.sample(land, 2000)
+	for cache in caches:
+		for size in [(1, 1), (3, 3)]:
+			layer = cache.cache[size]
+			results.append([coords in layer for coords in queries])
+	times['lookup'] = time.time() - start
+
+	results.extend(sorted(terrain_cache.cache[terrain_type][size]) for terrain_type in sorted(terrain_cache.cache)
+	               for size in sorted(terrain_cache.cache[terrain_type]))
+	return times, results
+
+
+def main():
+	parser = OptionParser(usage="%prog [options]")
+	parser.add_option("--size", dest="size", type="int", default=200, help="width and height of the island")
+	parser.add_option("--seed", dest="seed", type="int", default=1, help="seed of the island generator")
+	(options, args) = parser.parse_args()
+
+	import gettext
+	gettext.install('', unicode=True) # no translations here
+
+	import run_tests
+	run_tests.setup_horizons()
+
+	from horizons.world.buildability.binarycache import BinaryBuildabilityCache
+	from horizons.world.buildability.bitsetcache import BitsetBinaryBuildabilityCache, BitsetTerrainBuildabilityCache
+	from horizons.world.buildability.terraincache import TerrainBuildabilityCache
+
+	island = RandomIsland(random.Random(options.seed), options.size)
+	print 'island: %dx%d, %d tiles' % (options.size, options.size, len(island.ground_map))
+
+	set_times, set_results = run('sets', TerrainBuildabilityCache, BinaryBuildabilityCache, island, random.Random(options.seed))
+	bit_times, bit_results = run('bit arrays', BitsetTerrainBuildabilityCache, BitsetBinaryBuildabilityCache, island, random.Random(options.seed))
+	assert set_results == bit_results, 'the representations have different results'
+
+	print '%-22s %10s %12s' % ('operation', 'sets', 'bit arrays')
+	for operation in sorted(set_times):
+		print '%-22s %9.1fms %11.1fms' % (operation, set_times[operation] * 1000, bit_times[operation] * 1000)
+
+
+if __name__ == '__main__':
+	main()
@@ -81,6 +81,7 @@ from horizons.util.python import decorators
 from horizons.util.python.callback import Callback
 from horizons.util.worldobject import WorldObject
 from horizons.ext.enum import Enum
+from horizons.constants import AI
 from horizons.ai.generic import GenericAI
 from horizons.component.selectablecomponent import SelectableComponent
 
@@ -151,6 +152,8 @@ class AIPlayer(GenericAI):
 		self.behavior_manager = BehaviorManager(self)
 		self.settlement_expansions = []  # [(coords, settlement)]
 		self.goals = [DoNothingGoal(self)]
+		self._pending_settlement_managers = [] # settlement managers that still have to be handled during the current round
+		self._pending_goals = [] # goals collected during the current round, None if they have to be collected again
 		self.special_domestic_trade_manager = SpecialDomesticTradeManager(self)
 		self.international_trade_manager = InternationalTradeManager(self)
 		SettlementRangeChanged.subscribe(self._on_settlement_range_changed)
@@ -174,6 +177,9 @@ class AIPlayer(GenericAI):
 			settlement_manager = SettlementManager(self, mission.land_manager)
 			self.settlement_managers.append(settlement_manager)
 			self._settlement_manager_by_settlement_id[settlement_manager.settlement.worldid] = settlement_manager
+			if self._pending_settlement_managers:
+				# it has to be ticked before the trade managers at the end of the current round
+				self._pending_settlement_managers.append(settlement_manager)
 			self.add_building(settlement_manager.settlement.warehouse)
 			if settlement_manager.feeder_island:
 				self.need_feeder_island = False
@@ -240,6 +246,11 @@ class AIPlayer(GenericAI):
 		# save the behavior manager
 		self.behavior_manager.save(db)
 
+		# save the settlement managers that haven't been handled during the current round
+		for settlement_manager in self._pending_settlement_managers:
+			db("INSERT INTO ai_player_pending_settlement_manager(player, settlement_manager) VALUES(?, ?)",
+				self.worldid, settlement_manager.worldid)
+
 	def _load(self, db, worldid):
 		super(AIPlayer, self)._load(db, worldid)
 		self.personality_manager = PersonalityManager.load(db, self)
@@ -309,13 +320,19 @@ class AIPlayer(GenericAI):
 			for (mission_id,) in db_result:
 				self.missions.add(InternationalTrade.load(db, mission_id, self.report_success, self.report_failure))
 
+		# continue the round of settlement handling that was interrupted by saving
+		db_result = db("SELECT settlement_manager FROM ai_player_pending_settlement_manager WHERE player = ? ORDER BY rowid", self.worldid)
+		if db_result:
+			self._pending_settlement_managers = [WorldObject.get_object_by_id(worldid) for (worldid,) in db_result]
+			self._pending_goals = None # the state of the goals isn't saved
+			Scheduler().add_new_object(Callback(self._continue_handling_settlements), self, run_in=1)
+
 	def tick(self):
 		Scheduler().add_new_object(Callback(self.tick), self, run_in=self.tick_interval)
 		self.settlement_founder.tick()
 		self.handle_enemy_expansions()
-		self.handle_settlements()
-		self.special_domestic_trade_manager.tick()
-		self.international_trade_manager.tick()
+		if not self._pending_settlement_managers:
+			self.handle_settlements() # otherwise the previous round is still in progress
 		self.unit_manager.tick()
 		self.combat_manager.tick()
 
@@ -327,13 +344,62 @@ class AIPlayer(GenericAI):
 		self.strategy_manager.tick()
 
 	def handle_settlements(self):
-		goals = []
+		"""
+		Start a new round of settlement handling.
+
+		The settlement managers are ticked over the next game ticks (see _continue_handling_settlements).
+		Once every one of them has been handled the collected goals are executed and the trade managers ticked.
+		"""
+		self._pending_goals = []
+		self._add_goals(self._pending_goals)
+		self._pending_settlement_managers = list(self.settlement_managers)
+		self._continue_handling_settlements()
+
+	def _add_goals(self, goals):
+		"""Add the player's goals that can be activated to the goals list."""
 		for goal in self.goals:
 			if goal.can_be_activated:
 				goal.update()
 				goals.append(goal)
-		for settlement_manager in self.settlement_managers:
-			settlement_manager.tick(goals)
+
+	def _continue_handling_settlements(self):
+		"""
+		Tick the pending settlement managers until the work budget of this game tick has been used up.
+
+		The work is counted in units (one per settlement manager tick and one per goal update) instead of
+		wall time so that the result is the same on every multiplayer client and after loading a savegame.
+		"""
+		if not self._enabled:
+			return
+
+		if self._pending_goals is None:
+			# collect the goals of the settlements that were handled before the game was saved again
+			self._pending_goals = []
+			self._add_goals(self._pending_goals)
+			for settlement_manager in self.settlement_managers:
+				if settlement_manager not in self._pending_settlement_managers:
+					settlement_manager._add_goals(self._pending_goals)
+
+		work_units = 0
+		while self._pending_settlement_managers:
+			if work_units >= AI.WORK_UNITS_PER_TICK:
+				Scheduler().add_new_object(Callback(self._continue_handling_settlements), self, run_in=1)
+				return
+			settlement_manager = self._pending_settlement_managers.pop(0)
+			num_goals = len(self._pending_goals)
+			settlement_manager.tick(self._pending_goals)
+			work_units += 1 + len(self._pending_goals) - num_goals
+
+		goals = self._pending_goals
+		self._pending_goals = []
+		self._execute_goals(goals)
+
+		# the trade managers rely on the settlement managers' fresh resource requirements
+		self.special_domestic_trade_manager.tick()
+		self.international_trade_manager.tick()
+
+	def _execute_goals(self, goals):
+		"""Execute the most important goals until one of them builds something and refresh the taxes."""
 		goals.sort(reverse=True)
 
 		settlements_blocked = set()  # set([settlement_manager_id, ...])
@@ -486,6 +552,8 @@ class AIPlayer(GenericAI):
 		self.personality_manager = None
 		self.world = None
 		self.islands = None
+		for settlement_manager in self.settlement_managers:
+			settlement_manager.end()
 		self.settlement_managers = None
 		self._settlement_manager_by_settlement_id = None
 		self.missions = None
@@ -497,6 +565,8 @@ class AIPlayer(GenericAI):
 		self.combat_manager = None
 		self.settlement_expansions = None
 		self.goals = None
+		self._pending_settlement_managers = None
+		self._pending_goals = None
 		self.special_domestic_trade_manager = None
 		self.international_trade_manager = None
 		self.strategy_manager.end()
@@ -21,9 +21,9 @@
 
 import copy
 import logging
-from collections import deque
 
 from horizons.ai.aiplayer.basicbuilder import BasicBuilder
+from horizons.ai.aiplayer.roadpenaltymap import RoadPenaltyMap
 from horizons.ai.aiplayer.roadplanner import RoadPlanner
 from horizons.ai.aiplayer.constants import BUILDING_PURPOSE, BUILD_RESULT
 from horizons.constants import BUILDINGS
@@ -49,6 +49,7 @@ class AreaBuilder(WorldObject):
 		self.owner = self.land_manager.owner
 		self.settlement = self.land_manager.settlement
 		self.plan = {} # {(x, y): (purpose, subclass specific data), ...}
+		self.__road_penalty_map = None # created when it is used for the first time
 
 	@classmethod
 	def load(cls, db, settlement_manager):
@@ -60,6 +61,11 @@ class AreaBuilder(WorldObject):
 		self.__init(settlement_manager)
 		super(AreaBuilder, self).load(db, worldid)
 
+	def end(self):
+		if self.__road_penalty_map is not None:
+			self.__road_penalty_map.end()
+			self.__road_penalty_map = None
+
 	def iter_neighbour_tiles(self, rect):
 		"""Iterate over the tiles that share a side with the given Rect."""
 		moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
@@ -81,81 +87,11 @@ class AreaBuilder(WorldObject):
 			if coords in self.land_manager.roads or (coords in self.plan and self.plan[coords][0] == BUILDING_PURPOSE.NONE):
 				yield coords
 
-	@classmethod
-	def __fill_distance(cls, distance, nodes):
-		"""
-		Fill the distance dict with the shortest distance from the starting nodes.
-
-		@param distance: {(x, y): distance, ...}
-		@param nodes: {(x, y): penalty, ...}
-		"""
-
-		moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
-		queue = deque([item for item in distance.iteritems()])
-
-		while queue:
-			(coords, dist) = queue.popleft()
-			for dx, dy in moves:
-				coords2 = (coords[0] + dx, coords[1] + dy)
-				if coords2 in nodes and coords2 not in distance:
-					distance[coords2] = dist + 1
-					queue.append((coords2, dist + 1))
-
 	def get_path_nodes(self):
-		"""Return a dict {(x, y): penalty, ...} of current and possible future road tiles in the settlement."""
-		moves = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-
-		nodes = {} # {(x, y): penalty, ...}
-		distance_to_road = {}
-		distance_to_boundary = {}
-		for coords in self.plan:
-			if coords not in self.settlement.ground_map or coords in self.land_manager.coastline:
-				continue
-			if self.plan[coords][0] == BUILDING_PURPOSE.NONE:
-				nodes[coords] = 1
-			elif self.plan[coords][0] == BUILDING_PURPOSE.ROAD:
-				nodes[coords] = 1
-				distance_to_road[coords] = 0
-
-			for (dx, dy) in moves:
-				coords2 = (coords[0] + dx, coords[1] + dy)
-				if coords2 not in self.land_manager.production:
-					distance_to_boundary[coords] = 1
-					break
-
-		for coords in self.land_manager.village:
-			if coords in self.land_manager.roads and coords in self.settlement.ground_map:
-				nodes[coords] = 1
-				distance_to_road[coords] = 0
-				for (dx, dy) in moves:
-					coords2 = (coords[0] + dx, coords[1] + dy)
-					if coords2 not in self.land_manager.production:
-						distance_to_boundary[coords] = 1
-						break
-
-		self.__fill_distance(distance_to_road, self.island.path_nodes.nodes)
-		self.__fill_distance(distance_to_boundary, self.island.path_nodes.nodes)
-
-		for coords in nodes:
-			if coords in distance_to_road:
-				distance = distance_to_road[coords]
-				if distance > self.personality.path_road_penalty_threshold:
-					nodes[coords] += self.personality.path_distant_road_penalty
-				elif distance > 0:
-					nodes[coords] += self.personality.path_near_road_constant_penalty + \
-						(self.personality.path_road_penalty_threshold - distance + 1) * self.personality.path_near_road_linear_penalty
-			else:
-				nodes[coords] += self.personality.path_unreachable_road_penalty
-
-			if coords in distance_to_boundary:
-				distance = distance_to_boundary[coords]
-				if 1 < distance <= self.personality.path_boundary_penalty_threshold:
-					nodes[coords] += self.personality.path_near_boundary_constant_penalty + \
-						(self.personality.path_boundary_penalty_threshold - distance + 1) * self.personality.path_near_boundary_linear_penalty
-			else:
-				nodes[coords] += self.personality.path_unreachable_boundary_penalty
-
-		return nodes
+		"""Return a dict {(x, y): penalty, ...} of current and possible future road tiles in the settlement. It must not be modified."""
+		if self.__road_penalty_map is None:
+			self.__road_penalty_map = RoadPenaltyMap(self)
+		return self.__road_penalty_map.get()
 
 	def _get_road_to_builder(self, builder):
 		"""Return a path from the builder to a building with general collectors (None if impossible)."""
@@ -264,6 +200,8 @@ class AreaBuilder(WorldObject):
 		for coords in coords_list:
 			if coords in self.plan:
 				del self.plan[coords]
+		self.settlement_manager.evaluator_cache.invalidate_coords_list(coords_list)
+		self.invalidate_road_penalty_map()
 
 	def add_building(self, building):
 		"""Called when a new building is added in the area (the building already exists during the call)."""
@@ -281,12 +219,26 @@ class AreaBuilder(WorldObject):
 		"""Initialise the cache that knows the last time the buildability of a rectangle may have changed in this area."""
 		self.last_change_id = -1
 
+	def replace_plan(self, plan):
+		"""Replace the whole plan, for example with one that has been created in the background."""
+		self.plan = plan
+		self.settlement_manager.evaluator_cache.clear()
+		self.invalidate_road_penalty_map()
+
+	def invalidate_road_penalty_map(self):
+		"""Rebuild the path nodes the next time they are used, for changes that weren't registered tile by tile."""
+		if self.__road_penalty_map is not None:
+			self.__road_penalty_map.invalidate()
+
 	def register_change(self, x, y, purpose, data):
 		"""Register the (potential) change of the purpose of land at the given coordinates."""
 		if (x, y) in self.plan:
 			self.plan[(x, y)] = (purpose, data)
 			if purpose == BUILDING_PURPOSE.ROAD:
 				self.land_manager.roads.add((x, y))
+			self.settlement_manager.evaluator_cache.invalidate(x, y)
+			if self.__road_penalty_map is not None:
+				self.__road_penalty_map.register_change((x, y))
 
 	def register_change_list(self, coords_list, purpose, data):
 		for (x, y) in coords_list:
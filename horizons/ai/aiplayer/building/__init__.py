@@ -170,10 +170,19 @@ class AbstractBuilding(object):
 	def get_evaluators(self, settlement_manager, resource_id):
 		"""Return a list of every BuildingEvaluator for this building type in the given settlement."""
 		options = [] # [BuildingEvaluator, ...]
-		for x, y, orientation in self.iter_potential_locations(settlement_manager):
-			evaluator = self.evaluator_class.create(settlement_manager.production_builder, x, y, orientation)
-			if evaluator is not None:
-				options.append(evaluator)
+		evaluator_class = self.evaluator_class
+		production_builder = settlement_manager.production_builder
+		if evaluator_class.cacheable:
+			evaluator_cache = settlement_manager.evaluator_cache
+			for x, y, orientation in self.iter_potential_locations(settlement_manager):
+				evaluator = evaluator_cache.get(evaluator_class, production_builder, self.id, x, y, orientation)
+				if evaluator is not None:
+					options.append(evaluator)
+		else:
+			for x, y, orientation in self.iter_potential_locations(settlement_manager):
+				evaluator = evaluator_class.create(production_builder, x, y, orientation)
+				if evaluator is not None:
+					options.append(evaluator)
 		return options
 
 	def build(self, settlement_manager, resource_id):
@@ -42,6 +42,8 @@ class AbstractBoatBuilder(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.BOAT_BUILDER] = cls
 
 class BoatBuilderEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
 		builder = BasicBuilder.create(BUILDINGS.BOAT_BUILDER, (x, y), orientation)
@@ -37,6 +37,8 @@ class AbstractBrickyard(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.BRICKYARD] = cls
 
 class BrickyardEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
 		builder = BasicBuilder.create(BUILDINGS.BRICKYARD, (x, y), orientation)
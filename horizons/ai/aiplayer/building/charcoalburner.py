@@ -37,6 +37,8 @@ class AbstractCharcoalBurner(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.CHARCOAL_BURNER] = cls
 
 class CharcoalBurnerEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
 		builder = BasicBuilder.create(BUILDINGS.CHARCOAL_BURNER, (x, y), orientation)
@@ -77,29 +77,43 @@ class FisherEvaluator(BuildingEvaluator):
 		return self.__production_level
 
 	@classmethod
-	def create(cls, area_builder, x, y, orientation):
-		coords = (x, y)
-		rect_rect_distance_func = distances.distance_rect_rect
-		builder = BasicBuilder.create(BUILDINGS.FISHER, coords, orientation)
+	def _get_reachable_fish(cls, area_builder, builder):
+		"""
+		Return [(fish, distance), ...] for the fish deposits in range in the same shallow water body as the fisher.
+		Neither the fish deposits nor the water bodies change so the result is kept in the evaluator cache.
+		"""
+		key = (BUILDINGS.FISHER, builder.position.origin.to_tuple(), builder.orientation)
+		reachable_fish = area_builder.settlement_manager.evaluator_cache.static_data.get(key)
+		if reachable_fish is not None:
+			return reachable_fish
 
+		rect_rect_distance_func = distances.distance_rect_rect
 		shallow_water_body = area_builder.session.world.shallow_water_body
 		fisher_shallow_water_body_ids = set()
 		for fisher_coords in builder.position.tuple_iter():
 			if fisher_coords in shallow_water_body:
 				fisher_shallow_water_body_ids.add(shallow_water_body[fisher_coords])
-		fisher_shallow_water_body_ids = list(fisher_shallow_water_body_ids)
 		assert fisher_shallow_water_body_ids
 
+		reachable_fish = []
+		for fish in area_builder.session.world.fish_indexer.get_buildings_in_range(builder.position.origin.to_tuple()):
+			if shallow_water_body[fish.position.origin.to_tuple()] not in fisher_shallow_water_body_ids:
+				continue # not in the same shallow water body as the fisher => unreachable
+			reachable_fish.append((fish, rect_rect_distance_func(builder.position, fish.position) + 1.0))
+		area_builder.settlement_manager.evaluator_cache.static_data[key] = reachable_fish
+		return reachable_fish
+
+	@classmethod
+	def create(cls, area_builder, x, y, orientation):
+		builder = BasicBuilder.create(BUILDINGS.FISHER, (x, y), orientation)
+
 		tiles_used = 0
 		fish_value = 0.0
 		last_usable_tick = Scheduler().cur_tick - 60 * GAME_SPEED.TICKS_PER_SECOND # TODO: use a direct calculation
-		for fish in area_builder.session.world.fish_indexer.get_buildings_in_range(coords):
-			if shallow_water_body[fish.position.origin.to_tuple()] not in fisher_shallow_water_body_ids:
-				continue # not in the same shallow water body as the fisher => unreachable
+		for fish, distance in cls._get_reachable_fish(area_builder, builder):
 			if fish.last_usage_tick > last_usable_tick:
 				continue # the fish deposit seems to be already in use
 
-			distance = rect_rect_distance_func(builder.position, fish.position) + 1.0
 			if tiles_used >= cls.refill_cycle_in_tiles:
 				fish_value += min(1.0, (3 * cls.refill_cycle_in_tiles - tiles_used) / distance) / 10.0
 			else:
@@ -38,6 +38,8 @@ class AbstractLumberjack(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.LUMBERJACK] = cls
 
 class LumberjackEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	__template_outline = None
 	__radius_offsets = None
 
@@ -37,6 +37,8 @@ class AbstractSaltPonds(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.SALT_PONDS] = cls
 
 class SaltPondsEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
 		builder = BasicBuilder.create(BUILDINGS.SALT_PONDS, (x, y), orientation)
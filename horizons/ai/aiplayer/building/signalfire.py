@@ -49,6 +49,7 @@ class AbstractSignalFire(AbstractBuilding):
 
 class SignalFireEvaluator(BuildingEvaluator):
 	need_collector_connection = False
+	cacheable = True
 
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
@@ -37,6 +37,8 @@ class AbstractSmeltery(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.SMELTERY] = cls
 
 class SmelteryEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
 		builder = BasicBuilder.create(BUILDINGS.SMELTERY, (x, y), orientation)
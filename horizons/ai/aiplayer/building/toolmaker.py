@@ -37,6 +37,8 @@ class AbstractToolmaker(AbstractBuilding):
 		cls._available_buildings[BUILDINGS.TOOLMAKER] = cls
 
 class ToolmakerEvaluator(BuildingEvaluator):
+	cacheable = True
+
 	@classmethod
 	def create(cls, area_builder, x, y, orientation):
 		builder = BasicBuilder.create(BUILDINGS.TOOLMAKER, (x, y), orientation)
@@ -31,6 +31,8 @@ class BuildingEvaluator(object):
 	log = logging.getLogger("ai.aiplayer.buildingevaluator")
 	need_collector_connection = True
 	record_plan_change = True
+	# whether the value only depends on the area in range of the building (see EvaluatorCache)
+	cacheable = False
 
 	__slots__ = ('area_builder', 'builder', 'value')
 
@@ -0,0 +1,129 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+import logging
+
+from horizons.constants import AI
+from horizons.scheduler import Scheduler
+from horizons.util.python import decorators
+
+class DeferredPlan(object):
+	"""
+	Computes an AI plan in a worker process and hands it over at a fixed game tick.
+
+	Creating a plan (e.g. the layout of a new village) can take a long time. Instead of
+	freezing the game, the planner is sent to a worker process and the game continues.
+	The result is handed to the callback exactly AI.PLAN_DELAY_TICKS ticks later, or at
+	the saved tick after loading, so every multiplayer client uses it at the same point.
+	If the worker hasn't finished by then, the game waits for it.
+
+	The planner has to be a picklable callable that only depends on its own data, so
+	it returns the same result no matter where it runs. If no worker process can be
+	used then the plan is computed in the game process when it is needed.
+
+	The worker processes are started with start_pool when a session starts, before the
+	game creates any threads of its own, and stopped with stop_pool when it ends.
+	"""
+
+	log = logging.getLogger("ai.aiplayer.deferredplan")
+
+	_pool = None # the shared multiprocessing.Pool while a session is running
+
+	def __init__(self, planner, callback, run_in=None):
+		"""
+		@param planner: picklable callable that returns the plan
+		@param callback: function that is called with the plan
+		@param run_in: number of ticks until the plan is used, AI.PLAN_DELAY_TICKS by default
+		"""
+		self._planner = planner
+		self._callback = callback
+		self._result = None
+		self._finished = False
+		self._async_result = None
+
+		if self._pool is not None:
+			try:
+				self._async_result = self._pool.apply_async(planner)
+			except Exception:
+				self.log.exception('Unable to send the planner to a worker process')
+		if run_in is None:
+			run_in = AI.PLAN_DELAY_TICKS
+		Scheduler().add_new_object(self._apply, self, run_in=run_in)
+
+	@classmethod
+	def create_finished(cls, result, callback, run_in):
+		"""Return a DeferredPlan whose result is already known (used when loading a game)."""
+		self = cls.__new__(cls)
+		self._planner = None
+		self._callback = callback
+		self._result = result
+		self._finished = True
+		self._async_result = None
+		Scheduler().add_new_object(self._apply, self, run_in=run_in)
+		return self
+
+	@classmethod
+	def start_pool(cls):
+		"""Start the AI.PLAN_WORKER_PROCESSES worker processes if they aren't running yet."""
+		if cls._pool is None and AI.PLAN_WORKER_PROCESSES > 0:
+			try:
+				import multiprocessing
+				cls._pool = multiprocessing.Pool(AI.PLAN_WORKER_PROCESSES)
+			except (ImportError, OSError) as e:
+				cls.log.warning('Unable to start the AI planning processes: %s', e)
+
+	@classmethod
+	def stop_pool(cls):
+		"""Stop the worker processes, the plans that haven't been retrieved are lost."""
+		if cls._pool is not None:
+			cls._pool.terminate()
+			cls._pool.join()
+			cls._pool = None
+
+	def get_result(self):
+		"""Return the plan, waiting for the worker process if it isn't finished yet."""
+		if not self._finished:
+			if self._async_result is not None:
+				try:
+					self._result = self._async_result.get()
+				except Exception:
+					self.log.exception('The worker process failed, creating the plan in the game process')
+					self._result = self._planner()
+				self._async_result = None
+			else:
+				self._result = self._planner()
+			self._planner = None
+			self._finished = True
+		return self._result
+
+	def get_remaining_ticks(self):
+		"""Return the number of ticks until the plan is used."""
+		return Scheduler().get_remaining_ticks(self, self._apply)
+
+	def cancel(self):
+		"""Don't use the plan after all."""
+		Scheduler().rem_all_classinst_calls(self)
+		self._async_result = None
+
+	def _apply(self):
+		self._callback(self.get_result())
+
+decorators.bind_all(DeferredPlan)
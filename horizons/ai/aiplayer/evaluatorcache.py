@@ -0,0 +1,111 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from horizons.entities import Entities
+from horizons.util.python import decorators
+
+class EvaluatorCache(object):
+	"""
+	Remembers the BuildingEvaluator instances (or None) created for the potential
+	locations of buildings in a settlement.
+
+	The value of a cacheable evaluator only depends on the plan, the roads, and the
+	buildings within the radius of the building or right next to it, so an entry stays
+	valid until one of those tiles changes. The entries are kept in buckets of
+	CELL_SIZE x CELL_SIZE tiles to find the ones affected by a change quickly.
+
+	Changes in the size of the settlement's ground map affect the alignment values of
+	every entry along its edge; they are rare enough to simply drop everything.
+
+	static_data is a place for the parts of evaluations that never change (such as the
+	fish deposits a fisher could reach); it is never invalidated.
+	"""
+
+	CELL_SIZE = 8
+
+	def __init__(self, settlement):
+		self.settlement = settlement
+		self.static_data = {}
+		self.clear()
+
+	def clear(self):
+		"""Forget every cached evaluator."""
+		self._entries = {} # {(building_id, x, y, orientation): (evaluator or None, (left, top, right, bottom)), ...}
+		self._cells = {} # {(cell_x, cell_y): set([key, ...]), ...}
+		self._ground_map_size = len(self.settlement.ground_map)
+
+	def get(self, evaluator_class, area_builder, building_id, x, y, orientation):
+		"""
+		Return the evaluator of a building at the given location, creating it if necessary.
+		@param evaluator_class: cacheable BuildingEvaluator subclass
+		@param area_builder: AreaBuilder instance passed to evaluator_class.create
+		@return: BuildingEvaluator instance or None
+		"""
+		if len(self.settlement.ground_map) != self._ground_map_size:
+			self.clear()
+
+		key = (building_id, x, y, orientation)
+		entry = self._entries.get(key)
+		if entry is not None:
+			return entry[0]
+
+		evaluator = evaluator_class.create(area_builder, x, y, orientation)
+
+		# the area that may affect the value: the building's range and its outline
+		building_class = Entities.buildings[building_id]
+		distance = building_class.radius + 1
+		size = max(building_class.size)
+		influence = (x - distance, y - distance, x + size - 1 + distance, y + size - 1 + distance)
+		self._entries[key] = (evaluator, influence)
+
+		cell_size = self.CELL_SIZE
+		for cell_x in xrange(influence[0] // cell_size, influence[2] // cell_size + 1):
+			for cell_y in xrange(influence[1] // cell_size, influence[3] // cell_size + 1):
+				cell = (cell_x, cell_y)
+				if cell not in self._cells:
+					self._cells[cell] = set()
+				self._cells[cell].add(key)
+		return evaluator
+
+	def invalidate(self, x, y):
+		"""Forget the evaluators that may depend on the tile at the given coordinates."""
+		cell_size = self.CELL_SIZE
+		keys = self._cells.get((x // cell_size, y // cell_size))
+		if not keys:
+			return
+
+		removed = []
+		for key in keys:
+			left, top, right, bottom = self._entries[key][1]
+			if left <= x <= right and top <= y <= bottom:
+				removed.append(key)
+
+		for key in removed:
+			left, top, right, bottom = self._entries.pop(key)[1]
+			for cell_x in xrange(left // cell_size, right // cell_size + 1):
+				for cell_y in xrange(top // cell_size, bottom // cell_size + 1):
+					self._cells[(cell_x, cell_y)].discard(key)
+
+	def invalidate_coords_list(self, coords_list):
+		for x, y in coords_list:
+			self.invalidate(x, y)
+
+decorators.bind_all(EvaluatorCache)
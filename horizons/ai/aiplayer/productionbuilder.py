@@ -38,7 +38,7 @@ from horizons.util.python.callback import Callback
 from horizons.util.shapes import distances, Point, Rect
 from horizons.entities import Entities
 from horizons.world.production.producer import Producer
-from horizons.world.buildability.binarycache import BinaryBuildabilityCache
+from horizons.world.buildability.bitsetcache import create_binary_cache
 from horizons.world.buildability.simplecollectorareacache import SimpleCollectorAreaCache
 from horizons.world.buildability.potentialroadconnectivitycache import PotentialRoadConnectivityCache
 from horizons.component.namedcomponent import NamedComponent
@@ -80,7 +80,7 @@ class ProductionBuilder(AreaBuilder):
 		self.last_collector_improvement_road = last_collector_improvement_road
 
 	def _init_buildability_cache(self):
-		self.buildability_cache = BinaryBuildabilityCache(self.island.terrain_cache)
+		self.buildability_cache = create_binary_cache(self.island.terrain_cache)
 		free_coords_set = set()
 		for coords, (purpose, _) in self.plan.iteritems():
 			if purpose == BUILDING_PURPOSE.NONE:
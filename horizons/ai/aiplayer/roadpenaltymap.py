@@ -0,0 +1,200 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from horizons.ai.aiplayer.constants import BUILDING_PURPOSE
+from horizons.ai.aiplayer.roadplanner import PathNodeGrid
+from horizons.util.pathfinding.distancefield import DistanceField
+from horizons.util.python import decorators
+
+class RoadPenaltyMap(object):
+	"""
+	The path nodes of an AreaBuilder for the RoadPlanner: {(x, y): penalty, ...} of the current
+	and possible future road tiles of the area.
+
+	The penalties depend on the distance to the nearest road and to the nearest tile next to the
+	edge of the production area, both measured through the walkable tiles of the island. The two
+	distances are kept in DistanceFields that are updated with the tiles that changed since the
+	last use: the tiles whose purpose changed in the plan, the tiles whose walkability changed
+	on the island and the roads that were added to the village area. Changes of the settlement's
+	area, of the village and production areas and lost land are rare and rebuild everything,
+	they are noticed by the sizes of the areas.
+
+	The returned dict is the map itself, a PathNodeGrid that the RoadPlanner can search directly.
+	It must not be modified.
+	"""
+
+	moves = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+	def __init__(self, area_builder):
+		self.area_builder = area_builder
+		self.land_manager = area_builder.land_manager
+		self.settlement = area_builder.settlement
+		self.personality = area_builder.personality
+		self._island_nodes = area_builder.island.path_nodes.nodes
+		self._dirty_coords = set()
+		self._path_nodes = area_builder.island.path_nodes
+		self._path_nodes.walkability_listeners.append(self._dirty_coords.add)
+		self.invalidate()
+
+	def end(self):
+		self._path_nodes.walkability_listeners.remove(self._dirty_coords.add)
+		self._path_nodes = None
+		self.invalidate()
+
+	def invalidate(self):
+		"""Rebuild the whole map the next time it is used."""
+		self._nodes = None # {(x, y): penalty, ...}
+		self._distance_to_road = None
+		self._distance_to_boundary = None
+		self._area_sizes = None
+		self._roads_size = None
+		self._village_roads = None
+
+	def _get_area_sizes(self):
+		return (len(self.settlement.ground_map), len(self.land_manager.village), len(self.land_manager.production))
+
+	def _get_village_roads(self):
+		village = self.land_manager.village
+		return frozenset(coords for coords in self.land_manager.roads if coords in village)
+
+	def register_change(self, coords):
+		"""Mark the plan tile at the given coordinates as changed."""
+		self._dirty_coords.add(coords)
+
+	def get(self):
+		"""Return the up to date PathNodeGrid {(x, y): penalty, ...}."""
+		if self._nodes is None or self._get_area_sizes() != self._area_sizes:
+			self._rebuild()
+			return self._nodes
+
+		if len(self.land_manager.roads) != self._roads_size:
+			# roads are added to land_manager.roads directly, find the ones in the village area
+			village_roads = self._get_village_roads()
+			self._dirty_coords.update(village_roads.symmetric_difference(self._village_roads))
+			self._village_roads = village_roads
+			self._roads_size = len(self.land_manager.roads)
+		if self._dirty_coords:
+			self._update()
+		return self._nodes
+
+	def _get_state(self, coords):
+		"""Return (is_node, is_road, is_next_to_boundary) for the tile at the given coordinates."""
+		if coords not in self.settlement.ground_map:
+			return (False, False, False)
+
+		plan = self.area_builder.plan
+		in_plan = coords in plan and coords not in self.land_manager.coastline
+		is_village_road = coords in self.land_manager.village and coords in self.land_manager.roads
+		if not in_plan and not is_village_road:
+			return (False, False, False)
+
+		is_node = is_village_road
+		is_road = is_village_road
+		if in_plan:
+			purpose = plan[coords][0]
+			is_node = is_node or purpose == BUILDING_PURPOSE.NONE or purpose == BUILDING_PURPOSE.ROAD
+			is_road = is_road or purpose == BUILDING_PURPOSE.ROAD
+
+		production = self.land_manager.production
+		for dx, dy in self.moves:
+			if (coords[0] + dx, coords[1] + dy) not in production:
+				return (is_node, is_road, True)
+		return (is_node, is_road, False)
+
+	def _get_penalty(self, coords):
+		personality = self.personality
+		penalty = 1
+
+		distance = self._distance_to_road.distance.get(coords)
+		if distance is not None:
+			if distance > personality.path_road_penalty_threshold:
+				penalty += personality.path_distant_road_penalty
+			elif distance > 0:
+				penalty += personality.path_near_road_constant_penalty + \
+					(personality.path_road_penalty_threshold - distance + 1) * personality.path_near_road_linear_penalty
+		else:
+			penalty += personality.path_unreachable_road_penalty
+
+		distance = self._distance_to_boundary.distance.get(coords)
+		if distance is not None:
+			if 1 < distance <= personality.path_boundary_penalty_threshold:
+				penalty += personality.path_near_boundary_constant_penalty + \
+					(personality.path_boundary_penalty_threshold - distance + 1) * personality.path_near_boundary_linear_penalty
+		else:
+			penalty += personality.path_unreachable_boundary_penalty
+		return penalty
+
+	def _rebuild(self):
+		self._dirty_coords.clear()
+		self._area_sizes = self._get_area_sizes()
+		self._roads_size = len(self.land_manager.roads)
+		self._village_roads = self._get_village_roads()
+
+		node_coords = []
+		road_coords = []
+		boundary_coords = []
+		for coords in self.area_builder.plan.keys() + self.land_manager.village.keys():
+			is_node, is_road, is_next_to_boundary = self._get_state(coords)
+			if is_node:
+				node_coords.append(coords)
+			if is_road:
+				road_coords.append(coords)
+			if is_next_to_boundary:
+				boundary_coords.append(coords)
+
+		self._distance_to_road = DistanceField(self._island_nodes, road_coords, 0)
+		self._distance_to_boundary = DistanceField(self._island_nodes, boundary_coords, 1)
+		self._nodes = PathNodeGrid(self.area_builder.island.position)
+		for coords in node_coords:
+			self._nodes[coords] = self._get_penalty(coords)
+
+	def _update(self):
+		dirty_coords = list(self._dirty_coords)
+		self._dirty_coords.clear() # the same set object is registered as the walkability listener
+
+		changed_coords = set()
+		for coords in dirty_coords:
+			is_node, is_road, is_next_to_boundary = self._get_state(coords)
+			if is_node:
+				if coords not in self._nodes:
+					self._nodes[coords] = None # the penalty is set below
+					changed_coords.add(coords)
+			elif coords in self._nodes:
+				del self._nodes[coords]
+			if is_road:
+				self._distance_to_road.add_source(coords)
+			else:
+				self._distance_to_road.remove_source(coords)
+			if is_next_to_boundary:
+				self._distance_to_boundary.add_source(coords)
+			else:
+				self._distance_to_boundary.remove_source(coords)
+
+		for field in (self._distance_to_road, self._distance_to_boundary):
+			field.update(dirty_coords)
+			changed_coords.update(field.changed)
+			field.changed.clear()
+
+		for coords in changed_coords:
+			if coords in self._nodes:
+				self._nodes[coords] = self._get_penalty(coords)
+
+decorators.bind_all(RoadPenaltyMap)
@@ -22,6 +22,56 @@
 import heapq
 
 from horizons.util.python import decorators
+from horizons.util.shapes import Rect
+
+class PathNodeGrid(dict):
+	"""
+	A dict {(x, y): penalty, ...} of road planning nodes that also keeps the penalties in a flat list.
+
+	The list covers the given rect plus a border of one tile that never contains nodes, so the
+	neighbours of a cell can be found by adding a fixed offset to its index. The tile (x, y) has
+	the index (x - left) * height + (y - top), which orders the indices like the coordinate tuples.
+	Only item assignment and deletion keep the list up to date.
+	"""
+
+	def __init__(self, rect):
+		super(PathNodeGrid, self).__init__()
+		self.left = rect.left - 1
+		self.top = rect.top - 1
+		self.width = rect.width + 2
+		self.height = rect.height + 2
+		self.penalties = [None] * (self.width * self.height)
+
+	@classmethod
+	def create_from_dict(cls, path_nodes):
+		"""Return a PathNodeGrid with the same content as the dict {(x, y): penalty, ...}."""
+		if path_nodes:
+			xs = [coords[0] for coords in path_nodes]
+			ys = [coords[1] for coords in path_nodes]
+			grid = cls(Rect.init_from_borders(min(xs), min(ys), max(xs), max(ys)))
+		else:
+			grid = cls(Rect.init_from_borders(0, 0, 0, 0))
+		for coords, penalty in path_nodes.iteritems():
+			grid[coords] = penalty
+		return grid
+
+	def get_index(self, coords):
+		"""Return the index of the tile in the penalty list or None if it is outside the grid."""
+		x = coords[0] - self.left
+		y = coords[1] - self.top
+		if 0 < x < self.width - 1 and 0 < y < self.height - 1:
+			return x * self.height + y
+		return None
+
+	def __setitem__(self, coords, penalty):
+		index = self.get_index(coords)
+		assert index is not None, "%s is outside the grid" % (coords, )
+		self.penalties[index] = penalty
+		super(PathNodeGrid, self).__setitem__(coords, penalty)
+
+	def __delitem__(self, coords):
+		super(PathNodeGrid, self).__delitem__(coords)
+		self.penalties[self.get_index(coords)] = None
 
 class RoadPlanner(object):
 	"""
@@ -33,9 +83,13 @@ class RoadPlanner(object):
 	* close to an existing road
 	* not straight
 	* not close to boundaries (coast, mountains, etc.)
+
+	The search works on the flat penalty list of a PathNodeGrid. A state is the index of a tile
+	times two plus the direction of the last step (0 -> changed x, 1 -> changed y), so the states
+	are ordered like the (x, y, direction) tuples and the ties are broken the same way.
 	"""
 
-	def __call__(self, personality, source, destination, destination_beacon, path_nodes, blocked_coords=None):
+	def __call__(self, personality, source, destination, destination_beacon, path_nodes, blocked_coords=None, max_expansions=None):
 		"""
 		Return the path from the source to the destination or None if it is impossible.
 
@@ -43,64 +97,99 @@ class RoadPlanner(object):
 		@param source: list of tuples [(x, y), ...]
 		@param destination: list of tuples [(x, y), ...]
 		@param destination_beacon: object with a defined distance_to_tuple function (must contain all of destination)
-		@param path_nodes: dict {(x, y): penalty}
+		@param path_nodes: dict {(x, y): penalty}, ideally a PathNodeGrid
 		@param blocked_coords: temporarily blocked coordinates set([(x, y), ...])
+		@param max_expansions: give up after expanding this many states (None means no limit)
 		"""
-		blocked_coords = blocked_coords or set()
-		target_blocked = True
+		if not isinstance(path_nodes, PathNodeGrid):
+			path_nodes = PathNodeGrid.create_from_dict(path_nodes)
+
+		penalties = path_nodes.penalties
+		if blocked_coords:
+			penalties = list(penalties)
+			for coords in blocked_coords:
+				index = path_nodes.get_index(coords)
+				if index is not None:
+					penalties[index] = None
+
+		destination_indices = set()
 		for coords in destination:
-			if coords not in blocked_coords and coords in path_nodes:
-				target_blocked = False
-				break
-		if target_blocked:
+			index = path_nodes.get_index(coords)
+			if index is not None and penalties[index] is not None:
+				destination_indices.add(index)
+		if not destination_indices:
 			return None
 
-		distance = {}
+		height = path_nodes.height
+		left = path_nodes.left
+		top = path_nodes.top
 		beacon_tuple_distance_func = destination_beacon.get_distance_function((0, 0))
+		estimates = {} # {index: distance from the tile to the destination beacon}
+		distance = {} # {state: real distance so far}
+		previous = {} # {state: previous state}
 		heap = []
 		for coords in source:
-			if coords not in blocked_coords and coords in path_nodes:
-				for dir in xrange(2): # 0 -> changed x, 1 -> changed y
-					real_distance = path_nodes[coords]
-					expected_distance = beacon_tuple_distance_func(destination_beacon, coords)
-					key = (coords[0], coords[1], dir)
-					# the value is (real distance so far, previous key)
-					distance[key] = (real_distance, None)
-					# (expected distance to the destination, current real distance, key)
-					heap.append((expected_distance, real_distance, key))
+			index = path_nodes.get_index(coords)
+			if index is None or penalties[index] is None:
+				continue
+			real_distance = penalties[index]
+			expected_distance = beacon_tuple_distance_func(destination_beacon, coords)
+			estimates[index] = expected_distance
+			for dir in xrange(2):
+				state = 2 * index + dir
+				distance[state] = real_distance
+				previous[state] = None
+				# (expected distance to the destination, current real distance, state)
+				heap.append((expected_distance, real_distance, state))
 		heapq.heapify(heap)
 
-		moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
-		final_key = None
+		# (index offset, direction) in the order of the moves (-1, 0), (0, -1), (0, 1), (1, 0)
+		moves = [(-height, 0), (-1, 1), (1, 1), (height, 0)]
+		turn_penalty = personality.turn_penalty
+		final_state = None
+		expansions = 0
 
 		# perform A*
 		while heap:
-			(_, distance_so_far, key) = heapq.heappop(heap)
-			if distance[key] < distance_so_far:
-				continue
-			if (key[0], key[1]) in destination:
-				final_key = key
+			(_, distance_so_far, state) = heapq.heappop(heap)
+			if distance[state] < distance_so_far:
+				continue # a shorter way to this state has already been expanded
+			index = state >> 1
+			if index in destination_indices:
+				final_state = state
 				break
+			if max_expansions is not None:
+				expansions += 1
+				if expansions > max_expansions:
+					break
 
-			for dir in xrange(4):
-				coords = (key[0] + moves[dir][0], key[1] + moves[dir][1])
-				if coords not in path_nodes or coords in blocked_coords:
+			state_dir = state & 1
+			for offset, dir in moves:
+				next_index = index + offset
+				penalty = penalties[next_index]
+				if penalty is None:
 					continue
-				reduced_dir = 0 if moves[dir][0] != 0 else 1
-				next_key = (coords[0], coords[1], reduced_dir)
-				real_distance = distance_so_far + path_nodes[coords] + (0 if reduced_dir == key[2] else personality.turn_penalty)
-				expected_distance = real_distance + beacon_tuple_distance_func(destination_beacon, coords)
-				if next_key not in distance or distance[next_key][0] > real_distance:
-					distance[next_key] = (real_distance, key)
-					heapq.heappush(heap, (expected_distance, real_distance, next_key))
+				next_state = 2 * next_index + dir
+				real_distance = distance_so_far + penalty + (0 if dir == state_dir else turn_penalty)
+				if next_state not in distance or distance[next_state] > real_distance:
+					estimate = estimates.get(next_index)
+					if estimate is None:
+						x, y = divmod(next_index, height)
+						estimate = beacon_tuple_distance_func(destination_beacon, (left + x, top + y))
+						estimates[next_index] = estimate
+					distance[next_state] = real_distance
+					previous[next_state] = state
+					heapq.heappush(heap, (real_distance + estimate, real_distance, next_state))
 
 		# save path
-		if final_key is not None:
+		if final_state is not None:
 			path = []
-			while final_key is not None:
-				path.append((final_key[0], final_key[1]))
-				final_key = distance[final_key][1]
+			while final_state is not None:
+				x, y = divmod(final_state >> 1, height)
+				path.append((left + x, top + y))
+				final_state = previous[final_state]
 			return path
 		return None
 
+decorators.bind_all(PathNodeGrid)
 decorators.bind_all(RoadPlanner)
@@ -22,6 +22,7 @@
 import logging
 
 from horizons.ai.aiplayer.goal.combatship import CombatShipGoal
+from horizons.ai.aiplayer.evaluatorcache import EvaluatorCache
 from horizons.ai.aiplayer.villagebuilder import VillageBuilder
 from horizons.ai.aiplayer.productionbuilder import ProductionBuilder
 from horizons.ai.aiplayer.productionchain import ProductionChain
@@ -71,6 +72,7 @@ class SettlementManager(WorldObject):
 	* village_builder: VillageBuilder instance
 	* resource_manager: ResourceManager instance
 	* trade_manager: TradeManager instance
+	* evaluator_cache: EvaluatorCache instance
 	"""
 
 	log = logging.getLogger("ai.aiplayer")
@@ -112,6 +114,7 @@ class SettlementManager(WorldObject):
 
 		# initialise caches
 		self.__resident_resource_usage_cache = {}
+		self.evaluator_cache = EvaluatorCache(self.settlement)
 
 	def __init_goals(self):
 		"""Initialise the list of all the goals the settlement can use."""
@@ -401,8 +404,13 @@ class SettlementManager(WorldObject):
 			self._add_goals(goals)
 			self._end_general_tick()
 
+	def end(self):
+		self.village_builder.end()
+		self.production_builder.end()
+
 	def add_building(self, building):
 		"""Called when a new building is added to the settlement (the building already exists during the call)."""
+		self.evaluator_cache.invalidate_coords_list(building.position.tuple_iter())
 		coords = building.position.origin.to_tuple()
 		if coords in self.village_builder.plan:
 			self.village_builder.add_building(building)
@@ -411,6 +419,7 @@ class SettlementManager(WorldObject):
 
 	def remove_building(self, building):
 		"""Called when a building is removed from the settlement (the building still exists during the call)."""
+		self.evaluator_cache.invalidate_coords_list(building.position.tuple_iter())
 		coords = building.position.origin.to_tuple()
 		if coords in self.village_builder.plan:
 			self.village_builder.remove_building(building)
@@ -0,0 +1,592 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+import math
+import random
+
+from collections import defaultdict, deque
+
+from horizons.ai.aiplayer.constants import BUILDING_PURPOSE
+from horizons.constants import BUILDINGS
+from horizons.util.shapes import distances, Rect
+from horizons.util.python import decorators
+
+class VillagePlanner(object):
+	"""
+	Creates the plan of a new village area.
+
+	The planner works only on the plain data that is given to it and doesn't access the
+	session, which is why it can be run in another process (see DeferredPlan). The same
+	input always results in the same plan.
+
+	Important attributes:
+	* village: set([(x, y), ...]) of the village area coordinates
+	* usable: set([(x, y), ...]) of the usable coordinates in and around the village area
+	* warehouse_position: Rect of the warehouse position
+	* personality: PersonalityValues instance of the village builder personality
+	* buildings: {building id: (size, radius), ...} of the buildings that the planner needs to know
+	* random: Random instance that is only used by this planner
+	"""
+
+	# the buildings whose size and radius the planner uses
+	building_ids = [BUILDINGS.RESIDENTIAL, BUILDINGS.MAIN_SQUARE, BUILDINGS.TAVERN]
+
+	def __init__(self, village, usable, warehouse_position, personality, buildings, seed):
+		"""
+		@param village: iterable of the village area coordinates [(x, y), ...]
+		@param usable: set([(x, y), ...]) of the usable coordinates in the bounding box of the village area
+		@param warehouse_position: (left, top, width, height) of the warehouse
+		@param personality: PersonalityValues instance
+		@param buildings: {building id: (size, radius), ...} for every id in building_ids
+		@param seed: seed of the planner's random number generator
+		"""
+		self.village = set(village)
+		self.usable = usable
+		self.warehouse_position = Rect.init_from_topleft_and_size(*warehouse_position)
+		self.personality = personality
+		self.buildings = buildings
+		self.random = random.Random(seed)
+		self.plan = {} # {(x, y): (purpose, (section, seq_no)), ...}
+		self.num_residences = 0
+
+	def __call__(self):
+		"""
+		Create the area plan.
+
+		The algorithm:
+		* find a way to cut the village area into rectangular section_plans
+		* each section gets a plan with a main square, roads, and residence locations
+		* the plan is stitched together and other village buildings are by replacing some
+			of the residences
+
+		@return: (plan, number of sections) where the plan is in the same format as VillageBuilder.plan
+		"""
+
+		xs = set([x for (x, _) in self.village])
+		ys = set([y for (_, y) in self.village])
+
+		width = max(xs) - min(xs) + 1
+		height = max(ys) - min(ys) + 1
+		horizontal_sections = int(math.ceil(float(width) / self.personality.max_village_section_size))
+		vertical_sections = int(math.ceil(float(height) / self.personality.max_village_section_size))
+
+		section_plans = [] # [{(x, y): BUILDING_PURPOSE constant, ...}, ...]
+		vertical_roads = set() # set([x, ...])
+		horizontal_roads = set() # set([y, ...])
+
+		# partition with roads between the sections
+		start_y = min(ys)
+		section_width = width // horizontal_sections
+		section_height = height // vertical_sections
+		section_coords_set_list = []
+		for i in xrange(vertical_sections):
+			bottom_road = i + 1 < vertical_sections
+			max_y = min(max(ys), start_y + section_height)
+			current_height = max_y - start_y + 1
+			start_x = min(xs)
+
+			for j in xrange(horizontal_sections):
+				right_road = j + 1 < horizontal_sections
+				max_x = min(max(xs), start_x + section_width)
+				current_width = max_x - start_x + 1
+				section_coords_set_list.append(self._get_village_section_coordinates(start_x, start_y, current_width - right_road, current_height - bottom_road))
+				start_x += current_width
+				if i == 0 and right_road:
+					vertical_roads.add(start_x - 1)
+
+			start_y += current_height
+			if bottom_road:
+				horizontal_roads.add(start_y - 1)
+
+		for section_coords_set in section_coords_set_list:
+			section_plan = self._create_section_plan(section_coords_set, vertical_roads, horizontal_roads)
+			section_plans.append(section_plan[1])
+
+		self._stitch_sections_together(section_plans, vertical_roads, horizontal_roads)
+		return (self.plan, len(section_plans))
+
+	def _get_position(self, coords, building_id):
+		"""Return the position Rect of a building of the given type at the given position."""
+		return Rect.init_from_topleft_and_size_tuples(coords, self.buildings[building_id][0])
+
+	def _get_village_section_coordinates(self, start_x, start_y, width, height):
+		"""Return set([(x, y), ...]) of usable coordinates in the rectangle defined by the parameters."""
+		warehouse_coords_set = set(self.warehouse_position.tuple_iter())
+		result = set()
+		for dx in xrange(width):
+			for dy in xrange(height):
+				coords = (start_x + dx, start_y + dy)
+				if coords in self.village and coords in self.usable and coords not in warehouse_coords_set:
+					result.add(coords)
+		return result
+
+	def _stitch_sections_together(self, section_plans, vertical_roads, horizontal_roads):
+		"""
+		Complete creating the plan by stitching the sections together.
+
+		@param section_plans: list of section plans in the format [{(x, y): BUILDING_PURPOSE constant, ...}, ...]
+		@param vertical_roads: vertical roads between the sections in the form set([x, ...])
+		@param horizontal_roads: horizontal roads between the sections in the form set([y, ...])
+		"""
+
+		self.plan = {}
+		ys = set(zip(*self.village)[1])
+		for road_x in vertical_roads:
+			for road_y in ys:
+				coords = (road_x, road_y)
+				if coords in self.usable:
+					self.plan[coords] = (BUILDING_PURPOSE.ROAD, (0, None))
+
+		xs = set(zip(*self.village)[0])
+		for road_y in horizontal_roads:
+			for road_x in xs:
+				coords = (road_x, road_y)
+				if coords in self.usable:
+					self.plan[coords] = (BUILDING_PURPOSE.ROAD, (0, None))
+
+		for i in xrange(len(section_plans)):
+			section_plan = section_plans[i]
+			self._optimize_section_plan(section_plan)
+			tent_lookup = self._create_tent_lookup(section_plan)
+			for coords, purpose in section_plan.iteritems():
+				self.plan[coords] = (purpose, (i, tent_lookup[coords]))
+		self._reserve_special_village_building_spots()
+
+	@classmethod
+	def _remove_unreachable_roads(cls, section_plan, main_square):
+		"""
+		Remove the roads that can't be reached by starting from the main square.
+
+		@param section_plan: {(x, y): BUILDING_PURPOSE constant, ...}
+		@param main_square: Rect representing the position of the main square
+		"""
+
+		moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+		reachable = set()
+		queue = deque()
+		for (x, y) in main_square.tuple_iter():
+			for (dx, dy) in moves:
+				coords = (x + dx, y + dy)
+				if coords in section_plan and section_plan[coords] == BUILDING_PURPOSE.ROAD:
+					queue.append(coords)
+					reachable.add(coords)
+
+		while queue:
+			(x, y) = queue.popleft()
+			for dx, dy in moves:
+				coords = (x + dx, y + dy)
+				if coords in section_plan and section_plan[coords] == BUILDING_PURPOSE.ROAD and coords not in reachable:
+					reachable.add(coords)
+					queue.append(coords)
+
+		to_remove = []
+		for coords, purpose in section_plan.iteritems():
+			if purpose == BUILDING_PURPOSE.ROAD and coords not in reachable:
+				to_remove.append(coords)
+		for coords in to_remove:
+			section_plan[coords] = BUILDING_PURPOSE.NONE
+
+	def _get_possible_building_positions(self, section_coords_set, size):
+		"""Return {(x, y): Rect, ...} that contains every size x size potential building location where only the provided coordinates are legal."""
+		result = {}
+		for (x, y) in sorted(section_coords_set):
+			ok = True
+			for dx in xrange(size[0]):
+				for dy in xrange(size[1]):
+					coords = (x + dx, y + dy)
+					if coords not in section_coords_set or coords not in self.usable:
+						ok = False
+						break
+				if not ok:
+					break
+			if ok:
+				result[(x, y)] = Rect.init_from_topleft_and_size_tuples((x, y), size)
+		return result
+
+	def _create_section_plan(self, section_coords_set, vertical_roads, horizontal_roads):
+		"""
+		Create the section plan that contains the main square, roads, and residence positions.
+
+		The algorithm is as follows:
+		* place the main square
+		* form a road grid to support the tents
+		* choose the best one by preferring the one with more residence locations and less
+			unreachable / blocked / parallel side by side roads.
+
+		@param section_plans: list of section plans in the format [{(x, y): BUILDING_PURPOSE constant, ...}, ...]
+		@param vertical_roads: vertical roads between the sections in the form set([x, ...])
+		@param horizontal_roads: horizontal roads between the sections in the form set([y, ...])
+		@return: (number of residences in the plan, the plan in the form {(x, y): BUILDING_PURPOSE constant}
+		"""
+
+		best_plan = {}
+		best_tents = 0
+		best_value = -1
+		tent_squares = [(0, 0), (0, 1), (1, 0), (1, 1)]
+		road_connections = [(-1, 0), (-1, 1), (0, -1), (0, 2), (1, -1), (1, 2), (2, 0), (2, 1)]
+		tent_radius_sq = self.buildings[BUILDINGS.RESIDENTIAL][1] ** 2
+
+		xs = set(x for (x, _) in section_coords_set)
+		for x in vertical_roads:
+			if x - 1 in xs or x + 1 in xs:
+				xs.add(x)
+		xs = sorted(xs)
+
+		ys = set(y for (_, y) in section_coords_set)
+		for y in horizontal_roads:
+			if y - 1 in ys or y + 1 in ys:
+				ys.add(y)
+		ys = sorted(ys)
+
+		distance_rect_rect_sq = distances.distance_rect_rect_sq
+		possible_road_positions = self._get_possible_building_positions(section_coords_set, (1, 1))
+		possible_residence_positions = self._get_possible_building_positions(section_coords_set, self.buildings[BUILDINGS.RESIDENTIAL][0])
+		possible_main_square_positions = self._get_possible_building_positions(section_coords_set, self.buildings[BUILDINGS.MAIN_SQUARE][0])
+
+		for (x, y), main_square in sorted(possible_main_square_positions.iteritems()):
+			section_plan = dict.fromkeys(section_coords_set, BUILDING_PURPOSE.NONE)
+			bad_roads = 0
+			good_tents = 0
+			double_roads = 0
+
+			# place the main square
+			for coords in main_square.tuple_iter():
+				section_plan[coords] = BUILDING_PURPOSE.RESERVED
+			section_plan[(x, y)] = BUILDING_PURPOSE.MAIN_SQUARE
+
+			# place the roads running parallel to the y-axis
+			last_road_y = None
+			for road_y in ys:
+				if road_y not in horizontal_roads:
+					if road_y < y:
+						if (y - road_y) % 5 != 1:
+							continue
+					else:
+						if road_y < y + 6 or (road_y - y) % 5 != 1:
+							continue
+
+				if last_road_y == road_y - 1:
+					double_roads += 1
+				last_road_y = road_y
+
+				for road_x in xs:
+					if road_x not in vertical_roads:
+						coords = (road_x, road_y)
+						if coords in possible_road_positions:
+							section_plan[coords] = BUILDING_PURPOSE.ROAD
+						else:
+							bad_roads += 1
+
+			# place the roads running parallel to the x-axis
+			last_road_x = None
+			for road_x in xs:
+				if road_x not in vertical_roads:
+					if road_x < x:
+						if (x - road_x) % 5 != 1:
+							continue
+					else:
+						if road_x < x + 6 or (road_x - x) % 5 != 1:
+							continue
+
+				if last_road_x == road_x - 1:
+					double_roads += 1
+				last_road_x = road_x
+
+				for road_y in ys:
+					if road_y not in horizontal_roads:
+						coords = (road_x, road_y)
+						if coords in possible_road_positions:
+							section_plan[coords] = BUILDING_PURPOSE.ROAD
+						else:
+							bad_roads += 1
+
+			if bad_roads > 0:
+				self._remove_unreachable_roads(section_plan, main_square)
+
+			# place the tents
+			for coords, position in sorted(possible_residence_positions.iteritems()):
+				ok = True
+				for dx, dy in tent_squares:
+					coords2 = (coords[0] + dx, coords[1] + dy)
+					if section_plan[coords2] != BUILDING_PURPOSE.NONE:
+						ok = False
+						break
+				if not ok:
+					continue
+				if distance_rect_rect_sq(main_square, position) > tent_radius_sq:
+					continue # unable to build or out of main square range
+
+				# is there a road connection?
+				ok = False
+				for dx, dy in road_connections:
+					coords2 = (coords[0] + dx, coords[1] + dy)
+					if coords2 in section_plan and section_plan[coords2] == BUILDING_PURPOSE.ROAD:
+						ok = True
+						break
+
+				# connection to a road tile exists, build the tent
+				if ok:
+					for dx, dy in tent_squares:
+						section_plan[(coords[0] + dx, coords[1] + dy)] = BUILDING_PURPOSE.RESERVED
+					section_plan[coords] = BUILDING_PURPOSE.RESIDENCE
+					good_tents += 1
+
+			value = self.personality.tent_value * good_tents - self.personality.bad_road_penalty * bad_roads - self.personality.double_road_penalty * double_roads
+			if best_value < value:
+				best_plan = section_plan
+				best_tents = good_tents
+				best_value = value
+		return (best_tents, best_plan)
+
+	def _optimize_section_plan(self, section_plan):
+		"""Try to fit more residences into the grid."""
+		# calculate distance from the main square to every tile
+		road_connections = [(-1, 0), (-1, 1), (0, -1), (0, 2), (1, -1), (1, 2), (2, 0), (2, 1)]
+		tent_squares = [(0, 0), (0, 1), (1, 0), (1, 1)]
+		moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+		distance = {}
+		queue = deque()
+
+		for coords, purpose in sorted(section_plan.iteritems()):
+			if purpose == BUILDING_PURPOSE.MAIN_SQUARE:
+				for coords in self._get_position(coords, BUILDINGS.MAIN_SQUARE).tuple_iter():
+					distance[coords] = 0
+					queue.append(coords)
+
+		while queue:
+			(x, y) = queue.popleft()
+			for dx, dy in moves:
+				coords = (x + dx, y + dy)
+				if coords in section_plan and coords not in distance:
+					distance[coords] = distance[(x, y)] + 1
+					queue.append(coords)
+
+		# remove planned tents from the section plan
+		for (x, y) in section_plan:
+			coords = (x, y)
+			if section_plan[coords] == BUILDING_PURPOSE.RESIDENCE:
+				for dx, dy in tent_squares:
+					section_plan[(x + dx, y + dy)] = BUILDING_PURPOSE.NONE
+
+		# create new possible tent position list
+		possible_tents = []
+		for coords in sorted(section_plan):
+			if coords in distance and section_plan[coords] == BUILDING_PURPOSE.NONE:
+				possible_tents.append((distance[coords], coords))
+		possible_tents.sort()
+
+		# place the tents
+		for _, (x, y) in possible_tents:
+			ok = True
+			for dx, dy in tent_squares:
+				coords = (x + dx, y + dy)
+				if coords not in section_plan or section_plan[coords] != BUILDING_PURPOSE.NONE:
+					ok = False
+					break
+			if not ok:
+				continue
+
+			# is there a road connection?
+			ok = False
+			for dx, dy in road_connections:
+				coords = (x + dx, y + dy)
+				if coords in section_plan and section_plan[coords] == BUILDING_PURPOSE.ROAD:
+					ok = True
+					break
+
+			# connection to a road tile exists, build the tent
+			if ok:
+				for dx, dy in tent_squares:
+					section_plan[(x + dx, y + dy)] = BUILDING_PURPOSE.RESERVED
+				section_plan[(x, y)] = BUILDING_PURPOSE.RESIDENCE
+
+	def _create_tent_lookup(self, section_plan):
+		"""
+		Place the residences of a section in a visually appealing order.
+
+		The algorithm:
+		* split the residences of the section into blocks where a block is formed of all
+			residence spots that share sides
+		* calculate the distance from the main square to the block
+		* form the final sequence by sorting the blocks by distance to the main square and
+			by sorting the residences of a block by their coordinates
+
+		@return: {(x, y): residence sequence number}
+		"""
+		moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+		blocks = []
+		block = {}
+
+		# form blocks of tents
+		main_square = None
+		for coords, purpose in sorted(section_plan.iteritems()):
+			if purpose == BUILDING_PURPOSE.MAIN_SQUARE:
+				main_square = self._get_position(coords, BUILDINGS.MAIN_SQUARE)
+			if purpose != BUILDING_PURPOSE.RESIDENCE or coords in block:
+				continue
+			block[coords] = len(blocks)
+
+			block_list = [coords]
+			queue = deque()
+			explored = set([coords])
+			queue.append(coords)
+			while queue:
+				(x, y) = queue.popleft()
+				for dx, dy in moves:
+					coords = (x + dx, y + dy)
+					if coords not in section_plan or coords in explored:
+						continue
+					if section_plan[coords] == BUILDING_PURPOSE.RESIDENCE or section_plan[coords] == BUILDING_PURPOSE.RESERVED:
+						explored.add(coords)
+						queue.append(coords)
+						if section_plan[coords] == BUILDING_PURPOSE.RESIDENCE:
+							block[coords] = len(blocks)
+							block_list.append(coords)
+			blocks.append(block_list)
+
+		# calculate distance from the main square to the block
+		distance_rect_tuple = distances.distance_rect_tuple
+		block_distances = []
+		for coords_list in blocks:
+			distance = 0
+			for coords in coords_list:
+				distance += distance_rect_tuple(main_square, coords)
+			block_distances.append((distance / len(coords_list), coords_list))
+
+		# form the sorted tent queue
+		result = defaultdict(lambda: None)
+		if block_distances:
+			for block in zip(*sorted(block_distances))[1]:
+				for coords in sorted(block):
+					result[coords] = self.num_residences
+					self.num_residences += 1
+		return result
+
+	def _get_sorted_building_positions(self, building_purpose):
+		"""Return a list of sorted building positions in the form [Rect, ...]."""
+		building_id = BUILDING_PURPOSE.purpose_to_building[building_purpose]
+		return sorted(self._get_position(coords, building_id) for coords, (purpose, _) in self.plan.iteritems() if purpose == building_purpose)
+
+	def _replace_planned_residence(self, new_purpose, max_buildings, capacity):
+		"""
+		Replace up to max_buildings residence spots with buildings of purpose new_purpose.
+
+		This function is used to amend the existing plan with village producers such as
+		pavilions, schools, and taverns. The goal is to place as few of them as needed
+		while still covering the maximum number of residences.
+
+		@param new_purpose: the BUILDING_PURPOSE constant of the new buildings
+		@param max_buildings: maximum number of residences to replace
+		@param capacity: maximum number of residences one of the new buildings can service
+		"""
+
+		distance_rect_rect_sq = distances.distance_rect_rect_sq
+		distance_rect_tuple = distances.distance_rect_tuple
+		tent_range_sq = self.buildings[BUILDINGS.RESIDENTIAL][1] ** 2
+		planned_tents = self._get_sorted_building_positions(BUILDING_PURPOSE.RESIDENCE)
+
+		possible_positions = list(planned_tents)
+		if new_purpose == BUILDING_PURPOSE.TAVERN:
+			# filter out the positions that are too far from the main squares and the warehouse
+			tavern_radius_sq = self.buildings[BUILDINGS.TAVERN][1] ** 2
+			storage_positions = self._get_sorted_building_positions(BUILDING_PURPOSE.MAIN_SQUARE)
+			storage_positions.append(self.warehouse_position)
+			possible_positions = [rect for rect in possible_positions if any(distance_rect_rect_sq(rect, storage_rect) <= tavern_radius_sq for storage_rect in storage_positions)]
+
+		num_kept = int(min(len(possible_positions), max(self.personality.min_coverage_building_options, len(possible_positions) * self.personality.coverage_building_option_ratio)))
+		possible_positions = self.random.sample(possible_positions, num_kept)
+
+		def get_centroid(planned, blocked):
+			total_x, total_y = 0, 0
+			for position in planned_tents:
+				if position not in blocked:
+					total_x += position.left
+					total_y += position.top
+			mid_x = total_x / float(len(planned) - len(blocked))
+			mid_y = total_y / float(len(planned) - len(blocked))
+			return (mid_x, mid_y)
+
+		def get_centroid_distance_pairs(planned, blocked):
+			centroid = get_centroid(planned_tents, blocked)
+			positions = []
+			for position in planned_tents:
+				if position not in blocked:
+					positions.append((distance_rect_tuple(position, centroid), position))
+			positions.sort(reverse = True)
+			return positions
+
+		for _ in xrange(max_buildings):
+			if len(planned_tents) <= 1:
+				break
+			best_score = None
+			best_pos = None
+
+			for replaced_pos in possible_positions:
+				positions = get_centroid_distance_pairs(planned_tents, set([replaced_pos]))
+				score = 0
+				in_range = 0
+				for distance_to_centroid, position in positions:
+					if in_range < capacity and distance_rect_rect_sq(replaced_pos, position) <= tent_range_sq:
+						in_range += 1
+					else:
+						score += distance_to_centroid
+				if best_score is None or best_score > score:
+					best_score = score
+					best_pos = replaced_pos
+
+			in_range = 0
+			positions = zip(*get_centroid_distance_pairs(planned_tents, set([best_pos])))[1]
+			for position in positions:
+				if in_range < capacity and distance_rect_rect_sq(best_pos, position) <= tent_range_sq:
+					planned_tents.remove(position)
+					in_range += 1
+			if not in_range:
+				continue
+
+			possible_positions.remove(best_pos)
+			coords = best_pos.origin.to_tuple()
+			self.plan[coords] = (new_purpose, (self.plan[coords][1][0], None))
+
+	def _reserve_special_village_building_spots(self):
+		"""Replace residence spots with special village buildings such as pavilions, schools, taverns, and fire stations."""
+		num_other_buildings = 0 # the maximum number of each village producer that should be placed
+		residences = self.num_residences
+		while residences > 0:
+			num_other_buildings += 3
+			residences -= 3 + self.personality.normal_coverage_building_capacity
+
+		self._replace_planned_residence(BUILDING_PURPOSE.PAVILION, num_other_buildings, self.personality.max_coverage_building_capacity)
+		self._replace_planned_residence(BUILDING_PURPOSE.VILLAGE_SCHOOL, num_other_buildings, self.personality.max_coverage_building_capacity)
+		self._replace_planned_residence(BUILDING_PURPOSE.TAVERN, num_other_buildings, self.personality.max_coverage_building_capacity)
+
+		num_fire_stations = max(0, int(round(0.5 + (self.num_residences - 3 * num_other_buildings) / self.personality.normal_fire_station_capacity)))
+		self._replace_planned_residence(BUILDING_PURPOSE.FIRE_STATION, num_fire_stations, self.personality.max_fire_station_capacity)
+
+class PersonalityValues(object):
+	"""The constants of a personality class in a form that can be sent to another process."""
+
+	def __init__(self, personality):
+		for name in dir(personality):
+			if not name.startswith('_'):
+				setattr(self, name, getattr(personality, name))
+
+decorators.bind_all(VillagePlanner)
+decorators.bind_all(PersonalityValues)
@@ -25,7 +25,7 @@ import logging
 
 from horizons.util.python import get_all_subclasses
 from horizons.util.worldobject import WorldObject
-from horizons.network.packets import SafeUnpickler
+from horizons.network.packets import SafeUnpickler, WireFormat
 
 class Command(object):
 	"""Base class for every Command."""
@@ -38,6 +38,8 @@ class Command(object):
 		see documentation inside horizons.network.packets.SafeUnpickler
 		"""
 		SafeUnpickler.add('server', klass)
+		if klass.__module__ != '__builtin__': # e.g. set, the wire format supports them directly
+			WireFormat.add(klass)
 
 	def execute(self, session, local=False):
 		"""Execute command.
@@ -63,6 +65,8 @@ class GenericCommand(Command):
 	  def __init__(self, obj):
 	    super(MyCommand,self).__init__(obj, "mymethod", 42, 1337)
 	 """
+	network_fields = ('obj_id', 'method', 'args', 'kwargs')
+
 	def __init__(self, obj, method, *args, **kwargs):
 		self.obj_id = obj.worldid
 		self.method = method
@@ -80,6 +84,8 @@ class GenericCommand(Command):
 
 class GenericComponentCommand(Command):
 	"""Code generator for trivial commands on a component."""
+	network_fields = ('obj_id', 'method', 'component_name', 'args', 'kwargs')
+
 	def __init__(self, component, method, *args, **kwargs):
 		self.obj_id = component.instance.worldid
 		self.method = method
@@ -34,6 +34,9 @@ from horizons.component.storagecomponent import StorageComponent
 
 class Build(Command):
 	"""Command class that builds an object."""
+	network_fields = ('building_class', 'ship', 'x', 'y', 'rotation', 'ownerless', 'island',
+	                  'settlement', 'tearset', 'data', 'action_set_id')
+
 	def __init__(self, building, x, y, island, rotation=45, ship=None, ownerless=False,
 	             settlement=None, tearset=None, data=None, action_set_id=None):
 		"""Create the command
@@ -204,6 +207,8 @@ Command.allow_network(set)
 
 class Tear(Command):
 	"""Command class that tears an object."""
+	network_fields = ('building', )
+
 	def __init__(self, building):
 		"""Create the command
 		@param building: building that is to be teared.
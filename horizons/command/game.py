@@ -40,11 +40,13 @@ class SaveCommand(Command):
 
 		self.log.debug("SaveCommand: save to %s", path)
 
-		success = session._do_save(path)
-		if success:
-			session.ingame_gui.message_widget.add(point=None, string_id='SAVED_GAME') # TODO: distinguish auto/quick/normal
-		else:
-			session.gui.show_popup(_('Error'), _('Failed to save.'))
+		# the file is written in the background, so the game doesn't lag for all players
+		def on_saved(success):
+			if success:
+				session.ingame_gui.message_widget.add(point=None, string_id='SAVED_GAME') # TODO: distinguish auto/quick/normal
+			else:
+				session.gui.show_popup(_('Error'), _('Failed to save.'))
+		session._do_save_in_background(path, on_saved)
 
 Command.allow_network(SaveCommand)
 
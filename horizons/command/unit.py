@@ -74,6 +74,8 @@ class CreateUnit(Command):
 	You always only add a production that creates then units, but that is simulated on every machine
 
 	"""
+	network_fields = ('owner_id', 'unit_id', 'x', 'y', 'kwargs')
+
 	def __init__(self, owner_id, unit_id, x, y, **kwargs):
 		"""
 		@param session: Session instance
@@ -67,7 +67,7 @@ class VERSION:
 	MIN_FIFE_REVISION = 4071
 
 	## +=1 this if you changed the savegame "api"
-	SAVEGAMEREVISION = 70
+	SAVEGAMEREVISION = 72
 
 	@staticmethod
 	def string():
@@ -348,6 +348,9 @@ class GAME:
 
 	WORLD_WORLDID = 0 # worldid of World object
 	MAX_TICKS = None # exit after on tick MAX_TICKS (disabled by setting to None)
+	# keep the buildability caches as bit arrays instead of sets of coordinates (see horizons/world/buildability/bitsetcache.py).
+	# the value has to be the same for every multiplayer client.
+	BITSET_BUILDABILITY_CACHES = False
 
 # Map related constants
 class MAP:
@@ -368,6 +371,14 @@ class AI:
 	HIGHLIGHT_PLANS = False # whether to show the AI players' plans on the map
 	HIGHLIGHT_COMBAT = False # whether to show the AI players' combat ranges around each unit
 	HUMAN_AI = False # whether the human player is controlled by the AI
+	# how much settlement handling an AI player may do per game tick, one unit per settlement manager tick and goal update.
+	# the rest is continued in the next tick. the value has to be the same for every multiplayer client.
+	WORK_UNITS_PER_TICK = 16
+	# new village plans are created by worker processes and used this many ticks after they were requested.
+	# the value has to be the same for every multiplayer client.
+	PLAN_DELAY_TICKS = 48
+	# 0 means creating the plans in the game process. the worker processes are forked, which isn't possible on windows.
+	PLAN_WORKER_PROCESSES = 1 if hasattr(os, 'fork') else 0
 
 class TRADER: # check resource values: ./development/print_db_data.py res
 	PRICE_MODIFIER_BUY = 1.0  # buy for x times the resource value
@@ -0,0 +1,120 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+"""Running games without engine and gui (see --headless).
+
+FIFE and horizons.gui have to be replaced by dummies before anything imports them,
+run_uh.setup_headless() takes care of this before importing this module.
+"""
+
+import time
+
+import horizons.globals
+import horizons.main
+import horizons.world # needs to be imported before session
+import horizons.session
+from horizons.ext.dummy import Dummy
+from horizons.extscheduler import ExtScheduler
+from horizons.savegamemanager import SavegameManager
+from horizons.spsession import SPSession
+from horizons.util.startgameoptions import StartGameOptions
+from horizons.util.tickprofiler import TickProfiler
+
+
+class HeadlessSession(SPSession):
+	"""Singleplayer session that has no view and no gui. The timer isn't driven by the
+	engine, the game is run with Timer.fast_forward() instead."""
+
+	def __init__(self, db, rng_seed=None):
+		horizons.session.View = Dummy
+		ExtScheduler.create_instance(Dummy)
+		super(HeadlessSession, self).__init__(Dummy, db, rng_seed)
+
+	def reset_autosave(self):
+		pass # nobody would load them
+
+	def end(self):
+		super(HeadlessSession, self).end()
+		ExtScheduler.destroy_instance()
+
+
+def get_start_options(command_line_arguments):
+	"""Returns StartGameOptions for the game given on the command line or None."""
+	args = command_line_arguments
+	if args.start_random_map:
+		return StartGameOptions.create_start_random_map(args.ai_players, None, args.force_player_id)
+	elif args.start_specific_random_map is not None:
+		return StartGameOptions.create_start_random_map(args.ai_players,
+			args.start_specific_random_map, args.force_player_id)
+	elif args.start_map is not None:
+		map_file = horizons.main._find_matching_map(args.start_map, SavegameManager.get_maps())
+		if map_file:
+			return StartGameOptions.create_start_singleplayer(map_file, False, args.ai_players,
+				True, True, args.force_player_id, True)
+	elif args.load_game is not None:
+		map_file = horizons.main._find_matching_map(args.load_game, SavegameManager.get_saves())
+		if map_file:
+			return StartGameOptions.create_load_game(map_file, args.force_player_id)
+	else:
+		print "Error: --headless needs a game to start, e.g. --start-random-map or --load-game."
+	return None
+
+def start(command_line_arguments, condition=None):
+	"""Runs the game given on the command line as fast as possible.
+	It stops after --max-ticks ticks, after --max-time seconds or when condition returns True.
+	@param command_line_arguments: options object from optparse.OptionParser. see run_uh.py.
+	@param condition: callable without arguments
+	@return: bool, whether the game could be started
+	"""
+	horizons.main.command_line_arguments = command_line_arguments
+	horizons.globals.db = horizons.main._create_main_db()
+	SavegameManager.init()
+
+	options = get_start_options(command_line_arguments)
+	if options is None:
+		return False
+
+	if command_line_arguments.max_ticks is None and command_line_arguments.max_time is None and condition is None:
+		print "Warning: running without --max-ticks or --max-time, stop with Ctrl-C."
+
+	if command_line_arguments.profile_ticks:
+		TickProfiler.create_instance()
+
+	session = HeadlessSession(horizons.globals.db, command_line_arguments.sp_seed)
+	session.load(options)
+
+	start_time = time.time()
+	ticks = session.timer.fast_forward(command_line_arguments.max_ticks,
+		command_line_arguments.max_time, condition)
+	duration = time.time() - start_time
+
+	print 'Ran %d ticks in %.2fs (%.1f ticks/s)' % (ticks, duration, ticks / max(duration, 0.001))
+	for player in sorted(session.world.players, key=lambda p: p.worldid):
+		print '%s: %d settlements, %d inhabitants' % (player.name, len(player.settlements),
+			sum(settlement.inhabitants for settlement in player.settlements))
+
+	if command_line_arguments.profile_ticks:
+		TickProfiler().save(command_line_arguments.profile_ticks)
+		print 'Tick profile written to %s' % command_line_arguments.profile_ticks
+
+	session.end()
+	return True
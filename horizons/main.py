@@ -51,8 +51,10 @@ from horizons.util.loaders.tilesetloader import TileSetLoader
 from horizons.util.startgameoptions import StartGameOptions
 from horizons.util.python import parse_port
 from horizons.util.python.callback import Callback
+from horizons.util.tickprofiler import TickProfiler
 from horizons.util.uhdbaccessor import UhDbAccessor
 from horizons.util.savegameaccessor import SavegameAccessor
+from horizons.util.dbsnapshot import get_snapshot, copy_snapshot
 
 
 # private module pointers of this module
@@ -143,6 +145,9 @@ def start(_command_line_arguments):
 	if command_line_arguments.max_ticks:
 		GAME.MAX_TICKS = command_line_arguments.max_ticks
 
+	if command_line_arguments.profile_ticks:
+		TickProfiler.create_instance()
+
 	atlas_generator = None
 	if VERSION.IS_DEV_VERSION and horizons.globals.fife.get_uh_setting('AtlasesEnabled') \
 	                          and horizons.globals.fife.get_uh_setting('AtlasGenerationEnabled') \
@@ -291,6 +296,10 @@ def start(_command_line_arguments):
 
 	horizons.globals.fife.run()
 
+	if command_line_arguments.profile_ticks:
+		TickProfiler().save(command_line_arguments.profile_ticks)
+		print 'Tick profile written to %s' % command_line_arguments.profile_ticks
+
 def quit():
 	"""Quits the game"""
 	horizons.globals.fife.quit()
@@ -519,16 +528,32 @@ def edit_game_map(saved_game_name):
 		return _edit_map(map_name)
 	return edit_map(map_name)
 
-def _create_main_db():
+def _create_main_db(snapshot=True):
 	"""Returns a dbreader instance, that is connected to the main game data dbfiles.
-	NOTE: This data is read_only, so there are no concurrency issues"""
+	The data is copied into memory from a binary snapshot of the dbfiles (see dbsnapshot),
+	the sql scripts are only run if no snapshot can be used.
+	NOTE: This data is read_only, so there are no concurrency issues
+	@param snapshot: whether to use the snapshot, False always runs the sql scripts"""
 	_db = UhDbAccessor(':memory:')
+	snapshot_path = get_snapshot(PATHS.DB_FILES) if snapshot else None
+	if snapshot_path is not None:
+		copy_snapshot(snapshot_path, _db)
+		return _db
 	for i in PATHS.DB_FILES:
 		f = open(i, "r")
 		sql = "BEGIN TRANSACTION;" + f.read() + "COMMIT;"
 		_db.execute_script(sql)
 	return _db
 
+def _open_main_db_snapshot():
+	"""Returns a dbreader instance that reads the game data directly from the snapshot file.
+	Unlike _create_main_db, this does not copy anything, so it is a cheap way to get
+	another connection for a thread. Falls back to _create_main_db if there is no snapshot."""
+	snapshot_path = get_snapshot(PATHS.DB_FILES)
+	if snapshot_path is None:
+		return _create_main_db(snapshot=False)
+	return UhDbAccessor(snapshot_path)
+
 def preload_game_data(lock):
 	"""Preloads game data.
 	Keeps releasing and acquiring lock, runs until lock can't be acquired."""
@@ -536,7 +561,9 @@ def preload_game_data(lock):
 		import logging
 		from horizons.entities import Entities
 		log = logging.getLogger("preload")
-		mydb = _create_main_db() # create own db reader instance, since it's not thread-safe
+		# create own db reader instance, since it's not thread-safe.
+		# It reads the snapshot file, which is never written to.
+		mydb = _open_main_db_snapshot()
 		preload_functions = [ ActionSetLoader.load,
 		                      TileSetLoader.load,
 		                      Callback(Entities.load_grounds, mydb, load_now=True),
@@ -19,9 +19,12 @@
 # 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 # ###################################################
 
+import math
+import time
 import operator
 import logging
 import itertools
+from collections import defaultdict, deque
 
 from horizons.timer import Timer
 from horizons.scheduler import Scheduler
@@ -29,6 +32,7 @@ from horizons.util.worldobject import WorldObject
 from horizons.util.living import LivingObject
 from horizons.command.building import Build
 from horizons.network import CommandError, packets
+from horizons.world.checkupdigest import CheckupDigest
 
 class SPManager(LivingObject):
 	"""The manager class takes care of command issuing to the timermanager, sends tick-packets
@@ -64,8 +68,12 @@ class MPManager(LivingObject):
 	execution time and is also responsible for handling lags"""
 	log = logging.getLogger("mpmanager")
 	command_log = logging.getLogger("mpmanager.commands") # command executions
-	EXECUTIONDELAY = 4
-	HASHDELAY = 4
+	EXECUTIONDELAY = 4 # initial execution delay, it is adapted to the connection during the game
+	MIN_EXECUTIONDELAY = 2
+	MAX_EXECUTIONDELAY = 20
+	# the hash delay has to be the same on all clients at all times, so it is not adapted.
+	# it is as high as the highest execution delay, so that hash packets never cause a lag
+	HASHDELAY = MAX_EXECUTIONDELAY
 	HASH_EVAL_DISTANCE = 2 # interval, check hash every nth tick
 
 	def __init__(self, session, networkinterface):
@@ -86,6 +94,11 @@ class MPManager(LivingObject):
 		self.session.timer.add_call(self.hash_value_check)
 
 		self._last_local_commands_send_tick = -1 # last tick, where local commands got sent
+		self._last_execution_tick = None # last tick, for which a local command packet got sent
+
+		# current execution delay. It is only changed in tick(), so all clients agree on it
+		self.execution_delay = self.EXECUTIONDELAY
+		self.delay_controller = MPExecutionDelayController(self)
 
 	def end(self):
 		pass
@@ -102,6 +115,7 @@ class MPManager(LivingObject):
 		for packet in packets_received:
 			if isinstance(packet, CommandPacket):
 				self.log.debug("Got command packet from " + str(packet.player_id) + " for tick " + str(packet.tick))
+				self.delay_controller.add_packet(packet, tick)
 				self.commandsmanager.add_packet(packet)
 			elif isinstance(packet, CheckupHashPacket):
 				self.log.debug("Got checkuphash packet from " + str(packet.player_id) + " for tick " + str(packet.tick))
@@ -114,16 +128,7 @@ class MPManager(LivingObject):
 		# in case of lags this code would be executed multiple times for the same tick)
 		if self._last_local_commands_send_tick < tick:
 			self._last_local_commands_send_tick = tick
-			commandpacket = CommandPacket(self.calculate_execution_tick(tick),
-					self.session.world.player.worldid, self.gamecommands)
-			self.gamecommands = []
-			self.commandsmanager.add_packet(commandpacket)
-			self.log.debug("sending command for tick %d" % (commandpacket.tick))
-			self.networkinterface.send_packet(commandpacket)
-
-			self.localcommandsmanager.add_packet(CommandPacket(self.calculate_execution_tick(tick),
-					self.session.world.player.worldid, self.localcommands))
-			self.localcommands = []
+			self.send_command_packets(tick)
 
 			# check if we have to evaluate a hash value
 			if self.calculate_hash_tick(tick) % self.HASH_EVAL_DISTANCE == 0:
@@ -139,16 +144,45 @@ class MPManager(LivingObject):
 		# in the first few ticks, no data is available
 		if self.commandsmanager.is_tick_ready(tick) or tick < (Scheduler.FIRST_TICK_ID + self.EXECUTIONDELAY):
 			#self.log.debug("MPManager: check tick %s ready: yes", tick)
+			self.delay_controller.tick_ready(tick)
 			return Timer.TEST_PASS
 		else:
 			self.log.debug("MPManager: check tick %s ready: no", tick)
+			self.delay_controller.tick_stalled(tick, self.commandsmanager.get_missing_players(tick))
 			return Timer.TEST_SKIP
 
+	def send_command_packets(self, tick):
+		"""Sends the command packets of the local player in tick.
+		Usually, this is one packet for tick + execution delay. Every tick needs exactly one
+		packet per player though, so if the delay has been increased, empty packets are sent for
+		the ticks in between, and if it has been decreased, nothing is sent until the ticks
+		covered already have passed. The commands are kept for the next packet then."""
+		execution_tick = self.calculate_execution_tick(tick)
+		if self._last_execution_tick is None:
+			self._last_execution_tick = execution_tick - 1
+		elif execution_tick <= self._last_execution_tick:
+			return
+
+		player_id = self.session.world.player.worldid
+		delay_proposal = self.delay_controller.get_proposal(tick)
+		for packet_tick in xrange(self._last_execution_tick + 1, execution_tick + 1):
+			commandpacket = CommandPacket(packet_tick, player_id, self.gamecommands,
+			                              sent_tick=tick, delay_proposal=delay_proposal)
+			self.gamecommands = []
+			self.commandsmanager.add_packet(commandpacket)
+			self.log.debug("sending command for tick %d" % (commandpacket.tick))
+			self.networkinterface.send_packet(commandpacket)
+
+			self.localcommandsmanager.add_packet(CommandPacket(packet_tick, player_id, self.localcommands))
+			self.localcommands = []
+		self._last_execution_tick = execution_tick
+
 	def tick(self, tick):
 		"""Do the tick (execute all commands for this tick)
 		This code may only be reached if we are allowed to tick now (@see can_tick)"""
 		# calculate command packets for this tick
 		command_packets = self.commandsmanager.get_packets_for_tick(tick)
+		self.update_execution_delay(tick, command_packets)
 		command_packets.extend(self.localcommandsmanager.get_packets_for_tick(tick))
 		# sort by player, so that the packets get executed in the same order in every client
 		# (packets are already in a special order within the packets, so no further sorting is necessary)
@@ -160,6 +194,27 @@ class MPManager(LivingObject):
 				self.command_log.debug("MPManagerCommand: (tick %s): %s", tick, command)
 				command(WorldObject.get_object_by_id(command_packet.player_id))
 
+	def update_execution_delay(self, tick, command_packets):
+		"""Sets the execution delay to the highest one proposed in the packets of this tick.
+		All clients execute the same packets in a tick, so they all agree on the new delay,
+		which is used for the packets sent from the next tick on.
+		@param command_packets: the CommandPackets of all players for tick"""
+		proposals = [packet.delay_proposal for packet in command_packets if packet.delay_proposal is not None]
+		if not proposals:
+			return
+		delay = max(self.MIN_EXECUTIONDELAY, min(max(proposals), self.MAX_EXECUTIONDELAY))
+		if delay != self.execution_delay:
+			self.log.info("MPManager: changing execution delay from %s to %s in tick %s, statistics: %s",
+			              self.execution_delay, delay, tick, self.get_statistics())
+			self.execution_delay = delay
+
+	def get_statistics(self):
+		"""Returns the connection statistics, mainly for diagnostics.
+		@return: dict with the current 'execution_delay' and per player worldid in 'players'
+		         a dict with 'latency' and 'jitter' (in ticks), 'stalls' and 'stall_time' (in seconds)"""
+		return {'execution_delay': self.execution_delay,
+		        'players': self.delay_controller.get_statistics()}
+
 	def can_hash_value_check(self, tick):
 		if self.checkuphashmanager.is_tick_ready(tick) or tick < self.HASHDELAY:
 			return Timer.TEST_PASS
@@ -186,16 +241,18 @@ class MPManager(LivingObject):
 		self.log.error("Differences:")
 		if len(hash1) != len(hash2):
 			self.log.error("Different length")
-		items1 = sorted(hash1.iteritems())
-		items2 = sorted(hash2.iteritems())
+		names = ('rngvalue', ) + CheckupDigest.PART_NAMES
 		for i in xrange(min(len(hash1), len(hash2))):
-			if (items1[i] != items2[i]):
-				self.log.error(str(i)+": "+str(items1[i]))
-				self.log.error(str(i)+": "+str(items2[i]))
+			if hash1[i] != hash2[i]:
+				self.log.error("%s: %s != %s" % (names[i] if i < len(names) else i, hash1[i], hash2[i]))
+		# the hashes only tell which part differs, log the local values so they can be compared
+		self.log.error("Local state:")
+		for key, value in sorted(self.session.world.get_checkup_dump().iteritems()):
+			self.log.error("%s: %s" % (key, value))
 		self.log.error("------------------")
 
 	def calculate_execution_tick(self, tick):
-		return tick + self.EXECUTIONDELAY
+		return tick + self.execution_delay
 
 	def calculate_hash_tick(self, tick):
 		return tick + self.HASHDELAY
@@ -234,35 +291,73 @@ class MPManager(LivingObject):
 ################################################
 
 class MPPacketmanager(object):
+	"""Stores packets until their tick is executed.
+	Packets are kept in buckets per tick, which map the player to his packet. So the
+	check whether a tick is ready and getting its packets don't depend on how many
+	packets are pending. Buckets of ticks, that have passed, are dropped."""
 	log = logging.getLogger("mpmanager")
 	def __init__(self, mpmanager):
 		self.mpmanager = mpmanager
-		self.command_packet_list = []
+		self._packets = defaultdict(dict) # {tick: {player_id: packet}}
+		self._player_packets = defaultdict(dict) # {player_id: {tick: packet}}
+		self._next_tick = None # lowest tick, whose packets haven't been returned yet
 
 	def is_tick_ready(self, tick):
 		"""Check if packets from all players have arrived (necessary for tick to begin)"""
-		ready = len(self.get_packets_for_tick(tick, remove_returned_commands=False)) == self.mpmanager.get_player_count()
+		ready = len(self._packets.get(tick, ())) == self.mpmanager.get_player_count()
 		if not ready:
 			self.log.debug("tick not ready, packets: " + str(list(str(x) for x in self.get_packets_for_tick(tick, remove_returned_commands=False))))
 		return ready
 
 	def get_packets_for_tick(self, tick, remove_returned_commands=True):
-		"""Returns packets that are to be executed at a certain tick"""
-		command_packets = filter(lambda x: x.tick==tick, self.command_packet_list)
-		if remove_returned_commands:
-			self.command_packet_list = filter(lambda x: x.tick!=tick, self.command_packet_list)
-		return command_packets
+		"""Returns packets that are to be executed at a certain tick, sorted by player.
+		Removing them also drops the packets of all earlier ticks."""
+		if not remove_returned_commands:
+			packets = self._packets.get(tick, {})
+		else:
+			self._remove_ticks_before(tick)
+			packets = self._remove_tick(tick)
+			self._next_tick = max(self._next_tick, tick + 1)
+		return [packets[player_id] for player_id in sorted(packets)]
+
+	def _remove_tick(self, tick):
+		packets = self._packets.pop(tick, {})
+		for player_id in packets:
+			del self._player_packets[player_id][tick]
+		return packets
+
+	def _remove_ticks_before(self, tick):
+		if self._next_tick is None:
+			old_ticks = [old_tick for old_tick in self._packets if old_tick < tick]
+		else:
+			old_ticks = xrange(self._next_tick, tick)
+		for old_tick in old_ticks:
+			if self._remove_tick(old_tick):
+				self.log.debug("dropped packets for passed tick %s", old_tick)
+
+	def get_missing_players(self, tick):
+		"""Returns the worldids of the players whose packets for tick haven't arrived yet"""
+		packets = self._packets.get(tick, {})
+		return [player.worldid for player in self.mpmanager.session.world.players if player.worldid not in packets]
 
 	def get_packets_from_player(self, player_id):
 		"""
 		Returns all command this player has issued, that are not yet executed
 		@param player_id: worldid of player
 		"""
-		return filter(lambda x: x.player_id==player_id, self.command_packet_list)
+		packets = self._player_packets.get(player_id, {})
+		return [packets[tick] for tick in sorted(packets)]
 
 	def add_packet(self, command_packet):
 		"""Receive a packet"""
-		self.command_packet_list.append(command_packet)
+		tick, player_id = command_packet.tick, command_packet.player_id
+		if self._next_tick is not None and tick < self._next_tick:
+			self.log.warn("dropped packet from player %s for passed tick %s", player_id, tick)
+			return
+		if player_id in self._packets[tick]:
+			self.log.warn("got a second packet from player %s for tick %s, dropping the first", player_id, tick)
+		self._packets[tick][player_id] = command_packet
+		self._player_packets[player_id][tick] = command_packet
 
 class MPCommandsManager(MPPacketmanager):
 	pass
@@ -293,6 +388,108 @@ class MPCheckupHashManager(MPPacketmanager):
 				return False
 		return True
 
+# Adaption of the execution delay to the connection
+###################################################
+
+class MPExecutionDelayController(object):
+	"""Measures how the command packets of the other players arrive and proposes an execution delay.
+
+	For every packet, the transit time is the number of ticks between it being sent and its
+	arrival here. If the game had to wait for it, the time spent waiting is added, since
+	our tick counter doesn't advance meanwhile. The proposal covers the mean transit time plus
+	a multiple of the jitter (mean deviation) of the slowest player. It is raised at once,
+	but only lowered step by step and if the connection has clearly improved, so it
+	doesn't oscillate."""
+	log = logging.getLogger("mpmanager")
+	SAMPLES = 64 # number of transit times per player to consider
+	JITTER_FACTOR = 2
+	MARGIN = 1 # ticks
+	UPDATE_INTERVAL = 16 # ticks between recalculations of the proposal
+	DECREASE_THRESHOLD = 2 # ticks the proposal has to be below the current delay to lower it
+
+	def __init__(self, mpmanager):
+		self.mpmanager = mpmanager
+		self._transit_times = defaultdict(lambda: deque(maxlen=self.SAMPLES)) # {player_id: deque(ticks)}
+		self._stalls = defaultdict(int) # {player_id: number of stalls}
+		self._stall_time = defaultdict(float) # {player_id: seconds}
+		self._stalled_tick = None # tick we are waiting for, if any
+		self._stall_start = None
+		self._stall_players = []
+		self._proposal = mpmanager.EXECUTIONDELAY
+		self._proposal_tick = None # tick of the last recalculation
+
+	def add_packet(self, packet, tick):
+		"""Records the arrival of a CommandPacket from the network
+		@param tick: the tick we are currently trying to execute"""
+		if packet.sent_tick is None:
+			return
+		transit_time = tick - packet.sent_tick
+		if self._stalled_tick is not None:
+			transit_time += self._get_ticks_stalled()
+		self._transit_times[packet.player_id].append(transit_time)
+
+	def tick_stalled(self, tick, player_ids):
+		"""Called when a tick can't be executed because packets are missing
+		@param player_ids: worldids of the players we are waiting for"""
+		if self._stalled_tick == tick:
+			return
+		self._stalled_tick = tick
+		self._stall_start = time.time()
+		self._stall_players = player_ids
+		for player_id in player_ids:
+			self._stalls[player_id] += 1
+
+	def tick_ready(self, tick):
+		"""Called when a tick can be executed"""
+		if self._stalled_tick is None:
+			return
+		duration = time.time() - self._stall_start
+		for player_id in self._stall_players:
+			self._stall_time[player_id] += duration
+		self.log.debug("MPManager: waited %.3f seconds for tick %s", duration, self._stalled_tick)
+		self._stalled_tick = None
+		self._stall_start = None
+		self._stall_players = []
+
+	def _get_ticks_stalled(self):
+		ticks_per_second = self.mpmanager.session.timer.ticks_per_second
+		return int((time.time() - self._stall_start) * ticks_per_second)
+
+	def get_proposal(self, tick):
+		"""Returns the execution delay, that is proposed to the other players in tick"""
+		if self._proposal_tick is not None and tick - self._proposal_tick < self.UPDATE_INTERVAL:
+			return self._proposal
+		self._proposal_tick = tick
+
+		needed = 0
+		for transit_times in self._transit_times.itervalues():
+			if transit_times:
+				mean, jitter = self._get_mean_and_jitter(transit_times)
+				needed = max(needed, mean + self.JITTER_FACTOR * jitter)
+		needed = int(math.ceil(needed)) + self.MARGIN
+
+		current = self.mpmanager.execution_delay
+		if needed < current:
+			needed = current - 1 if current - needed >= self.DECREASE_THRESHOLD else current
+		self._proposal = max(self.mpmanager.MIN_EXECUTIONDELAY, min(needed, self.mpmanager.MAX_EXECUTIONDELAY))
+		return self._proposal
+
+	@staticmethod
+	def _get_mean_and_jitter(values):
+		mean = float(sum(values)) / len(values)
+		return mean, sum(abs(value - mean) for value in values) / len(values)
+
+	def get_statistics(self):
+		"""@return: {player_id: {'latency': ticks, 'jitter': ticks, 'stalls': int, 'stall_time': seconds}}"""
+		stats = {}
+		for player_id in set(self._transit_times) | set(self._stalls):
+			transit_times = self._transit_times.get(player_id)
+			mean, jitter = self._get_mean_and_jitter(transit_times) if transit_times else (None, None)
+			stats[player_id] = {'latency': mean, 'jitter': jitter,
+			                    'stalls': self._stalls.get(player_id, 0),
+			                    'stall_time': self._stall_time.get(player_id, 0.0)}
+		return stats
+
 # Packages transmitted over the network
 #######################################
 
@@ -313,6 +510,7 @@ class MPPacket(object):
 		see documentation inside horizons.network.packets.SafeUnpickler
 		"""
 		packets.SafeUnpickler.add('server', klass)
+		packets.WireFormat.add(klass)
 
 	def __str__(self):
 		return "packet " + str(self.__class__)  + " from player " + str(WorldObject.get_object_by_id(self.player_id)) + " for tick " + str(self.tick)
@@ -320,14 +518,23 @@ class MPPacket(object):
 class CommandPacket(MPPacket):
 	"""Packet to be sent from every player to every player every tick.
 	Contains list of packets to be executed as well as the designated execution time.
-	Also acts as ping (game will stop if a packet for a certain tick hasn't arrived)"""
-	def __init__(self, tick, player_id, commandlist):
+	Also acts as ping (game will stop if a packet for a certain tick hasn't arrived),
+	so it is sent even if there are no commands. Empty ones take about 20 bytes in the wire format.
+	Packets sent over the network also carry the tick they were sent in, to measure the
+	connection, and the execution delay their sender proposes (see MPExecutionDelayController)."""
+	network_fields = ('tick', 'player_id', 'commandlist', 'sent_tick', 'delay_proposal')
+
+	def __init__(self, tick, player_id, commandlist, sent_tick=None, delay_proposal=None):
 		super(CommandPacket, self).__init__(tick, player_id)
 		self.commandlist = commandlist
+		self.sent_tick = sent_tick
+		self.delay_proposal = delay_proposal
 
 MPPacket.allow_network(CommandPacket)
 
 class CheckupHashPacket(MPPacket):
+	network_fields = ('tick', 'player_id', 'checkup_hash')
+
 	def __init__(self, tick, player_id, checkup_hash):
 		super(CheckupHashPacket, self).__init__(tick, player_id)
 		self.checkup_hash = checkup_hash
@@ -22,6 +22,7 @@
 from collections import defaultdict
 
 from horizons.util.python.singleton import Singleton
+from horizons.util.tickprofiler import TickProfiler
 
 
 class MessageBus(object):
@@ -63,6 +64,10 @@ class MessageBus(object):
 	def broadcast(self, message):
 		"""Send a message to the bus and broadcast it to all recipients"""
 		messagetype = message.__class__
+		profiler = TickProfiler()
+		if profiler is not None:
+			profiler.begin_section()
+
 		for callback in self.global_receivers[messagetype]:
 			# Execute the callback
 			callback(message)
@@ -72,6 +77,9 @@ class MessageBus(object):
 			# Execute the callback
 			callback(message)
 
+		if profiler is not None:
+			profiler.end_section('message', messagetype.__name__)
+
 	def reset(self):
 		"""Reset to initial state. Drops all subscriptions"""
 		# there shouldn't be anything left now, warn if there is
@@ -33,6 +33,7 @@ from horizons.network import NetworkException, PacketTooLarge
 __version__ = '0.1'
 __all__ = [
 	'SafeUnpickler',
+	'WireFormat',
 	'packet',
 ]
 
@@ -158,7 +159,11 @@ SafeUnpickler.add('common', cmd_fatalerror)
 #-------------------------------------------------------------------------------
 
 def unserialize(data, validate=False, protocol=0):
-	mypacket = SafeUnpickler.loads(data)
+	if WireFormat.is_encoded(data):
+		# only game data is sent in the binary format, see game_data.serialize
+		mypacket = horizons.network.packets.client.game_data(WireFormat.loads(data))
+	else:
+		mypacket = SafeUnpickler.loads(data)
 	if validate:
 		if not inspect.isfunction(mypacket.validate):
 			raise NetworkException("Attempt to override packet.validate()")
@@ -169,6 +174,7 @@ def unserialize(data, validate=False, protocol=0):
 
 #-------------------------------------------------------------------------------
 
+from horizons.network.packets.wireformat import WireFormat
 import horizons.network.packets.server
 import horizons.network.packets.client
 
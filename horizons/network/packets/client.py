@@ -22,7 +22,7 @@
 import uuid
 
 from horizons.network import NetworkException, SoftNetworkException
-from horizons.network.packets import packet, SafeUnpickler
+from horizons.network.packets import packet, SafeUnpickler, WireFormat
 
 class cmd_creategame(packet):
 	clientversion = None
@@ -249,9 +249,17 @@ SafeUnpickler.add('client', cmd_preparedgame)
 #-------------------------------------------------------------------------------
 
 class game_data(packet):
+	"""Data of a running game. The server passes it on to the other players without looking at it."""
 	def __init__(self, data):
 		self.data = data
 
+	def serialize(self):
+		# the binary format doesn't carry the sid, the server doesn't check it for running games
+		try:
+			return WireFormat.dumps(self.data)
+		except TypeError:
+			return super(game_data, self).serialize()
+
 # origin is 'server' as clients will send AND receive them
 SafeUnpickler.add('server', game_data)
 
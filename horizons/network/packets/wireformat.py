@@ -0,0 +1,269 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA	02110-1301	USA
+# ###################################################
+
+
+"""Compact binary encoding of the data that is exchanged while a multiplayer game is running
+(CommandPackets with their commands and CheckupHashPackets, see horizons.manager).
+
+Pickle is still used for everything else, especially the lobby protocol. Compared to it,
+the encoding doesn't carry module and class names, but a 32 bit id per class, and knows
+the attributes of classes that define `network_fields`, so they are sent without names.
+Only classes added via WireFormat.add can be decoded, their instances are created without
+calling any code of the class, just like pickle does.
+
+Format: HEADER, then one value. Every value starts with a tag byte:
+- None, True, False: just the tag
+- int, long: zigzag encoded varint, or 8 bytes for numbers in [2**32, 2**64)
+- float: 8 byte IEEE 754 double
+- str, unicode (utf-8): varint length and the bytes
+- tuple, list, set: varint length and the items
+- dict: varint length and the keys and values
+- objects: class id (4 byte crc32 of the class path), then either the values of
+  the network_fields of the class or a dict of all attributes
+"""
+
+import struct
+import zlib
+
+from horizons.network import NetworkException
+
+WIRE_FORMAT_VERSION = 1
+HEADER = 'U' + chr(WIRE_FORMAT_VERSION) # pickled data starts with '\x80'
+
+# the recursion depth of decoded values is limited, commands only use a few levels
+MAX_DEPTH = 16
+
+TAG_NONE = 'N'
+TAG_TRUE = 'T'
+TAG_FALSE = 'F'
+TAG_INT = 'I'
+TAG_UINT64 = 'Q' # large positive numbers like hashes, faster than long varints
+TAG_FLOAT = 'D'
+TAG_STR = 'S'
+TAG_UNICODE = 'U'
+TAG_TUPLE = '('
+TAG_LIST = '['
+TAG_SET = '<'
+TAG_DICT = '{'
+TAG_FIELDS_OBJECT = 'O' # attributes given by network_fields
+TAG_DICT_OBJECT = 'o' # attributes as dict
+
+CLASS_ID = struct.Struct('<I')
+UINT64 = struct.Struct('<Q')
+FLOAT = struct.Struct('<d')
+
+class WireFormat(object):
+	"""Registry of the classes that can be sent in the binary format, and the en- and decoder.
+
+	NOTE: this is a security related class, see the notes at SafeUnpickler. Only add classes
+	whose instances can't do any harm whatever their attributes are."""
+
+	# {class id: class}
+	_classes = {}
+	# {class: class id}
+	_class_ids = {}
+
+	@classmethod
+	def add(cls, klass):
+		"""Allows instances of klass to be sent.
+		If klass has an attribute `network_fields`, a tuple of attribute names, instances that have
+		exactly these attributes are encoded without the names."""
+		if klass in cls._class_ids:
+			return
+		class_id = zlib.crc32('%s.%s' % (klass.__module__, klass.__name__)) & 0xffffffff
+		if class_id in cls._classes:
+			raise RuntimeError("Class id of %s collides with the one of %s" % (klass, cls._classes[class_id]))
+		cls._classes[class_id] = klass
+		cls._class_ids[klass] = class_id
+
+	@classmethod
+	def is_encoded(cls, data):
+		"""Returns whether data has been created by dumps (instead of pickle)."""
+		return data[:1] == HEADER[0]
+
+	@classmethod
+	def dumps(cls, obj):
+		"""Encodes obj.
+		@return: str
+		@throws TypeError if obj contains something that can't be encoded"""
+		out = [HEADER]
+		cls._encode(obj, out)
+		return ''.join(out)
+
+	@classmethod
+	def loads(cls, data):
+		"""Decodes data created by dumps.
+		@throws NetworkException if data is invalid"""
+		if data[:len(HEADER)] != HEADER:
+			raise NetworkException("Unknown wire format version")
+		try:
+			obj, offset = cls._decode(data, len(HEADER), 0)
+		except (IndexError, struct.error, UnicodeDecodeError) as e:
+			raise NetworkException("Malformed packet: %s" % e)
+		if offset != len(data):
+			raise NetworkException("Malformed packet: trailing data")
+		return obj
+
+	@classmethod
+	def _encode(cls, value, out):
+		value_type = type(value)
+		if value is None:
+			out.append(TAG_NONE)
+		elif value is True:
+			out.append(TAG_TRUE)
+		elif value is False:
+			out.append(TAG_FALSE)
+		elif (value_type is int or value_type is long) and 0xffffffff < value <= 0xffffffffffffffff:
+			out.append(TAG_UINT64)
+			out.append(UINT64.pack(value))
+		elif value_type is int or value_type is long:
+			out.append(TAG_INT)
+			_encode_varint((value << 1) if value >= 0 else ((-value << 1) - 1), out)
+		elif value_type is float:
+			out.append(TAG_FLOAT)
+			out.append(FLOAT.pack(value))
+		elif value_type is str:
+			out.append(TAG_STR)
+			_encode_varint(len(value), out)
+			out.append(value)
+		elif value_type is unicode:
+			value = value.encode('utf-8')
+			out.append(TAG_UNICODE)
+			_encode_varint(len(value), out)
+			out.append(value)
+		elif value_type is tuple or value_type is list or value_type is set:
+			if value_type is set:
+				out.append(TAG_SET)
+				value = sorted(value) # same encoding on every machine
+			else:
+				out.append(TAG_TUPLE if value_type is tuple else TAG_LIST)
+			_encode_varint(len(value), out)
+			for item in value:
+				cls._encode(item, out)
+		elif value_type is dict:
+			out.append(TAG_DICT)
+			_encode_varint(len(value), out)
+			for key in sorted(value):
+				cls._encode(key, out)
+				cls._encode(value[key], out)
+		elif value_type in cls._class_ids:
+			attributes = value.__dict__
+			fields = getattr(value_type, 'network_fields', None)
+			if fields is not None and len(fields) == len(attributes) and all(field in attributes for field in fields):
+				out.append(TAG_FIELDS_OBJECT)
+				out.append(CLASS_ID.pack(cls._class_ids[value_type]))
+				for field in fields:
+					cls._encode(attributes[field], out)
+			else:
+				out.append(TAG_DICT_OBJECT)
+				out.append(CLASS_ID.pack(cls._class_ids[value_type]))
+				cls._encode(attributes, out)
+		else:
+			raise TypeError("Can't encode %s" % value_type)
+
+	@classmethod
+	def _decode(cls, data, offset, depth):
+		"""Decodes the value at data[offset:].
+		@return: tuple (value, offset after the value)"""
+		if depth > MAX_DEPTH:
+			raise NetworkException("Malformed packet: too deeply nested")
+		tag = data[offset]
+		offset += 1
+		if tag == TAG_INT:
+			value, offset = _decode_varint(data, offset)
+			return ((value >> 1) if not value & 1 else -((value + 1) >> 1)), offset
+		elif tag == TAG_UINT64:
+			return UINT64.unpack_from(data, offset)[0], offset + UINT64.size
+		elif tag == TAG_NONE:
+			return None, offset
+		elif tag == TAG_TRUE:
+			return True, offset
+		elif tag == TAG_FALSE:
+			return False, offset
+		elif tag == TAG_FLOAT:
+			return FLOAT.unpack_from(data, offset)[0], offset + FLOAT.size
+		elif tag == TAG_STR or tag == TAG_UNICODE:
+			length, offset = _decode_varint(data, offset)
+			if offset + length > len(data):
+				raise NetworkException("Malformed packet: string too long")
+			value = data[offset:offset + length]
+			if tag == TAG_UNICODE:
+				value = value.decode('utf-8')
+			return value, offset + length
+		elif tag == TAG_TUPLE or tag == TAG_LIST or tag == TAG_SET:
+			length, offset = _decode_varint(data, offset)
+			items = []
+			for i in xrange(length):
+				item, offset = cls._decode(data, offset, depth + 1)
+				items.append(item)
+			if tag == TAG_TUPLE:
+				return tuple(items), offset
+			elif tag == TAG_SET:
+				return set(items), offset
+			return items, offset
+		elif tag == TAG_DICT:
+			length, offset = _decode_varint(data, offset)
+			value = {}
+			for i in xrange(length):
+				key, offset = cls._decode(data, offset, depth + 1)
+				value[key], offset = cls._decode(data, offset, depth + 1)
+			return value, offset
+		elif tag == TAG_FIELDS_OBJECT or tag == TAG_DICT_OBJECT:
+			class_id = CLASS_ID.unpack_from(data, offset)[0]
+			offset += CLASS_ID.size
+			if class_id not in cls._classes:
+				raise NetworkException("Attempting to decode unknown class %08x" % class_id)
+			klass = cls._classes[class_id]
+			if tag == TAG_FIELDS_OBJECT:
+				fields = getattr(klass, 'network_fields', None)
+				if fields is None:
+					raise NetworkException("Malformed packet: %s has no network fields" % klass.__name__)
+				attributes = {}
+				for field in fields:
+					attributes[field], offset = cls._decode(data, offset, depth + 1)
+			else:
+				attributes, offset = cls._decode(data, offset, depth + 1)
+				if type(attributes) is not dict or not all(type(key) is str for key in attributes):
+					raise NetworkException("Malformed packet: invalid attributes of %s" % klass.__name__)
+			obj = klass.__new__(klass)
+			obj.__dict__.update(attributes)
+			return obj, offset
+		raise NetworkException("Malformed packet: unknown tag %r" % tag)
+
+def _encode_varint(value, out):
+	"""Appends the unsigned int value in 7 bit groups, least significant first."""
+	while value > 0x7f:
+		out.append(chr(0x80 | (value & 0x7f)))
+		value >>= 7
+	out.append(chr(value))
+
+def _decode_varint(data, offset):
+	value = 0
+	shift = 0
+	while True:
+		byte = ord(data[offset])
+		offset += 1
+		value |= (byte & 0x7f) << shift
+		if not byte & 0x80:
+			return value, offset
+		shift += 7
+		if shift > 70: # longer than any 64 bit value
+			raise NetworkException("Malformed packet: varint too long")
@@ -287,6 +287,10 @@ class Server(object):
 		if player.game is not None and player.game.state is Game.State.Running:
 			self.call_callbacks('gamedata', player, event.packet.data)
 			return
+		if packets.WireFormat.is_encoded(event.packet.data):
+			# game data that arrived after the game has ended, it has no session id to check
+			logging.debug("[RECEIVE] Ignoring game data from %s outside of a running game" % (peer.address))
+			return
 
 		packet = None
 		try:
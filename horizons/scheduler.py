@@ -20,23 +20,25 @@
 # ###################################################
 
 import logging
-from collections import deque
+import time
 
 import horizons.main
 
 from horizons.util.living import LivingObject
 from horizons.util.python.singleton import ManualConstructionSingleton
+from horizons.util.tickprofiler import TickProfiler
 from horizons.constants import GAME
 
 class Scheduler(LivingObject):
 	""""Class providing timed callbacks.
 	Master of time.
 
-	TODO:
-	- Refactor to use a data structure that is suitable for iteration (ticking) as well as
-	  searching/deleting by instance, possibly also by callback.
-	  Suggestion: { tick -> { instance -> [callback] }} (basically a k-d tree)
-
+	Callbacks are kept in a timing wheel with one slot per tick: self.schedule maps a tick
+	to a bucket { sequence number -> CallbackObject }. Sequence numbers increase with every
+	insertion, so executing a bucket in sequence order reproduces the order in which the calls
+	were added (multiplayer games depend on that). Every CallbackObject remembers its slot and
+	sequence number and is additionally indexed by its instance, therefore adding, removing and
+	looking up calls does not require scanning the schedule.
 
 	@param timer: Timer instance the schedular registers itself with.
 	"""
@@ -52,10 +54,11 @@ class Scheduler(LivingObject):
 		@param timer: Timer obj
 		"""
 		super(Scheduler, self).__init__()
-		self.schedule = {}
+		self.schedule = {} # { tick -> { seq -> CallbackObject } }
 		self.additional_cur_tick_schedule = [] # jobs to be executed at the same tick they were added
-		self.calls_by_instance = {} # for get_classinst_calls
+		self.calls_by_instance = {} # { instance -> set(CallbackObject) }, for get_classinst_calls
 		self.cur_tick = self.__class__.FIRST_TICK_ID-1 # before ticking
+		self._next_seq = 0
 		self.timer = timer
 		self.timer.add_call(self.tick)
 
@@ -77,42 +80,45 @@ class Scheduler(LivingObject):
 			horizons.main.quit()
 			return
 
-		if self.cur_tick in self.schedule:
-			self.log.debug("Scheduler: tick %s, cbs: %s", self.cur_tick, len(self.schedule[self.cur_tick]))
+		profiler = TickProfiler()
+		if profiler is not None:
+			start = time.time()
 
-			# use iteration method that works in case the list is altered during iteration
-			# this can happen for e.g. rem_all_classinst_calls
+		if self.cur_tick in self.schedule:
 			cur_schedule = self.schedule[self.cur_tick]
-			while cur_schedule:
-				callback = cur_schedule.popleft()
-				# TODO: some system-level unit tests fail if this list is not processed in the correct order
-				#       (i.e. if e.g. pop() was used here). This is an indication of invalid assumptions
-				#       in the program and should be fixed.
-
-				if hasattr(callback, "invalid"):
-					self.log.debug("S(t:%s): %s: INVALID", tick_id, callback)
+			self.log.debug("Scheduler: tick %s, cbs: %s", self.cur_tick, len(cur_schedule))
+
+			# Callbacks can remove other calls of this tick (e.g. rem_all_classinst_calls),
+			# those are gone from the bucket by the time we get to them.
+			# Nothing can be added to the current bucket, run_in=0 goes to the additional jobs.
+			for seq in sorted(cur_schedule):
+				callback = cur_schedule.pop(seq, None)
+				if callback is None:
 					continue
 				self.log.debug("S(t:%s): %s", tick_id, callback)
-				callback.callback()
+				if profiler is None:
+					callback.callback()
+				else:
+					profiler.call('scheduler', callback.callback)
 				assert callback.loops >= -1
+				instance_calls = self.calls_by_instance.get(callback.class_instance)
+				if instance_calls is None or callback not in instance_calls:
+					continue # removed while executing, e.g. by rem_all_classinst_calls
 				if callback.loops != 0:
 					self.add_object(callback, readd=True)
 				else: # gone for good
-					if callback.class_instance in self.calls_by_instance:
-						# this can already be removed by e.g. rem_all_classinst_calls
-						if callback.finish_callback is not None:
-							callback.finish_callback()
-
-						try:
-							self.calls_by_instance[callback.class_instance].remove(callback)
-						except ValueError:
-							pass # also the callback can be deleted by e.g. rem_call
+					if callback.finish_callback is not None:
+						callback.finish_callback()
+					self._unregister(callback)
 			del self.schedule[self.cur_tick]
 
 			self.log.debug("Scheduler: finished tick %s", self.cur_tick)
 
 		# run jobs added in the loop above
-		self._run_additional_jobs()
+		self._run_additional_jobs(profiler)
+
+		if profiler is not None:
+			profiler.end_tick(tick_id, time.time() - start)
 
 		assert (not self.schedule) or self.schedule.iterkeys().next() > self.cur_tick
 
@@ -124,10 +130,13 @@ class Scheduler(LivingObject):
 		"""
 		self._run_additional_jobs()
 
-	def _run_additional_jobs(self):
+	def _run_additional_jobs(self, profiler=None):
 		for callback in self.additional_cur_tick_schedule:
 			assert callback.loops == 0 # can't loop with no delay
-			callback.callback()
+			if profiler is None:
+				callback.callback()
+			else:
+				profiler.call('scheduler', callback.callback)
 		self.additional_cur_tick_schedule = []
 
 	def add_object(self, callback_obj, readd=False):
@@ -143,13 +152,15 @@ class Scheduler(LivingObject):
 			interval = callback_obj.loop_interval if readd else callback_obj.run_in
 			tick_key = self.cur_tick + interval
 			if not tick_key in self.schedule:
-				self.schedule[tick_key] = deque()
+				self.schedule[tick_key] = {}
 			callback_obj.tick = tick_key
-			self.schedule[tick_key].append(callback_obj)
-			if not readd:  # readded calls haven't been removed here
+			callback_obj.seq = self._next_seq
+			self._next_seq += 1
+			self.schedule[tick_key][callback_obj.seq] = callback_obj
+			if not readd:  # readded calls are still registered
 				if not callback_obj.class_instance in self.calls_by_instance:
-					self.calls_by_instance[callback_obj.class_instance] = []
-				self.calls_by_instance[callback_obj.class_instance].append( callback_obj )
+					self.calls_by_instance[callback_obj.class_instance] = set()
+				self.calls_by_instance[callback_obj.class_instance].add(callback_obj)
 
 	def add_new_object(self, callback, class_instance, run_in=1, loops=1, loop_interval=None, finish_callback=None):
 		"""Creates a new CallbackObject instance and calls the self.add_object() function.
@@ -161,37 +172,41 @@ class Scheduler(LivingObject):
 		callback_obj = _CallbackObject(self, callback, class_instance, run_in, loops, loop_interval, finish_callback=finish_callback)
 		self.add_object(callback_obj)
 
+	def _unschedule(self, callback_obj):
+		"""Takes a CallbackObject out of its tick slot.
+		@return: bool, whether it was scheduled"""
+		bucket = self.schedule.get(callback_obj.tick)
+		if bucket is None or bucket.pop(callback_obj.seq, None) is None:
+			return False
+		if not bucket and callback_obj.tick != self.cur_tick:
+			# the bucket of the current tick is deleted by tick()
+			del self.schedule[callback_obj.tick]
+		callback_obj.tick = None
+		return True
+
+	def _unregister(self, callback_obj):
+		"""Removes a CallbackObject from the instance index."""
+		instance_calls = self.calls_by_instance[callback_obj.class_instance]
+		instance_calls.discard(callback_obj)
+		if not instance_calls:
+			del self.calls_by_instance[callback_obj.class_instance]
+
 	def rem_object(self, callback_obj):
 		"""Removes a CallbackObject from all callback lists
 		@param callback_obj: CallbackObject to remove
 		@return: int, number of removed calls
 		"""
-		removed_objs = 0
-		if self.schedule is not None:
-			for key in self.schedule:
-				while callback_obj in self.schedule[key]:
-					self.schedule[key].remove(callback_obj)
-					self.calls_by_instance[callback_obj.class_instance].remove(callback_obj)
-					removed_objs += 1
-
-		if not self.calls_by_instance[callback_obj.class_instance]:
-			del self.calls_by_instance[callback_obj.class_instance]
-
-		return removed_objs
+		if self.schedule is None or not self._unschedule(callback_obj):
+			return 0
+		self._unregister(callback_obj)
+		return 1
 
 	def rem_all_classinst_calls(self, class_instance):
 		"""Removes all callbacks from the scheduler that belong to the class instance class_inst."""
-		"""
-		for key in self.schedule:
-			callback_objects = self.schedule[key]
-			for i in xrange(len(callback_objects) - 1, -1, -1):
-				if callback_objects[i].class_instance is class_instance:
-					del callback_objects[i]
-		"""
-		if class_instance in self.calls_by_instance:
-			for callback_obj in self.calls_by_instance[class_instance]:
-				callback_obj.invalid = True # don't remove, finding them all takes too long
-			del self.calls_by_instance[class_instance]
+		instance_calls = self.calls_by_instance.pop(class_instance, None)
+		if instance_calls is not None:
+			for callback_obj in instance_calls:
+				self._unschedule(callback_obj)
 
 		# filter additional callbacks as well
 		self.additional_cur_tick_schedule = \
@@ -206,30 +221,17 @@ class Scheduler(LivingObject):
 		"""
 		assert callable(callback)
 		removed_calls = 0
-		for key in self.schedule:
-			callback_objects = self.schedule[key]
-			for i in xrange(len(callback_objects) - 1, -1, -1):
-				if (callback_objects[i].class_instance is instance
-				    and callback_objects[i].callback == callback
-				    and not hasattr(callback_objects[i], "invalid")):
-					del callback_objects[i]
+		if instance in self.calls_by_instance:
+			for callback_obj in [obj for obj in self.calls_by_instance[instance] if obj.callback == callback]:
+				# calls that are currently executing are not affected
+				if self._unschedule(callback_obj):
+					self._unregister(callback_obj)
 					removed_calls += 1
 
-		test = 0
-		if removed_calls > 0: # there also must be calls in the calls_by_instance dict
-			for i in xrange(len(self.calls_by_instance[instance]) - 1, -1, -1):
-				obj = self.calls_by_instance[instance][i]
-				if obj.callback == callback:
-					del self.calls_by_instance[instance][i]
-					test += 1
-			assert test == removed_calls, "%s, %s" % (test, removed_calls)
-			if not self.calls_by_instance[instance]:
-				del self.calls_by_instance[instance]
-
 		for i in xrange(len(self.additional_cur_tick_schedule) - 1, -1, -1):
 			if self.additional_cur_tick_schedule[i].class_instance is instance and \
 				self.additional_cur_tick_schedule[i].callback == callback:
-					del callback_objects[i]
+					del self.additional_cur_tick_schedule[i]
 					removed_calls += 1
 
 		return removed_calls
@@ -245,7 +247,7 @@ class Scheduler(LivingObject):
 		calls = {}
 		if instance in self.calls_by_instance:
 			for callback_obj in self.calls_by_instance[instance]:
-				if  callback is None or callback_obj.callback == callback:
+				if callback is None or callback_obj.callback == callback:
 					calls[callback_obj] = callback_obj.tick - self.cur_tick
 		return calls
 
@@ -289,6 +291,8 @@ class _CallbackObject(object):
 		self.loops = loops
 		self.loop_interval = loop_interval if loop_interval is not None else run_in
 		self.class_instance = class_instance
+		self.tick = None # tick slot in the scheduler
+		self.seq = None # position in the tick slot
 
 	def __str__(self):
 		cb = str(self.callback)
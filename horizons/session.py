@@ -32,10 +32,11 @@ import horizons.globals
 import horizons.main
 
 from horizons.ai.aiplayer import AIPlayer
+from horizons.ai.aiplayer.deferredplan import DeferredPlan
 from horizons.gui.ingamegui import IngameGui
 from horizons.gui.mousetools import SelectionTool, PipetteTool, TearingTool, BuildingTool, AttackingTool, TileLayingTool
 from horizons.command.building import Tear
-from horizons.util.dbreader import DbReader
+from horizons.util.savegamewriter import SavegameSnapshot, SavegameWriter
 from horizons.command.unit import RemoveUnit
 from horizons.gui.keylisteners import IngameKeyListener
 from horizons.scheduler import Scheduler
@@ -107,6 +108,7 @@ class Session(LivingObject):
 		self.is_alive = True
 
 		self._clear_caches()
+		DeferredPlan.start_pool() # fork the AI planning processes before the session starts any threads
 
 		#game
 		self.random = self.create_rng(rng_seed)
@@ -139,6 +141,7 @@ class Session(LivingObject):
 		self.selection_groups = [set() for _ in range(10)]  # List of sets that holds the player assigned unit groups.
 
 		self._old_autosave_interval = None
+		self._background_save = None # (SavegameSnapshot, callback) of the savegame being written
 
 	def in_editor_mode(self):
 		return False
@@ -204,6 +207,7 @@ class Session(LivingObject):
 
 	def end(self):
 		self.log.debug("Ending session")
+		self.wait_for_background_save()
 		self.is_alive = False
 
 		self.gui.session = None
@@ -241,6 +245,7 @@ class Session(LivingObject):
 
 		Scheduler().end()
 		Scheduler.destroy_instance()
+		DeferredPlan.stop_pool()
 
 		self.selected_instances = None
 		self.selection_groups = None
@@ -512,12 +517,13 @@ class Session(LivingObject):
 		@param savegame: absolute path"""
 		assert os.path.isabs(savegame)
 		self.log.debug("Session: Saving to %s", savegame)
+		self.wait_for_background_save()
 		try:
 			if os.path.exists(savegame):
 				os.unlink(savegame)
 			self.savecounter += 1
 
-			db = DbReader(savegame)
+			db = SavegameWriter(savegame)
 		except IOError as e: # usually invalid filename
 			headline = _("Failed to create savegame file")
 			descr = _("There has been an error while creating your savegame file.")
@@ -536,21 +542,7 @@ class Session(LivingObject):
 			read_savegame_template(db)
 
 			db("BEGIN")
-			self.world.save(db)
-			#self.manager.save(db)
-			self.view.save(db)
-			self.ingame_gui.save(db)
-			self.scenario_eventhandler.save(db)
-			LastActivePlayerSettlementManager().save(db)
-
-			for instance in self.selected_instances:
-				db("INSERT INTO selected(`group`, id) VALUES(NULL, ?)", instance.worldid)
-			for group in xrange(len(self.selection_groups)):
-				for instance in self.selection_groups[group]:
-					db("INSERT INTO selected(`group`, id) VALUES(?, ?)", group, instance.worldid)
-
-			rng_state = json.dumps(self.random.getstate())
-			SavegameManager.write_metadata(db, self.savecounter, rng_state)
+			self._save(db)
 			# make sure everything gets written now
 			db("COMMIT")
 			db.close()
@@ -561,3 +553,66 @@ class Session(LivingObject):
 			db.close() # close db before delete
 			os.unlink(savegame) # remove invalid savegamefile
 			return False
+
+	def _save(self, db):
+		"""Writes the state of the game to db.
+		@param db: SavegameWriter or SavegameSnapshot"""
+		self.world.save(db)
+		#self.manager.save(db)
+		self.view.save(db)
+		self.ingame_gui.save(db)
+		self.scenario_eventhandler.save(db)
+		LastActivePlayerSettlementManager().save(db)
+
+		for instance in self.selected_instances:
+			db("INSERT INTO selected(`group`, id) VALUES(NULL, ?)", instance.worldid)
+		for group in xrange(len(self.selection_groups)):
+			for instance in self.selection_groups[group]:
+				db("INSERT INTO selected(`group`, id) VALUES(?, ?)", group, instance.worldid)
+
+		rng_state = json.dumps(self.random.getstate())
+		SavegameManager.write_metadata(db, self.savecounter, rng_state)
+
+	def _do_save_in_background(self, savegame, callback=None):
+		"""Saves the game like _do_save, but the savegame file is written in another thread.
+		Only the state of the game is collected here, the game can continue while it is written.
+		@param savegame: absolute path
+		@param callback: called with whether saving succeeded once the file has been written"""
+		assert os.path.isabs(savegame)
+		self.log.debug("Session: Saving to %s in the background", savegame)
+		self.wait_for_background_save()
+		self.savecounter += 1
+
+		snapshot = SavegameSnapshot()
+		try:
+			self._save(snapshot)
+		except:
+			print "Save Exception"
+			traceback.print_exc()
+			if callback is not None:
+				callback(False)
+			return
+
+		snapshot.write_in_background(savegame)
+		self._background_save = (snapshot, callback)
+		ExtScheduler().add_new_object(self._check_background_save, self, run_in=0.2)
+
+	def _check_background_save(self):
+		if self._background_save is None:
+			return
+		if self._background_save[0].is_writing():
+			ExtScheduler().add_new_object(self._check_background_save, self, run_in=0.2)
+		else:
+			self.wait_for_background_save()
+
+	def wait_for_background_save(self):
+		"""Waits until the savegame that is written in the background (if any) is finished
+		and calls its callback."""
+		if self._background_save is None:
+			return
+		snapshot, callback = self._background_save
+		self._background_save = None
+		ExtScheduler().rem_call(self, self._check_background_save)
+		snapshot.join()
+		if callback is not None:
+			callback(snapshot.success)
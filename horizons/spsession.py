@@ -60,7 +60,10 @@ class SPSession(Session):
 			return
 
 		self.log.debug("Session: autosaving")
-		success = self._do_save(SavegameManager.create_autosave_filename())
+		# the file is written in the background, the game doesn't have to stop for it
+		self._do_save_in_background(SavegameManager.create_autosave_filename(), self._on_autosaved)
+
+	def _on_autosaved(self, success):
 		if success:
 			SavegameManager.delete_dispensable_savegames(autosaves = True)
 			self.ingame_gui.message_widget.add(point=None, string_id='AUTOSAVE')
@@ -25,6 +25,7 @@ import horizons.globals
 from horizons.util.living import LivingObject
 from horizons.constants import GAME, GAME_SPEED
 from horizons.scheduler import Scheduler
+from horizons.util.tickprofiler import TickProfiler
 
 class Timer(LivingObject):
 	"""
@@ -95,9 +96,13 @@ class Timer(LivingObject):
 		"""check_tick is called by the engines _pump function to signal a frame idle."""
 		if self.ticks_per_second == 0:
 			return
+		profiler = TickProfiler()
 		while time.time() >= self.tick_next_time and (GAME.MAX_TICKS is None or self.tick_next_id <= GAME.MAX_TICKS):
 			for f in self.tick_func_test:
-				r = f(self.tick_next_id)
+				if profiler is None:
+					r = f(self.tick_next_id)
+				else:
+					r = profiler.call('timer_test', f, self.tick_next_id)
 				if r == self.TEST_SKIP:
 					# If a callback changed the speed to zero, we have to exit
 					if self.ticks_per_second != 0:
@@ -108,6 +113,7 @@ class Timer(LivingObject):
 				diff = time.time() - self.tick_next_time
 				if diff > self.ACCEPTABLE_TICK_DELAY:
 					self.tick_next_time += self.DEFER_TICK_ON_DELAY_BY
+			# not profiled here, the scheduler tick (usually the only call) profiles itself
 			for f in self.tick_func_call:
 				f(self.tick_next_id)
 			self.tick_next_id += 1
@@ -115,3 +121,28 @@ class Timer(LivingObject):
 				# If a callback changed the speed to zero, we have to exit
 				return
 			self.tick_next_time = (self.tick_next_time or time.time()) + 1.0 / self.ticks_per_second
+
+	def fast_forward(self, max_ticks=None, max_time=None, condition=None):
+		"""Runs ticks as fast as possible instead of waiting for their time to come.
+		This doesn't return before one of the stop conditions is met, the engine isn't pumped
+		in the meantime. Therefore it's only useful when running without gui (see --headless).
+		@param max_ticks: stop at this tick id, like GAME.MAX_TICKS (the tick itself isn't run)
+		@param max_time: maximum wall time in seconds
+		@param condition: callable, checked before every tick, stops when it returns True
+		@return: number of ticks that have been run
+		"""
+		start_tick_id = self.tick_next_id
+		end_time = None if max_time is None else time.time() + max_time
+		tick_func_test = self.tick_func_test
+		tick_func_call = self.tick_func_call
+		while max_ticks is None or self.tick_next_id < max_ticks:
+			if end_time is not None and time.time() >= end_time:
+				break
+			if condition is not None and condition():
+				break
+			if any(f(self.tick_next_id) == self.TEST_SKIP for f in tick_func_test):
+				break # waiting for something, e.g. other players in mp games
+			for f in tick_func_call:
+				f(self.tick_next_id)
+			self.tick_next_id += 1
+		return self.tick_next_id - start_tick_id
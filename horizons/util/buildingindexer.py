@@ -19,6 +19,8 @@
 # 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 # ###################################################
 
+from collections import OrderedDict
+
 from horizons.util.python import decorators
 
 
@@ -29,8 +31,16 @@ class BuildingIndexer(object):
 
 	Used to answer queries of the form 'I am at (x, y), where is the closest / random
 	building that provides resource X in my range'.
+
+	The buildings are kept in buckets of CELL_SIZE x CELL_SIZE tiles by the upper left
+	corner of their position. The buildings in range of a tile are collected from the
+	buckets when they are asked for. Since some tiles are asked for over and over again,
+	the results of the last CACHE_SIZE tiles are kept until a building in their range changes.
 	"""
 
+	CELL_SIZE = 8
+	CACHE_SIZE = 256
+
 	def __init__(self, radius, coords_list, random=None, buildings=None):
 		"""
 		Create a BuildingIndexer
@@ -40,67 +50,120 @@ class BuildingIndexer(object):
 		@param buildings: initial list of buildings. Will only be read.
 		"""
 		self.radius = radius
-		self._map = {}
-		for coords in coords_list:
-			self._map[coords] = BuildingIndex(coords, random)
-		self._add_set = set()
-		self._remove_set = set()
-		self._changed = False
+		self._random = random
+
+		# bitmap of the coords that can be asked for
+		coords_list = list(coords_list)
+		if coords_list:
+			self._left = min(x for x, y in coords_list)
+			self._top = min(y for x, y in coords_list)
+			self._width = max(x for x, y in coords_list) - self._left + 1
+			self._height = max(y for x, y in coords_list) - self._top + 1
+		else:
+			self._left = self._top = self._width = self._height = 0
+		self._map = bytearray(self._width * self._height)
+		for x, y in coords_list:
+			self._map[(x - self._left) * self._height + y - self._top] = 1
+
+		self._cells = {} # {(cell_x, cell_y): set of buildings}
+		self._max_size = 1 # width or height of the largest building
+		self._cache = OrderedDict() # {coords: sorted list of (distance, top, bottom, left, right, building)}
 
 		if buildings:
-			self._update(add_buildings=buildings, initial=True)
+			for building in buildings:
+				self.add(building)
 
 	def add(self, building):
-		self._remove_set.discard(building)
-		self._add_set.add(building)
-		self._changed = True
+		pos = building.position
+		cell = (pos.left // self.CELL_SIZE, pos.top // self.CELL_SIZE)
+		if cell not in self._cells:
+			self._cells[cell] = set()
+		self._cells[cell].add(building)
+		self._max_size = max(self._max_size, pos.right - pos.left + 1, pos.bottom - pos.top + 1)
+		self._invalidate(building)
 
 	def remove(self, building):
-		self._add_set.discard(building)
-		self._remove_set.add(building)
-		self._changed = True
-
-	def _update(self, add_buildings=None, initial=False):
-		"""
-		@param add_buildings: Don't use unless you know why.
-		@param initial: can be set on first call as optimisation
-		"""
-		for building in self._remove_set:
-			for coords in building.position.get_radius_coordinates(self.radius, include_self=True):
-				try:
-					index = self._map[coords]
-				except KeyError:
-					continue # should be faster than contains check, since usually true
-				index._remove_set.add(building)
-				index._add_set.discard(building)
-				index._changed = True
-
-		if not add_buildings:
-			add_buildings = self._add_set
-		for building in add_buildings:
-			for coords in building.position.get_radius_coordinates(self.radius, include_self=True):
-				try:
-					index = self._map[coords]
-				except KeyError:
-					continue # should be faster than contains check, since usually true
-				if not initial:
-					index._remove_set.discard(building)
-				index._add_set.add(building)
-				index._changed = True
-
-		self._changed = False
-		self._add_set.clear()
-		self._remove_set.clear()
+		pos = building.position
+		cell = (pos.left // self.CELL_SIZE, pos.top // self.CELL_SIZE)
+		bucket = self._cells.get(cell)
+		if bucket is not None and building in bucket:
+			bucket.remove(building)
+			if not bucket:
+				del self._cells[cell]
+		self._invalidate(building)
+
+	def _invalidate(self, building):
+		"""Removes the cached results that building might be part of"""
+		if not self._cache:
+			return
+		pos = building.position
+		radius_squared = self.radius * self.radius
+		for coords in self._cache.keys():
+			x_diff = max(pos.left - coords[0], coords[0] - pos.right, 0)
+			y_diff = max(pos.top - coords[1], coords[1] - pos.bottom, 0)
+			if x_diff * x_diff + y_diff * y_diff <= radius_squared:
+				del self._cache[coords]
+
+	def _contains(self, coords):
+		x = coords[0] - self._left
+		y = coords[1] - self._top
+		return 0 <= x < self._width and 0 <= y < self._height and self._map[x * self._height + y] == 1
+
+	def _get_list(self, coords):
+		"""Returns the sorted list of (distance, top, bottom, left, right, building) of the
+		buildings in range of coords. The order is the same as the order of the tuples."""
+		cache = self._cache
+		try:
+			result = cache.pop(coords)
+		except KeyError:
+			x = coords[0]
+			y = coords[1]
+			radius = self.radius
+			radius_squared = radius * radius
+			cell_size = self.CELL_SIZE
+			cells = self._cells
+			result = []
+			for cell_x in xrange((x - radius - self._max_size + 1) // cell_size, (x + radius) // cell_size + 1):
+				for cell_y in xrange((y - radius - self._max_size + 1) // cell_size, (y + radius) // cell_size + 1):
+					bucket = cells.get((cell_x, cell_y))
+					if not bucket:
+						continue
+					for building in bucket:
+						pos = building.position
+						left = pos.left
+						right = pos.right
+						top = pos.top
+						bottom = pos.bottom
+
+						x_diff = left - x
+						if x_diff < x - right:
+							x_diff = x - right
+						if x_diff < 0:
+							x_diff = 0
+
+						y_diff = top - y
+						if y_diff < y - bottom:
+							y_diff = y - bottom
+						if y_diff < 0:
+							y_diff = 0
+
+						distance = x_diff * x_diff + y_diff * y_diff
+						# same condition as Rect.get_radius_coordinates(radius, include_self=True)
+						if distance <= radius_squared:
+							result.append((distance, top, bottom, left, right, building))
+			result.sort()
+			if len(cache) >= self.CACHE_SIZE:
+				cache.popitem(last=False)
+		cache[coords] = result # most recently used
+		return result
 
 	def get_buildings_in_range(self, coords):
 		"""
-		Returns all buildings in range in the form of a Building generator
+		Returns all buildings in range, sorted by distance
 		@param coords: tuple, the point around which to get the buildings
 		"""
-		if coords in self._map:
-			if self._changed:
-				self._update()
-			return self._map[coords].get_buildings_in_range()
+		if self._contains(coords):
+			return [element[5] for element in self._get_list(coords)]
 		return []
 
 	def get_random_building_in_range(self, coords):
@@ -109,10 +172,10 @@ class BuildingIndexer(object):
 		Don't use this for user interactions unless you want to break multiplayer
 		@param coords: tuple, the point around which to get the building
 		"""
-		if coords in self._map:
-			if self._changed:
-				self._update()
-			return self._map[coords].get_random_building_in_range()
+		if self._contains(coords):
+			buildings = self._get_list(coords)
+			if buildings:
+				return self._random.choice(buildings)[5]
 		return None
 
 	def get_num_buildings_in_range(self, coords):
@@ -120,82 +183,9 @@ class BuildingIndexer(object):
 		Returns the number of buildings in range of the position
 		@param coords: tuple, the centre point
 		"""
-		if coords in self._map:
-			if self._changed:
-				self._update()
-			return self._map[coords].get_num_buildings_in_range()
-
-
-
-class BuildingIndex(object):
-	"""
-	Indexes buildings around a tile to improve nearby building lookup speed.
-	The code isn't particularly pretty for performance reasons.
-	"""
-
-	def __init__(self, coords, random):
-		self._coords = coords
-		self._random = random
-		self._add_set = set()
-		self._remove_set = set()
-		self._list = []
-		self._changed = False
-
-	def _update(self):
-		new_list = []
-		for element in self._list:
-			if element[5] not in self._remove_set:
-				new_list.append(element)
-
-		x = self._coords[0]
-		y = self._coords[1]
-		for building in self._add_set:
-			pos = building.position
-			left = pos.left
-			right = pos.right
-			top = pos.top
-			bottom = pos.bottom
-
-			x_diff = left - x
-			if x_diff < x - right:
-				x_diff = x - right
-			if x_diff < 0:
-				x_diff = 0
-
-			y_diff = top - y
-			if y_diff < y - bottom:
-				y_diff = y - bottom
-			if y_diff < 0:
-				y_diff = 0
-
-			new_list.append((x_diff * x_diff + y_diff * y_diff, top, bottom, left, right, building))
-
-		self._list = new_list
-		self._list.sort()
-
-		self._add_set.clear()
-		self._remove_set.clear()
-		self._changed = False
-
-	def get_buildings_in_range(self):
-		if self._changed:
-			self._update()
-		for element in self._list:
-			yield element[5]
-
-	def get_random_building_in_range(self):
-		if self._changed:
-			self._update()
-		if self._list:
-			return self._random.choice(self._list)[5]
-		return None
-
-	def get_num_buildings_in_range(self):
-		if self._changed:
-			self._update()
-		return len(self._list)
+		if self._contains(coords):
+			return len(self._get_list(coords))
 
 
 # apply make_constant to classes
 decorators.bind_all(BuildingIndexer)
-decorators.bind_all(BuildingIndex)
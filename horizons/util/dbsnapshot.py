@@ -0,0 +1,124 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+"""Binary snapshots of the game data database.
+
+The game data is shipped as sql scripts (PATHS.DB_FILES). Instead of running
+them on every start, they are run once into a sqlite file in the user directory.
+The file name contains a hash of the scripts, so a changed script results in a
+new snapshot. Stale snapshots are removed when a new one is built.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+
+from horizons.constants import PATHS
+
+log = logging.getLogger("util.dbsnapshot")
+
+SNAPSHOT_DIR = os.path.join(PATHS.USER_DIR, "cache")
+SNAPSHOT_PREFIX = "gamedata-"
+SNAPSHOT_SUFFIX = ".sqlite"
+
+def get_snapshot_path(db_files):
+	"""Returns the path of the snapshot for the given sql scripts.
+	@param db_files: iterable of paths to sql scripts
+	@return: str, path of the snapshot (it might not exist yet)"""
+	content_hash = hashlib.sha1()
+	for filename in db_files:
+		content_hash.update(filename)
+		content_hash.update('\0')
+		with open(filename, 'rb') as f:
+			content_hash.update(f.read())
+		content_hash.update('\0')
+	return os.path.join(SNAPSHOT_DIR, SNAPSHOT_PREFIX + content_hash.hexdigest() + SNAPSHOT_SUFFIX)
+
+def build_snapshot(db_files, path):
+	"""Runs the sql scripts into a new sqlite file at path.
+	The file is written under a temporary name and renamed when it is complete,
+	so other processes never see a half-written snapshot.
+	@param db_files: iterable of paths to sql scripts
+	@param path: where to store the snapshot"""
+	directory = os.path.dirname(path)
+	if not os.path.exists(directory):
+		os.makedirs(directory)
+	fd, tmp_path = tempfile.mkstemp(suffix=SNAPSHOT_SUFFIX, dir=directory)
+	os.close(fd)
+	try:
+		connection = sqlite3.connect(tmp_path)
+		try:
+			for filename in db_files:
+				with open(filename, 'r') as f:
+					connection.executescript("BEGIN TRANSACTION;" + f.read() + "COMMIT;")
+		finally:
+			connection.close()
+		if os.path.exists(path): # another process was faster, windows can't rename onto it
+			os.remove(tmp_path)
+		else:
+			os.rename(tmp_path, path)
+	except:
+		if os.path.exists(tmp_path):
+			os.remove(tmp_path)
+		raise
+
+	for filename in os.listdir(directory):
+		old_path = os.path.join(directory, filename)
+		if filename.startswith(SNAPSHOT_PREFIX) and old_path != path:
+			try:
+				os.remove(old_path)
+			except OSError:
+				pass # might be in use by another instance
+
+def get_snapshot(db_files):
+	"""Returns the path of an up-to-date snapshot, building it if necessary.
+	@param db_files: iterable of paths to sql scripts
+	@return: str, path of the snapshot, or None if it can't be built (e.g. read-only user dir)"""
+	try:
+		path = get_snapshot_path(db_files)
+		if not os.path.exists(path):
+			log.debug("Building game data snapshot %s", path)
+			build_snapshot(db_files, path)
+		return path
+	except (IOError, OSError, sqlite3.Error) as e:
+		log.warning("Can't use game data snapshot: %s", e)
+		return None
+
+def copy_snapshot(path, db):
+	"""Copies the content of a snapshot into the database db is connected to.
+	@param path: path of the snapshot
+	@param db: DbReader, usually connected to ':memory:'"""
+	db("ATTACH DATABASE ? AS snapshot", path)
+	try:
+		objects = db("SELECT type, name, sql FROM snapshot.sqlite_master WHERE sql NOT NULL AND name NOT LIKE 'sqlite_%'")
+		script = ["BEGIN TRANSACTION"]
+		# tables first, indices and views might depend on them
+		for obj_type, name, sql in objects:
+			if obj_type == 'table':
+				script.append(sql)
+				script.append('INSERT INTO main."%s" SELECT * FROM snapshot."%s"' % (name, name))
+		script.extend(sql for obj_type, name, sql in objects if obj_type != 'table')
+		script.append("COMMIT")
+		db.execute_script(";\n".join(script) + ";")
+	finally:
+		db("DETACH DATABASE snapshot")
@@ -0,0 +1,164 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+import heapq
+from collections import deque
+
+
+class DistanceField(object):
+	"""Shortest distances from a set of source tiles through a set of walkable nodes that is
+	kept up to date while the sources and the nodes change.
+
+	Every source has the distance base_distance whether it is walkable or not. Every other tile
+	gets its distance through a chain of walkable nodes, moving to the 4 neighbours. Tiles that
+	can't be reached from a source aren't in the field. This is exactly what a breadth first
+	search from the sources would return.
+
+	Changes are applied with update(), which is given the coordinates whose state changed. Only
+	the distances that depend on them are recomputed: the tiles that lost their shortest path
+	first and then the tiles that got a shorter one. The coordinates whose distance changed are
+	collected in self.changed for the user of the field to pick up.
+	"""
+
+	moves = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+
+	def __init__(self, nodes, sources, base_distance=0):
+		"""
+		@param nodes: dict or set of the walkable coordinates. It is only read; the field has to be
+		              told about every change of it with update().
+		@param sources: iterable of the source coordinates
+		@param base_distance: distance of the sources
+		"""
+		self.nodes = nodes
+		self.base_distance = base_distance
+		self.sources = set(sources)
+		self.distance = {} # {(x, y): distance, ...}
+		self.changed = set()
+
+		queue = deque()
+		for coords in self.sources:
+			self.distance[coords] = base_distance
+			queue.append(coords)
+		self._expand(queue)
+
+	def _expand(self, queue):
+		"""Breadth first search from the coordinates in the queue, which are all at the same distance
+		or come in the order of their distance. Only unreached nodes are visited."""
+		moves = self.moves
+		distance = self.distance
+		nodes = self.nodes
+		while queue:
+			coords = queue.popleft()
+			dist = distance[coords] + 1
+			for dx, dy in moves:
+				coords2 = (coords[0] + dx, coords[1] + dy)
+				if coords2 in nodes and coords2 not in distance:
+					distance[coords2] = dist
+					queue.append(coords2)
+
+	def add_source(self, coords):
+		self.sources.add(coords)
+
+	def remove_source(self, coords):
+		self.sources.discard(coords)
+
+	def update(self, coords_list):
+		"""Recompute the distances after the state of the given coordinates changed. A coordinate
+		changes its state when it becomes or stops being a source or a walkable node.
+		@param coords_list: iterable of (x, y)"""
+		moves = self.moves
+		distance = self.distance
+		nodes = self.nodes
+		sources = self.sources
+		old_distance = {} # {(x, y): distance or None, ...} before the update for every touched tile
+
+		# find the tiles that lost their shortest path, in the order of their old distance
+		lost = set()
+		candidates = [] # heap of (old distance, (x, y))
+		seeds = set()
+		for coords in coords_list:
+			if coords in sources:
+				if distance.get(coords) != self.base_distance:
+					seeds.add(coords)
+				continue
+			if coords in distance:
+				candidates.append((distance[coords], coords))
+			elif coords in nodes:
+				seeds.add(coords)
+		heapq.heapify(candidates)
+
+		while candidates:
+			dist, coords = heapq.heappop(candidates)
+			if coords in lost or coords in sources or distance.get(coords) != dist:
+				continue
+			if coords in nodes:
+				supported = False
+				for dx, dy in moves:
+					coords2 = (coords[0] + dx, coords[1] + dy)
+					if distance.get(coords2) == dist - 1 and coords2 not in lost:
+						supported = True
+						break
+				if supported:
+					continue
+			lost.add(coords)
+			for dx, dy in moves:
+				coords2 = (coords[0] + dx, coords[1] + dy)
+				if distance.get(coords2) == dist + 1 and coords2 not in sources:
+					heapq.heappush(candidates, (dist + 1, coords2))
+
+		for coords in lost:
+			old_distance[coords] = distance.pop(coords)
+			if coords in nodes:
+				seeds.add(coords)
+
+		# find the new shortest paths of the lost tiles and the new sources and nodes
+		heap = []
+		for coords in seeds:
+			if coords in sources:
+				heap.append((self.base_distance, coords))
+				continue
+			best = None
+			for dx, dy in moves:
+				dist = distance.get((coords[0] + dx, coords[1] + dy))
+				if dist is not None and (best is None or dist < best):
+					best = dist
+			if best is not None:
+				heap.append((best + 1, coords))
+		heapq.heapify(heap)
+
+		while heap:
+			dist, coords = heapq.heappop(heap)
+			current = distance.get(coords)
+			if current is not None and current <= dist:
+				continue
+			if coords not in old_distance:
+				old_distance[coords] = current
+			distance[coords] = dist
+			for dx, dy in moves:
+				coords2 = (coords[0] + dx, coords[1] + dy)
+				if coords2 in nodes and coords2 not in sources:
+					current2 = distance.get(coords2)
+					if current2 is None or current2 > dist + 1:
+						heapq.heappush(heap, (dist + 1, coords2))
+
+		for coords, dist in old_distance.iteritems():
+			if distance.get(coords) != dist:
+				self.changed.add(coords)
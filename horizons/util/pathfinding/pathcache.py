@@ -0,0 +1,246 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+class PathCache(object):
+	"""Cache for paths on a PathGrid that is searched very often, such as the water of the world
+	or the roads of an island.
+
+	It works on two levels:
+	* Regions: the nodes are divided into connected regions (e.g. the water bodies of the world or
+	  the road networks of an island). If source and destination are in different regions, there
+	  can't be a path and the search is skipped completely. Source and destination tiles that aren't
+	  nodes (e.g. buildings next to a road) belong to the regions of the nodes next to them.
+	* Routes: the most recently found paths are kept in an LRU cache. Along with the path, the cache
+	  stores which nodes the search reached. Blocked coords (e.g. ships) can only change the result
+	  of a search if the search reaches them, so a cached path is returned only if none of the
+	  currently blocked coords was reached. This way, a cached path is always exactly the path that
+	  FindPath would find, and cache hits can't make games diverge.
+
+	Changes to the grid invalidate all routes. The regions are kept up to date by add_node and
+	remove_node, which have to be called for every change of the grid.
+	"""
+
+	# number of routes to keep
+	MAX_ROUTES = 32
+	# every route keeps the sorted indices of the nodes its search reached (4 bytes each),
+	# this is the maximum total number of them, so huge maps don't need more memory
+	MAX_REACHED_NODES = 250000
+
+	def __init__(self, grid, regions=None, diagonal=True):
+		"""
+		@param grid: PathGrid that the paths are searched on
+		@param regions: dict { (x, y): region id } of all nodes of the grid, the regions have to be
+		                connected regarding diagonal. None to disable the region check.
+		@param diagonal: whether the regions are connected via diagonal moves. The region check is
+		                 only done for searches that can't move diagonally if this is False.
+		"""
+		self.grid = grid
+		self._grid_version = grid.version
+		self._routes = OrderedDict() # { key: (path tuple or None, sorted array of reached node indices) }
+		self._reached_nodes = 0 # total length of the reached node arrays
+		self.hits = 0
+		self.misses = 0
+
+		self._diagonal = diagonal
+		stride = grid.stride
+		if diagonal:
+			self._neighbor_offsets = (-stride - 1, -stride, -stride + 1, -1, 1, stride - 1, stride, stride + 1)
+		else:
+			self._neighbor_offsets = (-stride, stride, -1, 1)
+
+		self._regions = None
+		if regions is not None:
+			self._regions = array('i', [-1]) * grid.size
+			self._region_sizes = defaultdict(int)
+			for coords, region in regions.iteritems():
+				index = grid.get_index(coords)
+				if index is not None and region is not None:
+					self._regions[index] = region
+					self._region_sizes[region] += 1
+			self._next_region = max(self._region_sizes) + 1 if self._region_sizes else 0
+
+	def get_key(self, source_indices, destination, diagonal, make_target_walkable):
+		"""Returns the key of a search or None if it can't be cached"""
+		try:
+			hash(destination)
+		except TypeError:
+			return None
+		return (tuple(source_indices), destination.__class__, destination, diagonal, make_target_walkable)
+
+	def get(self, key, source_indices, dest_indices, blocked_coords, diagonal=True):
+		"""Looks up a search.
+		@param key: return value of get_key
+		@param source_indices, dest_indices: grid indices of source and destination coords
+		@param blocked_coords: blocked coords of this search
+		@param diagonal: whether the search can move diagonally
+		@return: list of coords (a copy), None if there is no path or False if the cache can't tell
+		"""
+		if self._regions is not None and (self._diagonal or not diagonal):
+			source_regions = self._get_endpoint_regions(source_indices)
+			dest_regions = self._get_endpoint_regions(dest_indices)
+			if source_regions is not None and dest_regions is not None and \
+			   source_regions.isdisjoint(dest_regions) and \
+			   not self._are_adjacent(source_indices, dest_indices):
+				return None
+
+		if key is None:
+			return False
+		if self.grid.version != self._grid_version:
+			self._routes.clear()
+			self._reached_nodes = 0
+			self._grid_version = self.grid.version
+		if key not in self._routes:
+			self.misses += 1
+			return False
+
+		path, reached = self._routes[key]
+		num_reached = len(reached)
+		get_index = self.grid.get_index
+		for coords in blocked_coords:
+			index = get_index(coords)
+			if index is None or index in source_indices: # sources are always reached
+				continue
+			position = bisect_left(reached, index)
+			if position < num_reached and reached[position] == index:
+				self.misses += 1
+				return False
+
+		# mark as most recently used
+		del self._routes[key]
+		self._routes[key] = (path, reached)
+		self.hits += 1
+		return list(path) if path is not None else None
+
+	def add(self, key, path, reached):
+		"""Adds the result of a search that wasn't influenced by blocked coords.
+		@param key: return value of get_key
+		@param path: list of coords or None
+		@param reached: iterable of the indices of the nodes that the search reached
+		"""
+		if key is None or self.grid.version != self._grid_version:
+			return
+		reached = array('i', sorted(reached))
+		if len(reached) > self.MAX_REACHED_NODES:
+			return
+		if key in self._routes:
+			self._reached_nodes -= len(self._routes.pop(key)[1])
+		self._routes[key] = (tuple(path) if path is not None else None, reached)
+		self._reached_nodes += len(reached)
+		while len(self._routes) > self.MAX_ROUTES or self._reached_nodes > self.MAX_REACHED_NODES:
+			self._reached_nodes -= len(self._routes.popitem(last=False)[1][1])
+
+	def _get_endpoint_regions(self, indices):
+		"""Returns the regions that a search can get to from the tiles at indices.
+		The tiles are passable for the search even if they aren't nodes.
+		@return: set of region ids or None if a region is unknown"""
+		regions = self._regions
+		walkable = self.grid.walkable
+		result = set()
+		for index in indices:
+			if walkable[index]:
+				neighbors = (index, )
+			else:
+				neighbors = [index + offset for offset in self._neighbor_offsets]
+			for neighbor in neighbors:
+				if walkable[neighbor]:
+					region = regions[neighbor]
+					if region == -1:
+						return None
+					result.add(region)
+		return result
+
+	def _are_adjacent(self, source_indices, dest_indices):
+		"""Returns whether a search can get from a source tile to a destination tile directly"""
+		offsets = self._neighbor_offsets
+		for index in source_indices:
+			if index in dest_indices:
+				return True
+			for offset in offsets:
+				if index + offset in dest_indices:
+					return True
+		return False
+
+	def add_node(self, coords):
+		"""Updates the regions after coords have been added to the grid"""
+		if self._regions is None:
+			return
+		regions = self._regions
+		index = self.grid.get_index(coords)
+		if regions[index] != -1:
+			return # node was already there, just its speed changed
+		sizes = self._region_sizes
+		neighbor_regions = set(regions[index + offset] for offset in self._neighbor_offsets)
+		neighbor_regions.discard(-1)
+		if not neighbor_regions:
+			region = self._next_region
+			self._next_region += 1
+		else:
+			# the node connects the neighboring regions, merge them into the largest one
+			region = max(neighbor_regions, key=lambda r: (sizes[r], -r))
+			for offset in self._neighbor_offsets:
+				other = regions[index + offset]
+				if other != -1 and other != region:
+					sizes[region] += self._relabel(index + offset, region)
+					del sizes[other]
+		regions[index] = region
+		sizes[region] += 1
+
+	def remove_node(self, coords):
+		"""Updates the regions after coords have been removed from the grid"""
+		if self._regions is None:
+			return
+		regions = self._regions
+		index = self.grid.get_index(coords)
+		if index is None or regions[index] == -1:
+			return
+		region = regions[index]
+		regions[index] = -1
+		del self._region_sizes[region]
+		# the region might fall apart, every part contains one of the neighbors
+		for offset in self._neighbor_offsets:
+			if regions[index + offset] == region:
+				new_region = self._next_region
+				self._next_region += 1
+				self._region_sizes[new_region] = self._relabel(index + offset, new_region)
+
+	def _relabel(self, start, region):
+		"""Assigns region to all nodes that are connected to start and in the same region as start.
+		@return: number of nodes"""
+		regions = self._regions
+		offsets = self._neighbor_offsets
+		old_region = regions[start]
+		regions[start] = region
+		to_check = [start]
+		count = 0
+		while to_check:
+			index = to_check.pop()
+			count += 1
+			for offset in offsets:
+				neighbor = index + offset
+				if regions[neighbor] == old_region:
+					regions[neighbor] = region
+					to_check.append(neighbor)
+		return count
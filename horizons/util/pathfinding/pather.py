@@ -71,6 +71,10 @@ class AbstractPather(object):
 		Return value type must be supported by FindPath"""
 		return []
 
+	def _get_path_cache(self):
+		"""Returns the PathCache of the path nodes or None"""
+		return None
+
 	def _check_for_obstacles(self, point):
 		"""Check if the path is unexpectedly blocked by e.g. a unit
 		@param point: tuple: (x, y)
@@ -107,7 +111,7 @@ class AbstractPather(object):
 		# to use a different pathfinding code, just change the following line
 		path = FindPath()(source, destination, self._get_path_nodes(),
 		                  self._get_blocked_coords(), self.move_diagonal,
-		                  self.make_target_walkable)
+		                  self.make_target_walkable, self._get_path_cache())
 
 		if path is None:
 			return False
@@ -215,16 +219,22 @@ class ShipPather(AbstractPather):
 		                                 *args, **kwargs)
 
 	def _get_path_nodes(self):
-		return self.session.world.water
+		return self.session.world.water_grid
 
 	def _get_blocked_coords(self):
 		return self.session.world.ship_map
 
+	def _get_path_cache(self):
+		return self.session.world.water_path_cache
+
 
 class FisherShipPather(ShipPather):
 	"""Can also drive through shallow water"""
 	def _get_path_nodes(self):
-		return self.session.world.water_and_coastline
+		return self.session.world.water_and_coastline_grid
+
+	def _get_path_cache(self):
+		return self.session.world.water_and_coastline_path_cache
 
 	def _get_blocked_coords(self):
 		# don't let fisher be blocked by other ships (#1023)
@@ -249,7 +259,10 @@ class RoadPather(AbstractPather):
 		self.island = self.session.world.get_island(unit.position)
 
 	def _get_path_nodes(self):
-		return self.island.path_nodes.road_nodes
+		return self.island.path_nodes.road_node_grid
+
+	def _get_path_cache(self):
+		return self.island.path_nodes.road_path_cache
 
 
 class SoldierPather(AbstractPather):
@@ -262,7 +275,7 @@ class SoldierPather(AbstractPather):
 	def _get_path_nodes(self):
 		# island might change (e.g. when transported via ship), so reload every time
 		island = self.session.world.get_island(self.unit.position)
-		return island.path_nodes.nodes
+		return island.path_nodes.node_grid
 
 	def _get_blocked_coords(self):
 		return self.session.world.ground_unit_map
@@ -291,7 +304,8 @@ class StaticPather(object):
 		@param island: island to search path on
 		@param source, destination: Point or anything supported by FindPath
 		@return: list of tuples or None in case no path is found"""
-		return FindPath()(source, destination, island.path_nodes.road_nodes)
+		return FindPath()(source, destination, island.path_nodes.road_node_grid,
+		                  path_cache=island.path_nodes.road_path_cache)
 
 
 decorators.bind_all(AbstractPather)
@@ -20,8 +20,11 @@
 # ###################################################
 
 import logging
+from heapq import heappush, heappop
 
 from horizons.util.python import decorators
+from horizons.util.pathfinding.pathgrid import PathGrid
+from horizons.util.tickprofiler import TickProfiler
 
 """
 This file contains only the pathfinding algorithm. It is implemented in a callable class
@@ -36,17 +39,21 @@ class FindPath(object):
 	"""
 	log = logging.getLogger("world.pathfinding")
 
+	# dicts of the nodes reached by the current search, only used for profiling
+	search_nodes = ()
+
 	@decorators.make_constants()
 	def __call__(self, source, destination, path_nodes, blocked_coords=None,
-		        diagonal=False, make_target_walkable=True):
+		        diagonal=False, make_target_walkable=True, path_cache=None):
 		"""
 		@param source: Rect, Point or BasicBuilding
 		@param destination: Rect, Point or BasicBuilding
-		@param path_nodes: dict { (x, y) = speed_on_coords }  or list [(x, y), ..]
+		@param path_nodes: dict { (x, y) = speed_on_coords }, list [(x, y), ..] or PathGrid
 		@param blocked_coords: temporarily blocked coords (e.g. by a unit) as list or dict of tuples
 		@param diagonal: whether the unit is able to move diagonally
 		@param make_target_walkable: whether we force the tiles of the target to be walkable,
 		       even if they actually aren't (used e.g. when walking to a building)
+		@param path_cache: PathCache of path_nodes, only used if path_nodes is a PathGrid
 		@return: list of coords as tuples that are part of the best path
 		         (from first coord after source to first coord in destination)
 						 or None if no path is found
@@ -56,7 +63,7 @@ class FindPath(object):
 		#assert(isinstance(source, (Rect, Point, BasicBuilding)))
 		#assert(isinstance(destination, (Rect, Point, BasicBuilding)))
 		blocked_coords = blocked_coords or []
-		assert(isinstance(path_nodes, (dict, list, set)))
+		assert(isinstance(path_nodes, (dict, list, set, PathGrid)))
 		assert(isinstance(blocked_coords, (dict, list, set)))
 
 		# save args
@@ -66,17 +73,28 @@ class FindPath(object):
 		self.blocked_coords = blocked_coords
 		self.diagonal = diagonal
 		self.make_target_walkable = make_target_walkable
+		self.path_cache = path_cache
 
 		#self.log.debug('searching path from %s to %s. blocked: %s',
 		#							 source, destination, blocked_coords)
 
+		profiler = TickProfiler()
+		if profiler is not None:
+			profiler.begin_section()
+
 		# prepare args
 		if not self.setup():
-			return None
-
-		# execute algorithm on the args
-		path = self.execute()
-		self.log.debug('found path: %s', path)
+			path = None
+		else:
+			# execute algorithm on the args
+			path = self.execute()
+			self.log.debug('found path: %s', path)
+
+		if profiler is not None:
+			# the work done is the number of nodes that were reached
+			reached = sum(len(nodes) for nodes in self.search_nodes)
+			profiler.end_section('pathfinding', path_nodes.__class__.__name__, reached)
+		self.search_nodes = ()
 		return path
 
 	@decorators.make_constants()
@@ -117,6 +135,12 @@ class FindPath(object):
 	@decorators.make_constants()
 	def execute(self):
 		"""Executes algorithm"""
+		if isinstance(self.path_nodes, PathGrid):
+			path = self.execute_on_grid()
+			if path is not False:
+				return path
+			# source or destination is outside of the grid, the generic code below can handle that
+
 		# nodes are the keys of the following dicts (x, y)
 		# the val of the keys are: (previous node, distance to here,
 		# distance to here + estimated distance to target)
@@ -133,6 +157,7 @@ class FindPath(object):
 		to_check = {}
 		# nodes that have been processed:
 		checked = {}
+		self.search_nodes = (to_check, checked)
 
 		destination = self.destination
 		destination_to_tuple_distance_func = destination.get_distance_function((0, 0))
@@ -152,7 +177,6 @@ class FindPath(object):
 		if not dest_coords_set:
 			return None
 
-		from heapq import heappush, heappop
 		heap = []
 		for coords, data in to_check.iteritems():
 			heappush(heap, (data[2], coords))
@@ -251,3 +275,112 @@ class FindPath(object):
 
 		else:
 			return None
+
+	@decorators.make_constants()
+	def execute_on_grid(self):
+		"""Executes algorithm on a PathGrid.
+		This is the same algorithm as in execute(), it expands the nodes in the same order and
+		therefore finds the same paths. Nodes are represented by their grid index though, and the
+		state of all nodes is kept in one flat array, which makes expanding a node a lot cheaper.
+		@return: list of coords, None if no path is found or False if the grid doesn't cover
+		         all of the source and destination coords
+		"""
+		grid = self.path_nodes
+		destination = self.destination
+		destination_to_tuple_distance_func = destination.get_distance_function((0, 0))
+
+		source_coords = self.source.get_coordinates()
+		dest_coords_set = set(destination.get_coordinates())
+		if not self.make_target_walkable:
+			dest_coords_set = set(coords for coords in dest_coords_set if coords in grid)
+		if not dest_coords_set:
+			return None
+
+		get_index = grid.get_index
+		source_indices = [get_index(coords) for coords in source_coords]
+		dest_indices = set(get_index(coords) for coords in dest_coords_set)
+		if None in source_indices or None in dest_indices:
+			return False
+
+		path_cache = self.path_cache
+		if path_cache is not None:
+			cache_key = path_cache.get_key(source_indices, destination, self.diagonal, self.make_target_walkable)
+			path = path_cache.get(cache_key, source_indices, dest_indices, self.blocked_coords, self.diagonal)
+			if path is not False:
+				return path
+
+		# node states: 0 = not passable, 1 = passable, 2 = to be checked, 3 = checked, 4 = blocked
+		# the border of the grid is never passable, so there is no need for bounds checks
+		state = bytearray(grid.walkable)
+		for index in source_indices:
+			state[index] = 1
+		for index in dest_indices:
+			state[index] = 1
+		for coords in self.blocked_coords:
+			index = get_index(coords)
+			if index is not None and state[index] == 1:
+				state[index] = 4
+		# whether a blocked node influenced the search
+		reached_blocked = False
+
+		# previous node and distance to here of every node that has been reached
+		previous = {}
+		distance = {}
+		self.search_nodes = (distance, )
+		heap = []
+		for index, coords in zip(source_indices, source_coords):
+			if state[index] != 2:
+				state[index] = 2
+				previous[index] = None
+				distance[index] = 0
+				heappush(heap, (destination_to_tuple_distance_func(destination, coords), index))
+
+		stride = grid.stride
+		# (index offset, x offset, y offset) of the neighbors
+		if self.diagonal:
+			neighbor_offsets = ((-stride - 1, -1, -1), (-stride, -1, 0), (-stride + 1, -1, 1),
+			                    (-1, 0, -1), (1, 0, 1),
+			                    (stride - 1, 1, -1), (stride, 1, 0), (stride + 1, 1, 1))
+		else:
+			neighbor_offsets = ((-stride, -1, 0), (stride, 1, 0), (-1, 0, -1), (1, 0, 1))
+
+		# pull dereferencing out of loop
+		speed = grid.speed
+		x_offset = grid.left - 1
+		y_offset = grid.top - 1
+
+		while heap:
+			# the heap entries are unique, since a node is never added twice
+			cur_index = heappop(heap)[1]
+			state[cur_index] = 3
+
+			if cur_index in dest_indices:
+				# we're done, follow the previous nodes back to the source
+				path = []
+				while cur_index is not None:
+					path.append(grid.get_coords(cur_index))
+					cur_index = previous[cur_index]
+				path.reverse()
+				if path_cache is not None and not reached_blocked:
+					path_cache.add(cache_key, path, distance)
+				return path
+
+			x = cur_index // stride + x_offset
+			y = cur_index % stride + y_offset
+			dist_to_here = distance[cur_index] + speed[cur_index]
+			for index_offset, dx, dy in neighbor_offsets:
+				neighbor_index = cur_index + index_offset
+				# nodes that are already reached keep their values, see execute()
+				neighbor_state = state[neighbor_index]
+				if neighbor_state == 1:
+					state[neighbor_index] = 2
+					previous[neighbor_index] = cur_index
+					distance[neighbor_index] = dist_to_here
+					total_dist_estimation = destination_to_tuple_distance_func(destination, (x + dx, y + dy)) + dist_to_here
+					heappush(heap, (total_dist_estimation, neighbor_index))
+				elif neighbor_state == 4:
+					reached_blocked = True
+
+		if path_cache is not None and not reached_blocked:
+			path_cache.add(cache_key, None, distance)
+		return None
@@ -0,0 +1,115 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+from array import array
+
+from horizons.util.python import decorators
+
+class PathGrid(object):
+	"""Flat, array-backed set of path nodes covering a rectangular area.
+
+	This is the grid equivalent of the { (x, y): speed } dicts used for pathfinding. Nodes
+	are stored in arrays indexed by integers instead of tuples, so the pathfinding algorithm
+	can find neighbors with plain integer arithmetic (see FindPath).
+	The grid is padded with a border of unwalkable cells, therefore all neighbors of a cell
+	inside the area have a valid index.
+
+	Interface:
+	add(coords, speed) and remove(coords) have to be called for each change of the nodes.
+	coords in grid and grid.get(coords, default) work like on the dict.
+	"""
+
+	def __init__(self, rect, nodes=None):
+		"""
+		@param rect: Rect, area that the grid covers. Nodes outside of it are not supported.
+		@param nodes: optional iterable of (x, y) or dict { (x, y): speed } to fill the grid with
+		"""
+		self.left = rect.left
+		self.top = rect.top
+		self.right = rect.right
+		self.bottom = rect.bottom
+		# index of (x, y) is (x - left + 1) * stride + (y - top + 1), this preserves the
+		# ordering of the coordinate tuples, which the pathfinding relies on for tie breaking
+		self.stride = self.bottom - self.top + 3
+		self.size = (self.right - self.left + 3) * self.stride
+		self.walkable = bytearray(self.size)
+		self.speed = array('d', [0.0]) * self.size
+		self.num_nodes = 0
+		self.version = 0 # changes whenever the nodes change
+
+		if nodes is not None:
+			if isinstance(nodes, dict):
+				for coords, speed in nodes.iteritems():
+					self.add(coords, speed)
+			else:
+				for coords in nodes:
+					self.add(coords, 1.0)
+
+	def __len__(self):
+		return self.num_nodes
+
+	def __contains__(self, coords):
+		index = self.get_index(coords)
+		return index is not None and self.walkable[index] == 1
+
+	def __iter__(self):
+		"""Yields the coordinates of all nodes."""
+		walkable = self.walkable
+		for index in xrange(self.size):
+			if walkable[index]:
+				yield self.get_coords(index)
+
+	def get(self, coords, default=None):
+		index = self.get_index(coords)
+		if index is None or not self.walkable[index]:
+			return default
+		return self.speed[index]
+
+	def get_index(self, coords):
+		"""Returns the index of (x, y) or None if the coords are outside of the grid area"""
+		x, y = coords
+		if not (self.left <= x <= self.right and self.top <= y <= self.bottom):
+			return None
+		return (x - self.left + 1) * self.stride + (y - self.top + 1)
+
+	def get_coords(self, index):
+		"""Inverse of get_index"""
+		return (index // self.stride + self.left - 1, index % self.stride + self.top - 1)
+
+	def add(self, coords, speed):
+		index = self.get_index(coords)
+		assert index is not None, "%s is outside of the path grid" % (coords, )
+		if not self.walkable[index]:
+			self.walkable[index] = 1
+			self.num_nodes += 1
+		self.speed[index] = speed
+		self.version += 1
+
+	def remove(self, coords):
+		index = self.get_index(coords)
+		if index is not None and self.walkable[index]:
+			self.walkable[index] = 0
+			self.speed[index] = 0.0
+			self.num_nodes -= 1
+			self.version += 1
+
+decorators.bind_all(PathGrid)
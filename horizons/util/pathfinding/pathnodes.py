@@ -21,6 +21,9 @@
 
 import logging
 
+from horizons.util.pathfinding.pathcache import PathCache
+from horizons.util.pathfinding.pathgrid import PathGrid
+
 class PathNodes(object):
 	"""
 	Abstract class; used to derive list of path nodes from, which is used for pathfinding.
@@ -55,11 +58,15 @@ class IslandPathNodes(PathNodes):
 	Interface:
 	self.nodes: List of nodes on island, where the terrain allows to be walked on
 	self.road_nodes: dictionary of nodes, where a road is built on
+	self.node_grid, self.road_node_grid: PathGrids that mirror the above, used by the pathers
+	self.road_path_cache: PathCache of road_node_grid, its regions are the road networks
 
 	(un)register_road has to be called for each coord, where a road is built on (destroyed)
 	reset_tile_walkablity has to be called when the terrain changes the walkability
 	(e.g. building construction, a flood, or whatever)
 	is_walkable rechecks the walkability status of a coordinate
+	self.walkability_listeners: callables that are called with the coordinates of every tile
+	that is added to or removed from self.nodes
 	"""
 	def __init__(self, island):
 		super(IslandPathNodes, self).__init__()
@@ -73,17 +80,25 @@ class IslandPathNodes(PathNodes):
 		for coord in self.island:
 			if self.is_walkable(coord):
 				self.nodes[coord] = self.NODE_DEFAULT_SPEED
+		self.node_grid = PathGrid(self.island.position, self.nodes)
+		self.walkability_listeners = []
 
 		# nodes where a real road is built on.
 		self.road_nodes = {}
+		self.road_node_grid = PathGrid(self.island.position)
+		self.road_path_cache = PathCache(self.road_node_grid, regions={}, diagonal=False)
 
 	def register_road(self, road):
 		for i in road.position:
 			self.road_nodes[ (i.x, i.y) ] = self.NODE_DEFAULT_SPEED
+			self.road_node_grid.add((i.x, i.y), self.NODE_DEFAULT_SPEED)
+			self.road_path_cache.add_node((i.x, i.y))
 
 	def unregister_road(self, road):
 		for i in road.position:
 			del self.road_nodes[ (i.x, i.y) ]
+			self.road_node_grid.remove((i.x, i.y))
+			self.road_path_cache.remove_node((i.x, i.y))
 
 	def is_road(self, x, y):
 		"""Return if there is a road on (x, y)"""
@@ -122,5 +137,11 @@ class IslandPathNodes(PathNodes):
 		in_list = (coord in self.nodes)
 		if not in_list and actually_walkable:
 			self.nodes[coord] = self.NODE_DEFAULT_SPEED
-		if in_list and not actually_walkable:
+			self.node_grid.add(coord, self.NODE_DEFAULT_SPEED)
+		elif in_list and not actually_walkable:
 			del self.nodes[coord]
+			self.node_grid.remove(coord)
+		else:
+			return
+		for listener in self.walkability_listeners:
+			listener(coord)
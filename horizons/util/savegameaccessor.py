@@ -24,7 +24,9 @@ import os
 import os.path
 import tempfile
 
-from collections import defaultdict, deque
+from array import array
+from collections import deque
+from itertools import izip
 
 from horizons.constants import PATHS
 from horizons.savegamemanager import SavegameManager
@@ -37,9 +39,34 @@ class SavegameAccessor(DbReader):
 	"""
 	SavegameAccessor is the class used for loading saved games.
 
-	Frequent select queries are preloaded for faster access.
+	Frequent select queries are preloaded for faster access. A table is preloaded when it is
+	accessed for the first time, so tables that aren't needed are never read. The data that
+	has been loaded stays available after close(), accessing other tables raises an error then.
+	The long history tables are kept in flat arrays, their rows are only turned into
+	objects when they are requested.
 	"""
 
+	# attributes holding preloaded data: name of the method that loads them
+	_preloaded_attributes = {
+		'_building': '_load_building',
+		'_settlement': '_load_settlement',
+		'_concrete_object': '_load_concrete_object',
+		'_productions_by_worldid': '_load_production',
+		'_production_lines_by_owner': '_load_production',
+		'_productions_by_id_and_owner': '_load_production',
+		'_production_state_history': '_load_production_state_history',
+		'_storage': '_load_storage',
+		'_wildanimal': '_load_wildanimal',
+		'_unit': '_load_unit',
+		'_building_collector': '_load_building_collector',
+		'_building_collector_job_history': '_load_building_collector_job_history',
+		'_production_line': '_load_production_line',
+		'_unit_path': '_load_unit_path',
+		'_storage_global_limit': '_load_storage_global_limit',
+		'_health': '_load_health',
+		'_fish_data': '_load_fish_data',
+	}
+
 	def __init__(self, game_identifier, is_map):
 		is_random_map = False
 		if is_map:
@@ -96,22 +123,22 @@ class SavegameAccessor(DbReader):
 		else:
 			self.map_name = SavegameManager.get_savegamename_from_filename(self._map_path)
 
-		self._load_building()
-		self._load_settlement()
-		self._load_concrete_object()
-		self._load_production()
-		self._load_storage()
-		self._load_wildanimal()
-		self._load_unit()
-		self._load_building_collector()
-		self._load_production_line()
-		self._load_unit_path()
-		self._load_storage_global_limit()
-		self._load_health()
-		self._load_fish_data()
 		self._hash = None
+		self._closed = False
+
+	def __getattr__(self, name):
+		"""Preloads the data of a table when it is accessed for the first time."""
+		try:
+			loader = self._preloaded_attributes[name]
+		except KeyError:
+			raise AttributeError(name)
+		if self.__dict__.get('_closed'):
+			raise RuntimeError("Can't load %s from savegame %s, it has been closed already" % (name, self.db_path))
+		getattr(self, loader)()
+		return self.__dict__[name]
 
 	def close(self):
+		self._closed = True
 		super(SavegameAccessor, self).close()
 		if self.upgrader is not None:
 			self.upgrader.close()
@@ -178,9 +205,23 @@ class SavegameAccessor(DbReader):
 
 			self._production_lines_by_owner[owner].append
 
-		self._production_state_history = defaultdict(lambda: deque())
+	def _load_production_state_history(self):
+		# { (object id, production id): (start, end) } of the rows in the tick and state arrays
+		self._production_state_history = {}
+		self._production_state_history_ticks = ticks = array('l')
+		self._production_state_history_states = states = array('l')
+		index = self._production_state_history
+		last_key = start = None
 		for object_id, production_id, tick, state in self("SELECT object_id, production, tick, state FROM production_state_history ORDER BY object_id, production, tick"):
-			self._production_state_history[int(object_id), int(production_id)].append((tick, state))
+			key = (int(object_id), int(production_id))
+			if key != last_key: # the rows of a key are consecutive
+				if last_key is not None:
+					index[last_key] = (start, len(ticks))
+				last_key, start = key, len(ticks)
+			ticks.append(tick)
+			states.append(state)
+		if last_key is not None:
+			index[last_key] = (start, len(ticks))
 
 	def get_production_by_id_and_owner(self, id, ownerid):
 		# owner means worldid of entity
@@ -195,7 +236,10 @@ class SavegameAccessor(DbReader):
 		return self._production_lines_by_owner.get(owner, [])
 
 	def get_production_state_history(self, worldid, prod_id):
-		return self._production_state_history[int(worldid), int(prod_id)]
+		"""Returns a new deque of (tick, state)"""
+		start, end = self._production_state_history.get((int(worldid), int(prod_id)), (0, 0))
+		return deque(izip(self._production_state_history_ticks[start:end],
+		                  self._production_state_history_states[start:end]))
 
 
 	def _load_storage(self):
@@ -236,16 +280,33 @@ class SavegameAccessor(DbReader):
 		for row in self("SELECT rowid, home_building, creation_tick FROM building_collector"):
 			self._building_collector[int(row[0])] = (int(row[1]) if row[1] is not None else None, row[2])
 
-		self._building_collector_job_history = defaultdict(lambda: deque())
+	def _load_building_collector_job_history(self):
+		# { collector id: (start, end) } of the rows in the tick and utilisation arrays
+		self._building_collector_job_history = {}
+		self._building_collector_job_history_ticks = ticks = array('l')
+		self._building_collector_job_history_utilisations = utilisations = array('d')
+		index = self._building_collector_job_history
+		last_key = start = None
 		for collector_id, tick, utilisation in self("SELECT collector, tick, utilisation FROM building_collector_job_history ORDER BY collector, tick"):
-			self._building_collector_job_history[int(collector_id)].append((tick, utilisation))
+			key = int(collector_id)
+			if key != last_key: # the rows of a key are consecutive
+				if last_key is not None:
+					index[last_key] = (start, len(ticks))
+				last_key, start = key, len(ticks)
+			ticks.append(tick)
+			utilisations.append(utilisation)
+		if last_key is not None:
+			index[last_key] = (start, len(ticks))
 
 	def get_building_collectors_data(self, worldid):
 		"""Returns (id of the building collector's home or None otherwise, creation_tick)"""
 		return self._building_collector.get(int(worldid))
 
 	def get_building_collector_job_history(self, worldid):
-		return self._building_collector_job_history[int(worldid)]
+		"""Returns a new deque of (tick, utilisation)"""
+		start, end = self._building_collector_job_history.get(int(worldid), (0, 0))
+		return deque(izip(self._building_collector_job_history_ticks[start:end],
+		                  self._building_collector_job_history_utilisations[start:end]))
 
 
 	def _load_production_line(self):
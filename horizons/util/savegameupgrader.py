@@ -321,6 +321,12 @@ class SavegameUpgrader(object):
 		for row in db("SELECT rowid FROM building WHERE type = ?", BUILDINGS.FISH_DEPOSIT):
 			db("INSERT INTO fish_data(rowid, last_usage_tick) VALUES(?, ?)", row[0], -1000000)
 
+	def _upgrade_to_rev71(self, db):
+		db('CREATE TABLE "ai_player_pending_settlement_manager" ("player" INTEGER NOT NULL, "settlement_manager" INTEGER NOT NULL)')
+
+	def _upgrade_to_rev72(self, db):
+		db('CREATE TABLE "ai_village_builder_pending_plan" ("village_builder" INT NOT NULL, "remaining_ticks" INT NOT NULL)')
+
 	def _upgrade(self):
 		# fix import loop
 		from horizons.savegamemanager import SavegameManager
@@ -382,6 +388,10 @@ class SavegameUpgrader(object):
 				self._upgrade_to_rev69(db)
 			if rev < 70:
 				self._upgrade_to_rev70(db)
+			if rev < 71:
+				self._upgrade_to_rev71(db)
+			if rev < 72:
+				self._upgrade_to_rev72(db)
 
 			db('COMMIT')
 			db.close()
@@ -0,0 +1,166 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+import os
+import re
+import threading
+import traceback
+
+from horizons.constants import PATHS
+from horizons.util.dbreader import DbReader
+
+class SavegameWriter(DbReader):
+	"""
+	SavegameWriter is the class used for writing savegames.
+
+	Saving issues tens of thousands of single row INSERTs. Instead of executing them right away,
+	the rows are collected per statement and written with one executemany call in flush().
+	Any other statement (UPDATE, SELECT, COMMIT, ...) flushes first, so it sees all rows that
+	have been inserted before. Rows of a table are always written in the order they were
+	inserted, which keeps their rowids the same as without batching.
+	"""
+
+	# a savegame file is written from scratch and deleted on errors, there is nothing the
+	# journal would have to protect
+	PRAGMAS = ("PRAGMA journal_mode = MEMORY", "PRAGMA temp_store = MEMORY",
+	           "PRAGMA cache_size = 10000")
+
+	_insert_table_regexp = re.compile(r'INSERT\s+(?:OR\s+\w+\s+)?INTO\s+[`"\']?(\w+)', re.IGNORECASE)
+
+	def __init__(self, dbfile):
+		super(SavegameWriter, self).__init__(dbfile)
+		for pragma in self.PRAGMAS:
+			self.cur.execute(pragma)
+		self._rows = {} # { INSERT command: [ args ] }, commands with collected rows
+		self._table_commands = {} # { table: INSERT command }, tables with collected rows
+		self._tables = {} # { command: table or None if it isn't an INSERT }
+
+	def __call__(self, command, *args):
+		rows = self._rows.get(command)
+		if rows is not None:
+			rows.append(args)
+			return []
+
+		try:
+			table = self._tables[command]
+		except KeyError:
+			match = self._insert_table_regexp.match(command)
+			table = self._tables[command] = match.group(1) if match else None
+
+		if table is None:
+			self.flush()
+			return super(SavegameWriter, self).__call__(command, *args)
+
+		if table in self._table_commands:
+			# rows of another statement for the same table have to be written first
+			self._flush_table(table)
+		self._table_commands[table] = command
+		self._rows[command] = [args]
+		return []
+
+	def _flush_table(self, table):
+		command = self._table_commands.pop(table)
+		self.cur.executemany(command, self._rows.pop(command))
+
+	def flush(self):
+		"""Writes all collected rows to the db."""
+		for table in self._table_commands.keys():
+			self._flush_table(table)
+
+	def execute_many(self, command, parameters):
+		self.flush()
+		return super(SavegameWriter, self).execute_many(command, parameters)
+
+	def execute_script(self, script):
+		self.flush()
+		return super(SavegameWriter, self).execute_script(script)
+
+	def close(self):
+		"""Closes the db, rows that haven't been flushed are discarded."""
+		self._rows.clear()
+		self._table_commands.clear()
+		super(SavegameWriter, self).close()
+
+
+class SavegameSnapshot(object):
+	"""
+	Stand-in for the savegame db while saving a game in the background.
+
+	The statements are only recorded (which is fast), the savegame file is written later
+	by write(), usually in another thread (see write_in_background()). Therefore the game
+	can continue right after its state has been collected.
+	"""
+
+	def __init__(self):
+		self.statements = [] # [ (command, args) ]
+		self.success = None # whether writing worked, None if it hasn't happened yet
+		self._thread = None
+
+	def __call__(self, command, *args):
+		assert not command.startswith("SELECT"), "A snapshot can't be queried: %s" % command
+		self.statements.append((command, args))
+		return []
+
+	def write(self, dbfile):
+		"""Writes the recorded statements to a new savegame file.
+		The file is removed again if that fails.
+		@return: bool, whether writing succeeded"""
+		try:
+			if os.path.exists(dbfile):
+				os.unlink(dbfile)
+			db = SavegameWriter(dbfile)
+		except (IOError, OSError):
+			print "Failed to create savegame file", dbfile
+			traceback.print_exc()
+			self.success = False
+			return False
+
+		try:
+			with open(PATHS.SAVEGAME_TEMPLATE, "r") as savegame_template:
+				db.execute_script(savegame_template.read())
+			db("BEGIN")
+			for command, args in self.statements:
+				db(command, *args)
+			db("COMMIT")
+			db.close()
+			self.success = True
+		except:
+			print "Save Exception"
+			traceback.print_exc()
+			db.close() # close db before delete
+			os.unlink(dbfile) # remove invalid savegamefile
+			self.success = False
+		self.statements = None
+		return self.success
+
+	def write_in_background(self, dbfile):
+		"""Starts writing the savegame file in another thread."""
+		self._thread = threading.Thread(target=self.write, args=(dbfile, ), name="SavegameWriter")
+		self._thread.start()
+
+	def is_writing(self):
+		return self._thread is not None and self._thread.is_alive()
+
+	def join(self):
+		"""Waits until write_in_background() is finished."""
+		if self._thread is not None:
+			self._thread.join()
@@ -0,0 +1,185 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+import csv
+import functools
+import json
+import time
+import types
+from collections import defaultdict, deque
+
+from horizons.util.python.callback import Callback
+from horizons.util.python.singleton import ManualConstructionSingleton
+from horizons.util.python.weakmethod import WeakMethod
+
+
+class TickProfiler(object):
+	"""Opt-in instrumentation of the hot paths of the game simulation.
+
+	Wall time, call count, optionally an amount of work (e.g. reached path nodes) and the
+	own time are recorded per section. A section is a (category, name) pair, the categories are:
+	* scheduler: callbacks executed by the Scheduler, named after the called function
+	* timer_test: Timer tick tests (the tick calls aren't recorded separately, usually the only
+	  one is the Scheduler tick)
+	* message: MessageBus.broadcast, named after the message class
+	* pathfinding: FindPath searches, named after the type of path nodes, work is the number of
+	  nodes the search reached
+	* tick: the Scheduler tick itself
+	The seconds are inclusive, i.e. a message that is sent in a scheduled callback counts for
+	both. The own seconds exclude the sections nested in a section, so they add up to the
+	time spent in all sections (use them for a breakdown of the tick time).
+
+	The sections are kept per tick for the most recent ticks, so it's possible to see what blew
+	the budget of a specific tick, as well as summed up over the whole run.
+
+	Profiling is enabled by creating the instance (see --profile-ticks). Instrumented code
+	checks TickProfiler(), which returns None if profiling is disabled.
+	"""
+	__metaclass__ = ManualConstructionSingleton
+
+	CSV_COLUMNS = ('tick', 'category', 'name', 'calls', 'seconds', 'work', 'own_seconds')
+
+	def __init__(self, history=1000):
+		"""
+		@param history: number of ticks to keep the per tick data of
+		"""
+		super(TickProfiler, self).__init__()
+		self.ticks = deque(maxlen=history) # [ (tick id, { (category, name): [calls, seconds, work, own seconds] }) ]
+		self.totals = defaultdict(lambda: [0, 0.0, 0, 0.0])
+		self._current = defaultdict(lambda: [0, 0.0, 0, 0.0])
+		self._open_sections = [] # [ [start time, seconds of the nested sections] ]
+		self._names = {}
+		self.modules = {} # section name of functions -> module they are defined in
+
+	def add(self, category, name, seconds, work=0, own_seconds=None):
+		"""Records one call of a section in the current tick.
+		@param own_seconds: seconds without the nested sections, the same as seconds by default"""
+		entry = self._current[(category, name)]
+		entry[0] += 1
+		entry[1] += seconds
+		entry[2] += work
+		entry[3] += seconds if own_seconds is None else own_seconds
+
+	def begin_section(self):
+		"""Starts measuring a section, it ends with the next call of end_section.
+		Sections that begin before that are nested in it."""
+		self._open_sections.append([time.time(), 0.0])
+
+	def end_section(self, category, name, work=0):
+		"""Ends the section that began last and records it in the current tick."""
+		start, nested_seconds = self._open_sections.pop()
+		seconds = time.time() - start
+		if self._open_sections:
+			self._open_sections[-1][1] += seconds
+		self.add(category, name, seconds, work, seconds - nested_seconds)
+
+	def call(self, category, func, *args):
+		"""Calls func(*args) and records it in the section named after func.
+		@return: the return value of func"""
+		self.begin_section()
+		try:
+			return func(*args)
+		finally:
+			self.end_section(category, self.get_name(func))
+
+	def end_tick(self, tick_id, seconds):
+		"""Finishes the current tick, everything recorded up to now belongs to it.
+		@param seconds: duration of the tick"""
+		self.add('tick', 'tick', seconds)
+		for key, values in self._current.iteritems():
+			total = self.totals[key]
+			for i, value in enumerate(values):
+				total[i] += value
+		self.ticks.append((tick_id, dict(self._current)))
+		self._current.clear()
+		del self._open_sections[:] # sections that were left by an exception
+
+	def get_name(self, func):
+		"""Returns a readable, stable name for callables such as bound methods and Callbacks."""
+		while isinstance(func, (Callback, functools.partial, WeakMethod)):
+			if isinstance(func, Callback):
+				func = func.callback
+			elif isinstance(func, functools.partial):
+				func = func.func
+			else:
+				func = func.function
+
+		if isinstance(func, types.MethodType):
+			cls = func.im_class if func.im_self is None else func.im_self.__class__
+			key = (cls, func.im_func)
+		elif isinstance(func, types.FunctionType):
+			key = func.func_code
+		else:
+			key = func.__class__
+
+		if key not in self._names:
+			if isinstance(func, types.MethodType):
+				name = '%s.%s' % (key[0].__name__, func.im_func.__name__)
+				self.modules[name] = func.im_func.__module__
+			elif isinstance(func, types.FunctionType):
+				name = '%s.%s' % (func.__module__, func.__name__)
+				if func.__name__ == '<lambda>':
+					name += ':%d' % func.func_code.co_firstlineno
+				self.modules[name] = func.__module__
+			else:
+				name = key.__name__
+				self.modules[name] = key.__module__
+			self._names[key] = name
+		return self._names[key]
+
+	def get_slowest_ticks(self, count=10):
+		"""Returns the tick ids and durations of the slowest recorded ticks."""
+		durations = [(sections[('tick', 'tick')][1], tick_id) for tick_id, sections in self.ticks]
+		durations.sort(reverse=True)
+		return [(tick_id, seconds) for seconds, tick_id in durations[:count]]
+
+	def _iter_rows(self):
+		for tick_id, sections in self.ticks:
+			for (category, name), values in sorted(sections.iteritems()):
+				yield (tick_id, category, name) + tuple(values)
+
+	def save_csv(self, path):
+		"""Writes one row per section and tick."""
+		with open(path, 'wb') as f:
+			writer = csv.writer(f)
+			writer.writerow(self.CSV_COLUMNS)
+			writer.writerows(self._iter_rows())
+
+	def save_json(self, path):
+		"""Writes the per tick data as well as the totals."""
+		data = {
+			'ticks': [{'tick': tick_id,
+			           'sections': [dict(zip(self.CSV_COLUMNS[1:], (category, name) + tuple(values)))
+			                        for (category, name), values in sorted(sections.iteritems())]}
+			          for tick_id, sections in self.ticks],
+			'totals': [dict(zip(self.CSV_COLUMNS[1:], (category, name) + tuple(values)))
+			           for (category, name), values in sorted(self.totals.iteritems())],
+		}
+		with open(path, 'w') as f:
+			json.dump(data, f, indent=1)
+
+	def save(self, path):
+		"""Writes the data, the format is chosen by the file extension (.csv or .json)."""
+		if path.endswith('.csv'):
+			self.save_csv(path)
+		else:
+			self.save_json(path)
@@ -31,8 +31,12 @@ from collections import deque
 import horizons.globals
 from horizons.world.island import Island
 from horizons.world.player import HumanPlayer
+from horizons.world.unitgrid import UnitGrid
+from horizons.world.checkupdigest import CheckupDigest
 from horizons.util.buildingindexer import BuildingIndexer
 from horizons.util.color import Color
+from horizons.util.pathfinding.pathcache import PathCache
+from horizons.util.pathfinding.pathgrid import PathGrid
 from horizons.util.python import decorators
 from horizons.util.shapes import Circle, Point, Rect
 from horizons.util.worldobject import WorldObject
@@ -82,6 +86,8 @@ class World(BuildingOwner, WorldObject):
 		if False:
 			assert isinstance(session, horizons.session.Session)
 		self.session = session
+		# state digest for multiplayer games, it is fed while the world is loaded and played
+		self.checkup_digest = CheckupDigest()
 		super(World, self).__init__(worldid=GAME.WORLD_WORLDID)
 
 	def end(self):
@@ -109,10 +115,17 @@ class World(BuildingOwner, WorldObject):
 		self.full_map = None
 		self.island_map = None
 		self.water = None
+		self.water_grid = None
+		self.water_and_coastline_grid = None
+		self.water_path_cache = None
+		self.water_and_coastline_path_cache = None
 		self.ships = None
 		self.ship_map = None
+		self.ship_grid = None
 		self.fish_indexer = None
 		self.ground_units = None
+		self.ground_unit_grid = None
+		self.checkup_digest = None
 
 		if self.pirate is not None:
 			self.pirate.end()
@@ -178,6 +191,13 @@ class World(BuildingOwner, WorldObject):
 		self._init_shallow_water_bodies()
 		self.shallow_sea_number = self.shallow_water_body[(self.min_x, self.min_y)]
 
+		# grid versions of the above for the ship pathers, both don't change during the game
+		self.water_grid = PathGrid(self.map_dimensions, self.water)
+		self.water_and_coastline_grid = PathGrid(self.map_dimensions, self.water_and_coastline)
+		# ships go to the same places over and over again, cache their paths
+		self.water_path_cache = PathCache(self.water_grid, self.water_body)
+		self.water_and_coastline_path_cache = PathCache(self.water_and_coastline_grid, self.shallow_water_body)
+
 		# create ship position list. entries: ship_map[(x, y)] = ship
 		self.ship_map = {}
 		self.ground_unit_map = {}
@@ -186,6 +206,9 @@ class World(BuildingOwner, WorldObject):
 		# and having at least one reference to them
 		self.ships = []
 		self.ground_units = []
+		# spatial hashes of the above for radius queries, see get_ships
+		self.ship_grid = UnitGrid()
+		self.ground_unit_grid = UnitGrid()
 
 		# create bullets list, used for saving bullets in ongoing attacks
 		self.bullets = []
@@ -602,21 +625,19 @@ class World(BuildingOwner, WorldObject):
 	def get_ships(self, position=None, radius=None):
 		"""Returns all ships on the map, optionally only those in range
 		around the specified position.
-		@param position: Point or Rect instance.
+		@param position: Point instance.
 		@param radius: int radius to use.
-		@return: List of ships.
+		@return: List of ships, sorted by worldid if a radius is given.
 		"""
 		if position is not None and radius is not None:
-			circle = Circle(position, radius)
-			return [ship for ship in self.ships if circle.contains(ship.position)]
+			return self.ship_grid.get_units_in_circle(Circle(position, radius))
 		else:
 			return self.ships
 
 	def get_ground_units(self, position=None, radius=None):
 		"""@see get_ships"""
 		if position is not None and radius is not None:
-			circle = Circle(position, radius)
-			return [unit for unit in self.ground_units if circle.contains(unit.position)]
+			return self.ground_unit_grid.get_units_in_circle(Circle(position, radius))
 		else:
 			return self.ground_units
 
@@ -681,12 +702,19 @@ class World(BuildingOwner, WorldObject):
 		self.disaster_manager.save(db)
 
 	def get_checkup_hash(self):
-		"""Returns a collection of important game state values. Used to check if two mp games have diverged.
-		Not designed to be reliable."""
+		"""Returns a few numbers that describe important game state values. Used to check if two mp games have diverged.
+		Not designed to be reliable.
+		@return: tuple of ints, the next random number and the values of the CheckupDigest"""
 		# NOTE: don't include float values, they are represented differently in python 2.6 and 2.7
 		# and will differ at some insignificant place. Also make sure to handle them correctly in the game logic.
+		# random() returns multiples of 2**-53, so this is exact
+		rngvalue = int(self.session.random.random() * 2**53)
+		return (rngvalue, ) + self.checkup_digest.get_values()
+
+	def get_checkup_dump(self):
+		"""Returns the values summed up in the checkup digest in readable form.
+		Only used for logging after the checkup hashes of mp games differed."""
 		data = {
-			'rngvalue': self.session.random.random(),
 			'settlements': [],
 			'ships': [],
 		}
@@ -698,6 +726,7 @@ class World(BuildingOwner, WorldObject):
 			for settlement in island.settlements:
 				storage_dict = settlement.get_component(StorageComponent).inventory._storage
 				entry = {
+					'worldid': str(settlement.worldid),
 					'owner': str(settlement.owner.worldid),
 					'inhabitants': str(settlement.inhabitants),
 					'cumulative_running_costs': str(settlement.cumulative_running_costs),
@@ -707,6 +736,7 @@ class World(BuildingOwner, WorldObject):
 				data['settlements'].append(entry)
 		for ship in self.ships:
 			entry = {
+				'worldid': str(ship.worldid),
 				'owner': str(ship.owner.worldid),
 				'position': ship.position.to_tuple(),
 			}
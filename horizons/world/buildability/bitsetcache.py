@@ -0,0 +1,397 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+"""
+Bit array representation of the buildability caches.
+
+Every layer of a cache (the coordinates where a building of a certain size can be placed)
+is stored as the bits of one long that covers the bounding rect of the island. The layer
+of a size is computed from the layer of single tiles by shifting and AND-ing the whole
+long, which python does in C instead of looping over sets of tuples.
+
+The layers are exposed as CoordsBitset instances, which behave like frozensets of
+coordinates, so the code that uses the caches doesn't have to know the representation.
+The game uses them instead of the sets when GAME.BITSET_BUILDABILITY_CACHES is enabled,
+see create_terrain_cache and create_binary_cache.
+"""
+
+from binascii import hexlify, unhexlify
+
+from horizons.constants import GAME
+from horizons.world.buildability.binarycache import BinaryBuildabilityCache
+from horizons.world.buildability.terraincache import TerrainBuildabilityCache, TerrainRequirement
+
+# the indices of the set bits of every byte value
+_BYTE_BITS = [tuple(bit for bit in xrange(8) if value & (1 << bit)) for value in xrange(256)]
+
+
+class BitGrid(object):
+	"""
+	Maps the coordinates of a rectangular area to bit positions.
+
+	The bit of (x, y) is (x - left) * stride + (y - top). Every column is followed by
+	PADDING zero bits, so shifting a bit array right by up to PADDING moves every bit
+	to a smaller y in the same column or to a padding bit, never into another column.
+	Shifting by stride moves it to the previous column.
+	"""
+
+	PADDING = 8 # has to be at least the size of the largest building
+
+	def __init__(self, rect):
+		self.left = rect.left
+		self.top = rect.top
+		self.width = rect.width
+		self.height = rect.height
+		self.stride = self.height + self.PADDING
+		self._num_bytes = (self.width * self.stride + 7) // 8
+
+	def get_index(self, coords):
+		"""Returns the bit position of coords or None if they are outside of the area"""
+		x = coords[0] - self.left
+		y = coords[1] - self.top
+		if 0 <= x < self.width and 0 <= y < self.height:
+			return x * self.stride + y
+		return None
+
+	def get_bits(self, coords_list):
+		"""Returns the bit array (a long) of the coordinates in coords_list"""
+		left = self.left
+		top = self.top
+		stride = self.stride
+		data = bytearray(self._num_bytes)
+		for (x, y) in coords_list:
+			index = (x - left) * stride + y - top
+			data[index >> 3] |= 1 << (index & 7)
+		data.reverse() # the hex representation is big endian
+		return long(hexlify(data), 16) if data else 0L
+
+	def get_bytes(self, bits):
+		"""Returns the bit array as a bytearray, the bit of index i is data[i >> 3] >> (i & 7) & 1"""
+		data = bytearray(unhexlify(('%x' % bits).zfill(self._num_bytes * 2)))
+		data.reverse()
+		return data
+
+	def get_coords(self, bits):
+		"""Returns the list of the coordinates of the set bits, sorted by bit position"""
+		if not bits:
+			return []
+		data = self.get_bytes(bits)
+
+		left = self.left
+		top = self.top
+		stride = self.stride
+		byte_bits = _BYTE_BITS
+		result = []
+		for byte_index, value in enumerate(data):
+			if value:
+				for bit in byte_bits[value]:
+					x, y = divmod((byte_index << 3) + bit, stride)
+					result.append((x + left, y + top))
+		return result
+
+	def get_rect_bits(self, bits, width, height):
+		"""Returns the bit array of the origins of the width x height rectangles that
+		are entirely in bits"""
+		column = bits
+		for dy in xrange(1, height):
+			column &= bits >> dy
+		result = column
+		for dx in xrange(1, width):
+			result &= column >> (dx * self.stride)
+		return result
+
+	def get_rect_any_bits(self, bits, width, height):
+		"""Returns the bit array of the origins of the width x height rectangles that
+		have at least one tile in bits"""
+		column = bits
+		for dy in xrange(1, height):
+			column |= bits >> dy
+		result = column
+		for dx in xrange(1, width):
+			result |= column >> (dx * self.stride)
+		return result
+
+
+class CoordsBitset(object):
+	"""
+	Immutable set of coordinates stored as a bit array of a BitGrid.
+
+	It can be used like a frozenset of (x, y) tuples. Set operations with other
+	instances on the same grid are done on the bit arrays, everything else falls back
+	to a frozenset that is created the first time it is needed.
+	Comparisons have to start with the CoordsBitset though: frozenset == CoordsBitset
+	is always False and frozenset <= CoordsBitset raises a TypeError, because sets
+	only compare to sets.
+	"""
+
+	def __init__(self, grid, bits):
+		self.grid = grid
+		self.bits = bits
+		self._set = None
+		self._bytes = None # bytearray of the bits for cheap lookups
+
+	def _get_set(self):
+		if self._set is None:
+			self._set = frozenset(self.grid.get_coords(self.bits))
+		return self._set
+
+	def _is_compatible(self, other):
+		return isinstance(other, CoordsBitset) and other.grid is self.grid
+
+	def __contains__(self, coords):
+		if self._set is not None:
+			return coords in self._set
+		index = self.grid.get_index(coords)
+		if index is None:
+			return False
+		if self._bytes is None:
+			self._bytes = self.grid.get_bytes(self.bits)
+		return self._bytes[index >> 3] >> (index & 7) & 1 == 1
+
+	def __iter__(self):
+		return iter(self._get_set())
+
+	def __len__(self):
+		if self._set is not None:
+			return len(self._set)
+		return bin(self.bits).count('1')
+
+	def __nonzero__(self):
+		return self.bits != 0
+
+	def __eq__(self, other):
+		if self._is_compatible(other):
+			return self.bits == other.bits
+		return self._get_set() == other
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash(self._get_set())
+
+	def __repr__(self):
+		return 'CoordsBitset(%s)' % sorted(self._get_set())
+
+	def intersection(self, *others):
+		if all(self._is_compatible(other) for other in others):
+			bits = self.bits
+			for other in others:
+				bits &= other.bits
+			return CoordsBitset(self.grid, bits)
+		return self._get_set().intersection(*others)
+
+	def union(self, *others):
+		if all(self._is_compatible(other) for other in others):
+			bits = self.bits
+			for other in others:
+				bits |= other.bits
+			return CoordsBitset(self.grid, bits)
+		return self._get_set().union(*others)
+
+	def difference(self, *others):
+		if all(self._is_compatible(other) for other in others):
+			bits = self.bits
+			for other in others:
+				bits &= ~other.bits
+			return CoordsBitset(self.grid, bits)
+		return self._get_set().difference(*others)
+
+	def symmetric_difference(self, other):
+		if self._is_compatible(other):
+			return CoordsBitset(self.grid, self.bits ^ other.bits)
+		return self._get_set().symmetric_difference(other)
+
+	def issubset(self, other):
+		if self._is_compatible(other):
+			return self.bits & ~other.bits == 0
+		return self._get_set().issubset(other)
+
+	def issuperset(self, other):
+		if self._is_compatible(other):
+			return other.bits & ~self.bits == 0
+		return self._get_set().issuperset(other)
+
+	def isdisjoint(self, other):
+		if self._is_compatible(other):
+			return self.bits & other.bits == 0
+		return self._get_set().isdisjoint(other)
+
+	def copy(self):
+		return self
+
+	# like the ones of frozenset, the operators only accept sets
+	def __and__(self, other):
+		if not isinstance(other, (CoordsBitset, set, frozenset)):
+			return NotImplemented
+		return self.intersection(other)
+
+	def __or__(self, other):
+		if not isinstance(other, (CoordsBitset, set, frozenset)):
+			return NotImplemented
+		return self.union(other)
+
+	def __sub__(self, other):
+		if not isinstance(other, (CoordsBitset, set, frozenset)):
+			return NotImplemented
+		return self.difference(other)
+
+	def __xor__(self, other):
+		if not isinstance(other, (CoordsBitset, set, frozenset)):
+			return NotImplemented
+		return self.symmetric_difference(other)
+
+	# set & CoordsBitset etc. (the result has the type of the left operand, like with frozensets)
+	def __rand__(self, other):
+		if not isinstance(other, (set, frozenset)):
+			return NotImplemented
+		return other & self._get_set()
+
+	def __ror__(self, other):
+		if not isinstance(other, (set, frozenset)):
+			return NotImplemented
+		return other | self._get_set()
+
+	def __rsub__(self, other):
+		if not isinstance(other, (set, frozenset)):
+			return NotImplemented
+		return other - self._get_set()
+
+	def __rxor__(self, other):
+		if not isinstance(other, (set, frozenset)):
+			return NotImplemented
+		return other ^ self._get_set()
+
+	def __le__(self, other):
+		if not isinstance(other, (CoordsBitset, set, frozenset)):
+			return NotImplemented
+		return self.issubset(other)
+
+	def __ge__(self, other):
+		if not isinstance(other, (CoordsBitset, set, frozenset)):
+			return NotImplemented
+		return self.issuperset(other)
+
+	def __lt__(self, other):
+		return self <= other and self != other
+
+	def __gt__(self, other):
+		return self >= other and self != other
+
+
+class BitsetTerrainBuildabilityCache(TerrainBuildabilityCache):
+	"""A TerrainBuildabilityCache whose layers are CoordsBitset instances."""
+
+	def __init__(self, island):
+		self.grid = BitGrid(island.position)
+		super(BitsetTerrainBuildabilityCache, self).__init__(island)
+
+	def create_cache(self):
+		self._init_land_and_coast()
+		grid = self.grid
+
+		land_bits = grid.get_bits(self._land)
+		coast_bits = grid.get_bits(self._coast)
+		land_or_coast_bits = land_bits | coast_bits
+
+		land = {}
+		land[(1, 1)] = CoordsBitset(grid, land_bits)
+		for size in self.sizes:
+			if size != (1, 1):
+				land[size] = CoordsBitset(grid, grid.get_rect_bits(land_bits, size[0], size[1]))
+				if size[0] != size[1]:
+					land[(size[1], size[0])] = CoordsBitset(grid, grid.get_rect_bits(land_bits, size[1], size[0]))
+
+		# coastal buildings have to be on land or coast and have at least one tile of each
+		land_and_coast = {}
+		for size in [(2, 2), (3, 3)]:
+			bits = grid.get_rect_bits(land_or_coast_bits, size[0], size[1])
+			bits &= grid.get_rect_any_bits(land_bits, size[0], size[1])
+			bits &= ~land[size].bits
+			land_and_coast[size] = CoordsBitset(grid, bits)
+
+		self.cache = {}
+		self.cache[TerrainRequirement.LAND] = land
+		self.cache[TerrainRequirement.LAND_AND_COAST] = land_and_coast
+
+	def create_sea_cache(self):
+		super(BitsetTerrainBuildabilityCache, self).create_sea_cache()
+		near_sea = self.cache[TerrainRequirement.LAND_AND_COAST_NEAR_SEA]
+		near_sea[(3, 3)] = CoordsBitset(self.grid, self.grid.get_bits(near_sea[(3, 3)]))
+
+	def get_buildability_intersection(self, terrain_type, size, *other_cache_layers):
+		return self.cache[terrain_type][size].intersection(*[cache_layer.cache[size] for cache_layer in other_cache_layers])
+
+
+class BitsetBinaryBuildabilityCache(object):
+	"""
+	A BinaryBuildabilityCache whose layers are CoordsBitset instances.
+
+	It needs a BitsetTerrainBuildabilityCache. Instead of updating the layers tile by tile,
+	every change recomputes them from the bit array of the area.
+	"""
+
+	def __init__(self, terrain_cache):
+		self.terrain_cache = terrain_cache
+		self.grid = terrain_cache.grid
+		self._bits = 0L
+		self.coords_set = CoordsBitset(self.grid, 0L)
+		self.cache = {} # {(width, height): CoordsBitset, ...}
+		self._update()
+
+	def _update(self):
+		grid = self.grid
+		bits = self._bits
+		self.coords_set = CoordsBitset(grid, bits)
+		self.cache[(1, 1)] = self.coords_set
+		for size in TerrainBuildabilityCache.sizes:
+			if size != (1, 1):
+				self.cache[size] = CoordsBitset(grid, grid.get_rect_bits(bits, size[0], size[1]))
+				if size[0] != size[1]:
+					self.cache[(size[1], size[0])] = CoordsBitset(grid, grid.get_rect_bits(bits, size[1], size[0]))
+
+	def add_area(self, new_coords_list):
+		"""Add a list of new coordinates to the area."""
+		new_bits = self.grid.get_bits(new_coords_list)
+		assert not new_bits & self._bits
+		self._bits |= new_bits
+		self._update()
+
+	def remove_area(self, removed_coords_list):
+		"""Remove a list of existing coordinates from the area."""
+		removed_bits = self.grid.get_bits(removed_coords_list)
+		assert removed_bits & self._bits == removed_bits
+		self._bits &= ~removed_bits
+		self._update()
+
+
+def create_terrain_cache(island):
+	"""Returns the terrain cache of the island in the representation that the game uses."""
+	if GAME.BITSET_BUILDABILITY_CACHES:
+		return BitsetTerrainBuildabilityCache(island)
+	return TerrainBuildabilityCache(island)
+
+def create_binary_cache(terrain_cache):
+	"""Returns an empty binary cache that can be used together with terrain_cache."""
+	if isinstance(terrain_cache, BitsetTerrainBuildabilityCache):
+		return BitsetBinaryBuildabilityCache(terrain_cache)
+	return BinaryBuildabilityCache(terrain_cache)
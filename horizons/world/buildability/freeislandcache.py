@@ -19,7 +19,7 @@
 # 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 # ###################################################
 
-from horizons.world.buildability.binarycache import BinaryBuildabilityCache
+from horizons.world.buildability.bitsetcache import create_binary_cache
 
 class FreeIslandBuildabilityCache(object):
 	"""
@@ -36,7 +36,7 @@ class FreeIslandBuildabilityCache(object):
 	"""
 
 	def __init__(self, island):
-		self._binary_cache = BinaryBuildabilityCache(island.terrain_cache)
+		self._binary_cache = create_binary_cache(island.terrain_cache)
 		self.cache = self._binary_cache.cache # {(width, height): set((x, y), ...), ...}
 		self.island = island
 		self._init()
@@ -19,13 +19,20 @@
 # 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 # ###################################################
 
-from horizons.world.buildability.binarycache import BinaryBuildabilityCache
+from horizons.world.buildability.bitsetcache import create_binary_cache
 
-class SettlementBuildabilityCache(BinaryBuildabilityCache):
-	"""A specialized BinaryBuildabilityCache for settlements."""
+class SettlementBuildabilityCache(object):
+	"""
+	A specialized BinaryBuildabilityCache for settlements.
+
+	Instances of this class can answer the same queries as BinaryBuildabilityCache. The area
+	is kept in a binary cache of the same representation as the terrain cache.
+	"""
 
 	def __init__(self, terrain_cache, settlement_ground_map):
-		super(SettlementBuildabilityCache, self).__init__(terrain_cache)
+		self._binary_cache = create_binary_cache(terrain_cache)
+		self.cache = self._binary_cache.cache # {(width, height): set((x, y), ...), ...}
+		self.terrain_cache = terrain_cache
 		self.settlement_ground_map = settlement_ground_map
 
 	def add_area(self, coords_list):
@@ -36,7 +43,7 @@ class SettlementBuildabilityCache(BinaryBuildabilityCache):
 			if coords in land_or_coast:
 				add_list.append(coords)
 		if add_list:
-			super(SettlementBuildabilityCache, self).add_area(add_list)
+			self._binary_cache.add_area(add_list)
 
 	def modify_area(self, coords_list):
 		"""
@@ -47,6 +54,7 @@ class SettlementBuildabilityCache(BinaryBuildabilityCache):
 		"""
 
 		land_or_coast = self.terrain_cache.land_or_coast
+		coords_set = self._binary_cache.coords_set
 
 		add_list = []
 		remove_list = []
@@ -57,12 +65,12 @@ class SettlementBuildabilityCache(BinaryBuildabilityCache):
 
 			object = self.settlement_ground_map[coords].object
 			if object is None or object.buildable_upon:
-				if coords not in self.coords_set:
+				if coords not in coords_set:
 					add_list.append(coords)
-			elif coords in self.coords_set:
+			elif coords in coords_set:
 				remove_list.append(coords)
 
 		if remove_list:
-			self.remove_area(remove_list)
+			self._binary_cache.remove_area(remove_list)
 		if add_list:
-			super(SettlementBuildabilityCache, self).add_area(add_list)
+			self._binary_cache.add_area(add_list)
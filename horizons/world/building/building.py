@@ -103,6 +103,7 @@ class BasicBuilding(ComponentHolder, ConcreteObject):
 	def toggle_costs(self):
 		self.running_costs, self.running_costs_inactive = \
 				self.running_costs_inactive, self.running_costs
+		self.session.world.checkup_digest.update_building(self)
 
 	def running_costs_active(self):
 		"""Returns whether the building currently payes the running costs for status 'active'"""
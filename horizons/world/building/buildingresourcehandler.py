@@ -20,6 +20,7 @@
 # ###################################################
 
 from horizons.messaging import ResourceProduced
+from horizons.component.storagecomponent import StorageComponent
 from horizons.world.resourcehandler import ResourceHandler
 from horizons.world.production.producer import Producer
 
@@ -37,6 +38,10 @@ class BuildingResourceHandler(ResourceHandler):
 
 	def __init(self):
 		self.island.provider_buildings.append(self)
+		# amounts of the provided res at the last inventory change, to find out which increased
+		inventory = self.get_component(StorageComponent).inventory
+		self.__provided_amounts = dict((res, inventory[res]) for res in self.provided_resources)
+		inventory.add_change_listener(self._on_inventory_changed)
 		if self.has_component(Producer):
 			self.get_component(Producer).add_activity_changed_listener(self._set_running_costs_to_status)
 			self.get_component(Producer).add_production_finished_listener(self.on_production_finished)
@@ -49,10 +54,31 @@ class BuildingResourceHandler(ResourceHandler):
 	def remove(self):
 		super(BuildingResourceHandler, self).remove()
 		self.island.provider_buildings.remove(self)
+		self.get_component(StorageComponent).inventory.discard_change_listener(self._on_inventory_changed)
 		if self.has_component(Producer):
 			self.get_component(Producer).remove_activity_changed_listener(self._set_running_costs_to_status)
 			self.get_component(Producer).remove_production_finished_listener(self.on_production_finished)
 
+	def remove_incoming_collector(self, collector):
+		super(BuildingResourceHandler, self).remove_incoming_collector(collector)
+		# the res it was coming for can now be picked up by others
+		resources = None if collector.job is None else [entry.res for entry in collector.job.reslist]
+		self.island.provider_buildings.provider_changed(self, resources)
+
+	def _on_inventory_changed(self):
+		# only more res can make a difference for collectors
+		inventory = self.get_component(StorageComponent).inventory
+		provided_amounts = self.__provided_amounts
+		increased = []
+		for res, old_amount in provided_amounts.iteritems():
+			amount = inventory[res]
+			if amount != old_amount:
+				provided_amounts[res] = amount
+				if amount > old_amount:
+					increased.append(res)
+		if increased:
+			self.island.provider_buildings.provider_changed(self, increased)
+
 	def on_production_finished(self, caller, resources):
 		if self.is_valid_tradable_resource(resources):
 			ResourceProduced.broadcast(self, caller, resources)
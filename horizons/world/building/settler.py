@@ -100,6 +100,7 @@ class Settler(BuildableRect, BuildingResourceHandler, BasicBuilding):
 		remaining_ticks = \
 		    db("SELECT ticks FROM remaining_ticks_of_month WHERE rowid=?", worldid)[0][0]
 		self.__init(loading=True, last_tax_payed=last_tax_payed)
+		self.session.world.checkup_digest.update_building(self)
 		self._load_upgrade_data(db)
 		SettlerUpdate.broadcast(self, self.level, self.level)
 		self.run(remaining_ticks)
@@ -207,6 +208,7 @@ class Settler(BuildableRect, BuildingResourceHandler, BasicBuilding):
 			# TODO: this probably also isn't necessary on loading, but it's
 			# not touched before the relase (2012.1)
 			self.update_action_set_level(self.level)
+			self.session.world.checkup_digest.update_building(self)
 
 	def run(self, remaining_ticks=None):
 		"""Start regular tick calls"""
@@ -233,6 +235,7 @@ class Settler(BuildableRect, BuildingResourceHandler, BasicBuilding):
 
 		self.settlement.owner.get_component(StorageComponent).inventory.alter(RES.GOLD, real_taxes)
 		self.last_tax_payed = real_taxes
+		self.session.world.checkup_digest.update_building(self)
 
 		# decrease happiness http://wiki.unknown-horizons.org/w/Settler_taxing#Formulae
 		difference = 1.0 - self.settlement.tax_settings[self.level]
@@ -264,6 +267,7 @@ class Settler(BuildableRect, BuildingResourceHandler, BasicBuilding):
 			# see http://wiki.unknown-horizons.org/w/Supply_citizens_with_resources
 			self.get_component(Producer).alter_production_time( 6.0/7.0 * math.log( 1.5 * (self.inhabitants + 1.2) ) )
 			self.inhabitants += change
+			self.session.world.checkup_digest.update_building(self)
 			SettlerInhabitantsChanged.broadcast(self, change)
 			self._changed()
 
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from horizons.util.python import decorators
+
+MASK = 0xffffffffffffffff
+
+def get_weight(key):
+	"""Returns a pseudo random 64 bit number for a tuple of ints.
+	Python's hash() can't be used here, it differs between 32 and 64 bit systems.
+	@param key: tuple of ints
+	@return: odd long in [1, 2**64)"""
+	value = 0x9e3779b97f4a7c15
+	for part in key:
+		value = ((value ^ part) * 0xbf58476d1ce4e5b9) & MASK
+		value ^= value >> 31
+	return value | 1
+
+class CheckupDigest(object):
+	"""Running digest of the game state that is compared between the players of a multiplayer
+	game (see MPManager), so the state doesn't have to be collected for every check.
+
+	Every part of the state is a sum of weight(key) * value over all its values, modulo 2**64.
+	Changes are folded in as they happen by adding weight(key) * (new value - old value):
+	 * inventories: settlement inventories, per resource (see GenericStorage.set_checkup_digest)
+	 * settlements: inhabitants, running costs and taxes of the buildings of each settlement
+	 * ships: the position of every ship
+
+	World.get_checkup_dump collects the same values in readable form after a mismatch."""
+
+	PART_NAMES = ('settlements', 'inventories', 'ships')
+	SETTLEMENTS, INVENTORIES, SHIPS = xrange(len(PART_NAMES))
+
+	# values of buildings that are summed up per settlement
+	INHABITANTS, RUNNING_COSTS, TAXES = xrange(3)
+
+	def __init__(self):
+		self._parts = [0] * len(self.PART_NAMES)
+		# {building: (settlement worldid, (inhabitants, running costs, taxes))}
+		self._building_values = {}
+
+	def add(self, part, key, amount):
+		"""Folds a change of a value into the digest.
+		@param part: one of SETTLEMENTS, INVENTORIES and SHIPS
+		@param key: tuple of ints that identifies the value
+		@param amount: int, difference between the new and the old value"""
+		self._parts[part] = (self._parts[part] + get_weight(key) * int(amount)) & MASK
+
+	def get_values(self):
+		"""Returns the current digest.
+		@return: tuple of longs, one per part"""
+		return tuple(self._parts)
+
+	@classmethod
+	def _get_building_values(cls, building):
+		return (building.inhabitants, building.running_costs, getattr(building, 'last_tax_payed', 0))
+
+	def add_building(self, settlement, building):
+		"""Starts tracking the values of a building that has been added to settlement."""
+		values = self._get_building_values(building)
+		self._building_values[building] = (settlement.worldid, values)
+		for field, value in enumerate(values):
+			self.add(self.SETTLEMENTS, (settlement.worldid, field), value)
+
+	def remove_building(self, building):
+		"""Stops tracking the values of a building that has been removed from its settlement."""
+		settlement_id, values = self._building_values.pop(building)
+		for field, value in enumerate(values):
+			self.add(self.SETTLEMENTS, (settlement_id, field), -value)
+
+	def update_building(self, building):
+		"""Has to be called after values of a building have changed, see _get_building_values.
+		Buildings that aren't part of a settlement are ignored."""
+		if building not in self._building_values:
+			return
+		settlement_id, old_values = self._building_values[building]
+		values = self._get_building_values(building)
+		if values == old_values:
+			return
+		self._building_values[building] = (settlement_id, values)
+		for field, (value, old_value) in enumerate(zip(values, old_values)):
+			if value != old_value:
+				self.add(self.SETTLEMENTS, (settlement_id, field), value - old_value)
+
+	def add_ship(self, ship):
+		self.add(self.SHIPS, (ship.worldid, ship.position.x, ship.position.y), 1)
+
+	def remove_ship(self, ship):
+		self.add(self.SHIPS, (ship.worldid, ship.position.x, ship.position.y), -1)
+
+	def move_ship(self, ship, old_position):
+		self.add(self.SHIPS, (ship.worldid, old_position.x, old_position.y), -1)
+		self.add_ship(ship)
+
+decorators.bind_all(CheckupDigest)
@@ -36,7 +36,8 @@ from horizons.constants import BUILDINGS, RES, UNITS
 from horizons.scenario import CONDITIONS
 from horizons.world.buildingowner import BuildingOwner
 from horizons.world.buildability.freeislandcache import FreeIslandBuildabilityCache
-from horizons.world.buildability.terraincache import TerrainBuildabilityCache, TerrainRequirement
+from horizons.world.buildability.bitsetcache import create_terrain_cache
+from horizons.world.buildability.terraincache import TerrainRequirement
 from horizons.gui.widgets.minimap import Minimap
 from horizons.world.ground import MapPreviewTile
 
@@ -101,7 +102,7 @@ class Island(BuildingOwner, WorldObject):
 			self.settlements.append(settlement)
 
 		if not preview:
-			self.terrain_cache = TerrainBuildabilityCache(self)
+			self.terrain_cache = create_terrain_cache(self)
 			flat_land_set = self.terrain_cache.cache[TerrainRequirement.LAND][(1, 1)]
 			self.available_flat_land = len(flat_land_set)
 			available_coords_set = set(self.terrain_cache.land_or_coast)
@@ -269,6 +270,9 @@ class Island(BuildingOwner, WorldObject):
 			building.settlement = settlement
 			building.owner = settlement.owner
 			settlement.add_building(building)
+			if hasattr(building, 'provided_resources'):
+				# the new owner's collectors may pick up here now
+				self.provider_buildings.provider_changed(building)
 
 		if not settlement_coords_changed:
 			return
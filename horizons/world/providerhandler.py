@@ -21,29 +21,147 @@
 # ###################################################
 
 from collections import defaultdict
+from operator import attrgetter
+
+from horizons.util.python import decorators
 
 class ProviderHandler(list):
 	"""Class to keep track of providers of an area, especially an island.
 	It acts as a data structure for quick retrieval of special properties, that only resource
 	providers have.
 
+	Providers are also kept in a grid of CELL_SIZE x CELL_SIZE cells per resource, so
+	range queries only have to look at the providers in the cells around the area.
+	A provider is only put in the cell of its upper left corner, queries extend the
+	searched area by the size of the largest provider instead. Resources with fewer
+	providers than there are cells in the searched area are just checked one by one.
+
+	It also counts, per resource and CHANGES_CELL_SIZE x CHANGES_CELL_SIZE cell, how often a provider
+	was added, removed or changed in a way that affects collectors (see provider_changed).
+	Collectors compare get_changes to skip job searches that can't have a different result
+	(see BuildingCollector.get_job).
+
 	Precondition: Provider never change their provided resources."""
 
+	CELL_SIZE = 8
+	CHANGES_CELL_SIZE = 32
+
 	def __init__(self):
 		super(ProviderHandler, self).__init__()
 		self.provider_by_resources = defaultdict(list)
+		# {res: {(cell_x, cell_y): [provider, ...]}}, res None holds all providers
+		self._grid = defaultdict(dict)
+		self._max_size = 1
+		# {(res, cell_x, cell_y): number of changes}
+		self._changes = defaultdict(int)
+
+	def _get_cell(self, provider):
+		position = provider.position
+		return (position.left // self.CELL_SIZE, position.top // self.CELL_SIZE)
 
 	def append(self, provider):
 		# NOTE: appended elements need to be removed, else there will be a memory leak
+		cell = self._get_cell(provider)
 		for res in provider.provided_resources:
 			self.provider_by_resources[res].append(provider)
+			self._grid[res].setdefault(cell, []).append(provider)
+		self._grid[None].setdefault(cell, []).append(provider)
+		position = provider.position
+		self._max_size = max(self._max_size, position.right - position.left + 1, position.bottom - position.top + 1)
 		super(ProviderHandler, self).append(provider)
+		self.provider_changed(provider)
 
 	def remove(self, provider):
+		cell = self._get_cell(provider)
 		for res in provider.provided_resources:
 			self.provider_by_resources[res].remove(provider)
+			self._remove_from_cell(res, cell, provider)
+		self._remove_from_cell(None, cell, provider)
 		super(ProviderHandler, self).remove(provider)
+		self.provider_changed(provider)
+
+	def provider_changed(self, provider, resources=None):
+		"""Has to be called whenever something changed that could allow collectors to pick up
+		more at provider: its inventory, the collectors that are on the way there or its owner.
+		@param resources: the resources that are affected, default is all that provider provides"""
+		position = provider.position
+		cell_x = position.left // self.CHANGES_CELL_SIZE
+		cell_y = position.top // self.CHANGES_CELL_SIZE
+		changes = self._changes
+		for res in (provider.provided_resources if resources is None else resources):
+			changes[(res, cell_x, cell_y)] += 1
+
+	def get_changes(self, radiusrect, resources):
+		"""Returns a number that increases whenever provider_changed is called for a provider
+		of one of the resources that might be in range.
+		@param radiusrect: instance of RadiusRect
+		@param resources: iterable of res
+		@return: int"""
+		r2 = radiusrect.center
+		radius = radiusrect.radius
+		cell_size = self.CHANGES_CELL_SIZE
+		min_x = int((r2.left - radius - self._max_size + 1) // cell_size)
+		max_x = int((r2.right + radius) // cell_size)
+		min_y = int((r2.top - radius - self._max_size + 1) // cell_size)
+		max_y = int((r2.bottom + radius) // cell_size)
+		get = self._changes.get
+		return sum(get((res, cell_x, cell_y), 0) for res in resources
+		           for cell_x in xrange(min_x, max_x + 1) for cell_y in xrange(min_y, max_y + 1))
+
+	def _remove_from_cell(self, res, cell, provider):
+		cells = self._grid[res]
+		providers = cells[cell]
+		providers.remove(provider)
+		if not providers:
+			del cells[cell]
+
+	def get_providers_in_range(self, radiusrect, resources=(None, ), player=None):
+		"""Returns the providers within the specified shape.
+		@param radiusrect: instance of RadiusRect
+		@param resources: iterable of res, only return providers that provide one of them. None means all providers.
+		@param player: Player instance, only return providers belonging to this player
+		@return: list of providers, sorted by worldid"""
+		r2 = radiusrect.center
+		radius = radiusrect.radius
+		radius_squared = radius ** 2
+		cell_size = self.CELL_SIZE
+		# a provider can start this far above or left of the area and still reach into it
+		min_x = int((r2.left - radius - self._max_size + 1) // cell_size)
+		max_x = int((r2.right + radius) // cell_size)
+		min_y = int((r2.top - radius - self._max_size + 1) // cell_size)
+		max_y = int((r2.bottom + radius) // cell_size)
 
+		window = [(cell_x, cell_y) for cell_x in xrange(min_x, max_x + 1) for cell_y in xrange(min_y, max_y + 1)]
 
+		candidate_lists = []
+		for res in resources:
+			providers = self if res is None else self.provider_by_resources.get(res)
+			if not providers:
+				continue
+			if len(providers) <= len(window):
+				# few providers, checking all of them is cheaper than looking them up
+				candidate_lists.append(providers)
+			else:
+				cells = self._grid[res]
+				candidate_lists.extend(cells[cell] for cell in window if cell in cells)
+		if len(resources) > 1:
+			# providers of several of the resources are in several lists
+			candidates = set()
+			for providers in candidate_lists:
+				candidates.update(providers)
+		else:
+			candidates = (provider for providers in candidate_lists for provider in providers)
 
+		found = []
+		for provider in candidates:
+			if player is not None and player != provider.owner:
+				continue
+			# inline of :
+			#provider.position.distance_to_rect(radiusrect.center) <= radiusrect.radius:
+			r1 = provider.position
+			if ((max(r1.left - r2.right, 0, r2.left - r1.right) ** 2) + (max(r1.top - r2.bottom, 0, r2.top - r1.bottom) ** 2)) <= radius_squared:
+				found.append(provider)
+		found.sort(key=attrgetter('worldid'))
+		return found
 
+decorators.bind_all(ProviderHandler)
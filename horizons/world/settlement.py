@@ -71,6 +71,13 @@ class Settlement(ComponentHolder, WorldObject, ChangeListener, ResourceHandler):
 		self.tax_settings = tax_settings
 		Scheduler().add_new_object(self.__init_inventory_checker, self)
 
+	def initialize(self):
+		super(Settlement, self).initialize()
+		self.__init_checkup_digest()
+
+	def __init_checkup_digest(self):
+		self.get_component(StorageComponent).inventory.set_checkup_digest(self.session.world.checkup_digest, self.worldid)
+
 	def init_buildability_cache(self, terrain_cache):
 		self.buildability_cache = SettlementBuildabilityCache(terrain_cache, self.ground_map)
 		self.buildability_cache.modify_area(self.ground_map.keys())
@@ -167,6 +174,7 @@ class Settlement(ComponentHolder, WorldObject, ChangeListener, ResourceHandler):
 			upgrade_permissions[level] = allowed
 			tax_settings[level] = tax
 		self.__init(session, WorldObject.get_object_by_id(owner), upgrade_permissions, tax_settings)
+		self.__init_checkup_digest()
 
 		# load the settlement tile map
 		tile_data = db("SELECT data FROM settlement_tiles WHERE rowid = ?", worldid)[0][0]
@@ -215,6 +223,7 @@ class Settlement(ComponentHolder, WorldObject, ChangeListener, ResourceHandler):
 			building.get_component(Producer).add_production_finished_listener(self.settlement_building_production_finished)
 		if not load and not building.buildable_upon and self.buildability_cache:
 			self.buildability_cache.modify_area([coords for coords in building.position.tuple_iter()])
+		self.session.world.checkup_digest.add_building(self, building)
 		if hasattr(self.owner, 'add_building'):
 			# notify interested players of added building
 			self.owner.add_building(building)
@@ -227,6 +236,7 @@ class Settlement(ComponentHolder, WorldObject, ChangeListener, ResourceHandler):
 			building.get_component(Producer).remove_production_finished_listener(self.settlement_building_production_finished)
 		if not building.buildable_upon and self.buildability_cache:
 			self.buildability_cache.add_area([coords for coords in building.position.tuple_iter()])
+		self.session.world.checkup_digest.remove_building(building)
 		if hasattr(self.owner, 'remove_building'):
 			# notify interested players of removed building
 			self.owner.remove_building(building)
@@ -51,10 +51,25 @@ class GenericStorage(ChangeListener):
 	derive storages with special function from it. Normally there should be no need to
 	use the GenericStorage. Rather use a specialized version that is suitable for the job.
 	"""
+	# CheckupDigest that changes are folded into, see set_checkup_digest
+	_checkup_digest = None
+
 	def __init__(self):
 		super(GenericStorage, self).__init__()
 		self._storage = defaultdict(lambda : 0)
 
+	def set_checkup_digest(self, digest, key):
+		"""Makes the storage fold all changes of its content into digest.
+		@param digest: CheckupDigest instance
+		@param key: int that identifies this storage in the digest"""
+		self._checkup_digest = digest
+		self._checkup_key = key
+		for res, amount in self._storage.iteritems():
+			digest.add(digest.INVENTORIES, (key, res), amount)
+
+	def _checkup_changed(self, res, amount):
+		self._checkup_digest.add(self._checkup_digest.INVENTORIES, (self._checkup_key, res), amount)
+
 	def save(self, db, ownerid):
 		for slot in self._storage.iteritems():
 			db("INSERT INTO storage (object, resource, amount) VALUES (?, ?, ?) ",
@@ -74,18 +89,24 @@ class GenericStorage(ChangeListener):
 		@return: int - amount that did not fit or was not available, depending on context.
 		"""
 		self._storage[res] += amount # defaultdict
+		if self._checkup_digest is not None:
+			self._checkup_changed(res, amount)
 		self._changed()
 		return 0
 
 	def reset(self, res):
 		"""Resets a resource slot to zero, removing all its contents."""
 		if res in self._storage:
+			if self._checkup_digest is not None:
+				self._checkup_changed(res, -self._storage[res])
 			self._storage[res] = 0
 			self._changed()
 
 	def reset_all(self):
 		"""Removes every resource from this inventory"""
 		for res in self._storage:
+			if self._checkup_digest is not None:
+				self._checkup_changed(res, -self._storage[res])
 			self._storage[res] = 0
 		self._changed()
 
@@ -208,6 +229,8 @@ class GlobalLimitStorage(GenericStorage):
 		# remove res that don't fit anymore
 		for res, amount in self._storage.iteritems():
 			if amount > self.limit:
+				if self._checkup_digest is not None:
+					self._checkup_changed(res, self.limit - amount)
 				self._storage[res] = self.limit
 		self._changed()
 
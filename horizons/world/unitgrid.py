@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from operator import attrgetter
+
+from horizons.util.python import decorators
+
+class UnitGrid(object):
+	"""Spatial hash of units for quick radius queries.
+	Units are kept in CELL_SIZE x CELL_SIZE cells by their position, so a query only has to
+	look at the units in the cells its circle overlaps. Since units move, update has to be called
+	whenever the position of a unit changes (see Ship._move_tick and GroundUnit._move_tick).
+
+	Units are expected to have a worldid and a position that is a Point."""
+
+	CELL_SIZE = 8
+
+	def __init__(self):
+		# {(cell_x, cell_y): set([unit, ...])}
+		self._cells = {}
+		# {unit: (cell_x, cell_y)}
+		self._unit_cells = {}
+
+	def _get_cell(self, position):
+		return (position.x // self.CELL_SIZE, position.y // self.CELL_SIZE)
+
+	def add(self, unit):
+		# NOTE: added units need to be removed, else there will be a memory leak
+		cell = self._get_cell(unit.position)
+		self._unit_cells[unit] = cell
+		self._cells.setdefault(cell, set()).add(unit)
+
+	def remove(self, unit):
+		self._remove_from_cell(self._unit_cells.pop(unit), unit)
+
+	def update(self, unit):
+		"""Moves the unit to the cell of its current position."""
+		cell = self._get_cell(unit.position)
+		old_cell = self._unit_cells[unit]
+		if cell != old_cell:
+			self._remove_from_cell(old_cell, unit)
+			self._unit_cells[unit] = cell
+			self._cells.setdefault(cell, set()).add(unit)
+
+	def _remove_from_cell(self, cell, unit):
+		units = self._cells[cell]
+		units.remove(unit)
+		if not units:
+			del self._cells[cell]
+
+	def __contains__(self, unit):
+		return unit in self._unit_cells
+
+	def __len__(self):
+		return len(self._unit_cells)
+
+	def get_units_in_circle(self, circle):
+		"""Returns the units whose position is within the circle.
+		@param circle: Circle instance
+		@return: list of units, sorted by worldid"""
+		cx = circle.center.x
+		cy = circle.center.y
+		radius = circle.radius
+		radius_squared = radius * radius
+		cell_size = self.CELL_SIZE
+		min_x = int((cx - radius) // cell_size)
+		max_x = int((cx + radius) // cell_size)
+		min_y = int((cy - radius) // cell_size)
+		max_y = int((cy + radius) // cell_size)
+
+		cells = self._cells
+		if len(cells) <= (max_x - min_x + 1) * (max_y - min_y + 1):
+			# few occupied cells, checking all of them is cheaper than looking them up
+			candidate_sets = cells.itervalues()
+		else:
+			candidate_sets = [cells[cell] for cell in
+			                  ((cell_x, cell_y) for cell_x in xrange(min_x, max_x + 1) for cell_y in xrange(min_y, max_y + 1))
+			                  if cell in cells]
+
+		found = []
+		for units in candidate_sets:
+			for unit in units:
+				# inline of circle.contains(unit.position)
+				position = unit.position
+				dx = position.x - cx
+				dy = position.y - cy
+				if dx * dx + dy * dy <= radius_squared:
+					found.append(unit)
+		found.sort(key=attrgetter('worldid'))
+		return found
+
+decorators.bind_all(UnitGrid)
@@ -302,6 +302,9 @@ class FarmAnimal(CollectorAnimal, BuildingCollector):
 		# we are only allowed to pick up at our pasture
 		return [self.home_building]
 
+	def get_provider_handler(self):
+		return None # the pasture is the only target
+
 	def _get_random_positions_on_object(self, obj):
 		"""Returns a shuffled list of tuples, that are in obj, but not in self.position"""
 		coords = obj.position.get_coordinates()
@@ -46,6 +46,7 @@ class BuildingCollector(Collector):
 	"""
 	job_ordering = JobList.order_by.fewest_available_and_distance
 	pather_class = BuildingCollectorPather
+	MAX_TRACKED_RESOURCES = 4 # see _get_job_search_state
 
 	def __init__(self, home_building, **kwargs):
 		kwargs['x'] = home_building.position.origin.x
@@ -62,6 +63,8 @@ class BuildingCollector(Collector):
 		# save whether it's possible for this instance to access a target
 		# @chachedmethod is not applicable since it stores hard refs in the arguments
 		self._target_possible_cache = weakref.WeakKeyDictionary()
+		# state of the last job search if it didn't find any target, see get_job
+		self._failed_job_search_state = None
 
 	def save(self, db):
 		super(BuildingCollector, self).save(db)
@@ -152,6 +155,11 @@ class BuildingCollector(Collector):
 		if not collectable_res:
 			return None
 
+		registered_amounts = self.get_registered_amounts()
+		search_state = self._get_job_search_state(collectable_res, registered_amounts)
+		if search_state is not None and search_state == self._failed_job_search_state:
+			return None # nothing changed since the last search found no target
+
 		jobs = JobList(self, self.job_ordering)
 		# iterate all building that provide one of the resources
 		for building in self.get_buildings_in_range(reslist=collectable_res):
@@ -163,12 +171,16 @@ class BuildingCollector(Collector):
 
 			if target_possible:
 				# check for res here
-				reslist = ( self.check_possible_job_target_for(building, res) for res in collectable_res )
+				reslist = ( self.check_possible_job_target_for(building, res, registered_amounts) for res in collectable_res )
 				reslist = [i for i in reslist if i]
 
 				if reslist: # we can do something here
 					jobs.append( Job(building, reslist) )
 
+		# if there are targets, the search can still fail because there is no path to them.
+		# paths aren't part of the search state, so that search has to be repeated.
+		self._failed_job_search_state = search_state if not jobs else None
+
 		# TODO: find out why order of  self.get_buildings_in_range(..) and therefore order of jobs differs from client to client
 		# TODO: find out why WildAnimal.get_job(..) doesn't have this problem
 		# for MP-Games the jobs must have the same ordering to ensure get_best_possible_job(..) returns the same result
@@ -176,6 +188,28 @@ class BuildingCollector(Collector):
 
 		return self.get_best_possible_job(jobs)
 
+	def _get_job_search_state(self, collectable_res, registered_amounts):
+		"""Returns everything that the targets found by get_job depend on, except for the
+		providers themselves. Those are represented by the number of changes of providers in range.
+		If the state is the same as when a search found nothing, searching again is pointless.
+		@return: tuple or None if the providers aren't tracked"""
+		if len(collectable_res) > self.MAX_TRACKED_RESOURCES:
+			return None # e.g. storage collectors, comparing the state takes about as long as searching
+		provider_handler = self.get_provider_handler()
+		if provider_handler is None:
+			return None
+		reach = RadiusRect(self.home_building.position, self.home_building.radius)
+		home_inventory = self.get_home_inventory()
+		inventory = self.get_component(StorageComponent).inventory
+		return (provider_handler.get_changes(reach, collectable_res), ) + \
+		       tuple((res, home_inventory[res], home_inventory.get_limit(res),
+		              registered_amounts.get(res, 0), inventory.get_free_space_for(res)) for res in collectable_res)
+
+	def get_provider_handler(self):
+		"""Returns the ProviderHandler that get_buildings_in_range gets the buildings from.
+		Subclasses that collect from something else have to return None."""
+		return self.home_building.island.provider_buildings
+
 	def search_job(self):
 		self._clean_job_history_log()
 		super(BuildingCollector, self).search_job()
@@ -362,6 +396,9 @@ class FisherShipCollector(BuildingCollector):
 		reach = RadiusRect(self.home_building.position, self.home_building.radius)
 		return self.session.world.get_providers_in_range(reach, reslist=reslist)
 
+	def get_provider_handler(self):
+		return self.session.world.provider_buildings
+
 
 class DisasterRecoveryCollector(StorageCollector):
 	"""Collects disasters such as fire or pestilence."""
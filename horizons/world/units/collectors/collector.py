@@ -252,12 +252,23 @@ class Collector(Unit):
 
 		return True
 
+	def get_registered_amounts(self):
+		"""Returns how much of each res the colleague collectors are going to bring home.
+		@return: dict {res: amount}"""
+		registered_amounts = {}
+		for collector in self.get_colleague_collectors():
+			if collector.job is not None:
+				for entry in collector.job.reslist:
+					registered_amounts[entry.res] = registered_amounts.get(entry.res, 0) + entry.amount
+		return registered_amounts
+
 	@decorators.make_constants()
-	def check_possible_job_target_for(self, target, res):
+	def check_possible_job_target_for(self, target, res, registered_amounts=None):
 		"""Checks out if we could get res from target.
 		Does _not_ check for anything else (e.g. if we are able to walk there).
 		@param target: possible target. buildings are supported, support for more can be added.
 		@param res: resource id
+		@param registered_amounts: result of get_registered_amounts, pass it when checking many targets
 		@return: instance of Job or None, if we can't collect anything
 		"""
 		res_amount = target.get_available_pickup_amount(res, self)
@@ -267,12 +278,9 @@ class Collector(Unit):
 
 		# check if other collectors get this resource, because our inventory could
 		# get full if they arrive.
-		total_registered_amount_consumer = sum(
-		  entry.amount for
-		  collector in self.get_colleague_collectors() if
-		  collector.job is not None for
-		  entry in collector.job.reslist if
-		  entry.res == res )
+		if registered_amounts is None:
+			registered_amounts = self.get_registered_amounts()
+		total_registered_amount_consumer = registered_amounts.get(res, 0)
 
 		inventory = self.get_home_inventory()
 
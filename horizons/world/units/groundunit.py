@@ -47,11 +47,13 @@ class GroundUnit(Unit):
 	def __init__(self, x, y, **kwargs):
 		super(GroundUnit, self).__init__(x=x, y=y, **kwargs)
 		self.session.world.ground_units.append(self)
+		self.session.world.ground_unit_grid.add(self)
 		self.session.world.ground_unit_map[self.position.to_tuple()] = weakref.ref(self)
 
 	def remove(self):
 		super(GroundUnit, self).remove()
 		self.session.world.ground_units.remove(self)
+		self.session.world.ground_unit_grid.remove(self)
 		if self.session.view.has_change_listener(self.draw_health):
 			self.session.view.remove_change_listener(self.draw_health)
 		del self.session.world.ground_unit_map[self.position.to_tuple()]
@@ -67,6 +69,7 @@ class GroundUnit(Unit):
 				self.session.world.ground_unit_map[self.position.to_tuple()] = weakref.ref(self)
 			raise
 
+		self.session.world.ground_unit_grid.update(self)
 		self.session.world.ground_unit_map[self.position.to_tuple()] = weakref.ref(self)
 		self.session.world.ground_unit_map[self._next_target.to_tuple()] = weakref.ref(self)
 
@@ -75,6 +78,7 @@ class GroundUnit(Unit):
 
 		# register unit in world
 		self.session.world.ground_units.append(self)
+		self.session.world.ground_unit_grid.add(self)
 		self.session.world.ground_unit_map[self.position.to_tuple()] = weakref.ref(self)
 
 class FightingGroundUnit(MovingWeaponHolder, GroundUnit):
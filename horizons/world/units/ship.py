@@ -68,6 +68,8 @@ class Ship(Unit):
 	def __init(self):
 		# register ship in world
 		self.session.world.ships.append(self)
+		self.session.world.ship_grid.add(self)
+		self.session.world.checkup_digest.add_ship(self)
 		if self.in_ship_map:
 			self.session.world.ship_map[self.position.to_tuple()] = weakref.ref(self)
 
@@ -76,6 +78,8 @@ class Ship(Unit):
 
 	def remove(self):
 		self.session.world.ships.remove(self)
+		self.session.world.ship_grid.remove(self)
+		self.session.world.checkup_digest.remove_ship(self)
 		if self.session.view.has_change_listener(self.draw_health):
 			self.session.view.remove_change_listener(self.draw_health)
 		if self.in_ship_map:
@@ -95,7 +99,7 @@ class Ship(Unit):
 		self.route = TradeRoute(self)
 
 	def _move_tick(self, resume=False):
-		"""Keeps track of the ship's position in the global ship_map"""
+		"""Keeps track of the ship's position in the global ship_map, ship_grid and checkup_digest"""
 
 		# TODO: Originally, only self.in_ship_map should suffice here,
 		# but KeyError is raised during combat.
@@ -105,6 +109,7 @@ class Ship(Unit):
 			self.log.error("Ship %s had in_ship_map flag set as True but tuple %s was "
 			               "not found in world.ship_map", self, self.position.to_tuple())
 
+		old_position = self.position
 		try:
 			super(Ship, self)._move_tick(resume)
 		except PathBlockedError:
@@ -115,6 +120,9 @@ class Ship(Unit):
 					self.session.world.ship_map[self.position.to_tuple()] = weakref.ref(self)
 				raise
 
+		self.session.world.ship_grid.update(self)
+		if self.position is not old_position: # moved to the next tile
+			self.session.world.checkup_digest.move_ship(self, old_position)
 		if self.in_ship_map:
 			# save current and next position for ship, since it will be between them
 			self.session.world.ship_map[self.position.to_tuple()] = weakref.ref(self)
@@ -143,8 +143,16 @@ def get_option_parser():
 	             help="Writes log to <filename> instead of to the uh-userdir")
 	dev_group.add_option("--profile", dest="profile", action="store_true",
 	             default=False, help="Enable profiling (for developing only).")
+	dev_group.add_option("--profile-ticks", dest="profile_ticks", metavar="<filename>",
+	             help="Record time spent per tick in scheduler callbacks, messages and pathfinding "
+	                  "and write it to <filename> (.csv or .json) on exit.")
 	dev_group.add_option("--max-ticks", dest="max_ticks", metavar="<max_ticks>", type="int",
 	             help="Run the game for <max_ticks> ticks.")
+	dev_group.add_option("--headless", dest="headless", action="store_true", default=False,
+	             help="Run the game given by --start-map, --start-random-map, --load-game etc. as fast "
+	                  "as possible without engine and gui. Stops after --max-ticks or --max-time.")
+	dev_group.add_option("--max-time", dest="max_time", metavar="<seconds>", type="float",
+	             help="Stop a --headless game after <seconds> seconds of real time.")
 	dev_group.add_option("--no-freeze-protection", dest="freeze_protection", action="store_false",
 	             default=True, help="Disable freeze protection.")
 	dev_group.add_option("--string-previewer", dest="stringpreview", action="store_true",
@@ -228,7 +236,9 @@ def main():
 
 	options = get_option_parser().parse_args()[0]
 	setup_debugging(options)
-	init_environment(True)
+	init_environment(not options.headless)
+	if options.headless:
+		setup_headless()
 
 	# test if required libs can be found or display specific error message
 	try:
@@ -243,7 +253,10 @@ def main():
 	#start UH
 	import horizons.main
 	ret = True
-	if not options.profile:
+	if options.headless:
+		import horizons.headless
+		ret = horizons.headless.start(options)
+	elif not options.profile:
 		# start normal
 		ret = horizons.main.start(options)
 	else:
@@ -412,6 +425,27 @@ def setup_fife():
 		log().debug('Using fife revision %d (version %s); at least %d required', revision,
 		            version, VERSION.MIN_FIFE_REVISION)
 
+def setup_headless():
+	"""Replaces FIFE and the gui with dummies, so the game can run without display and engine.
+	Must be called before anything imports them."""
+	from horizons.ext.dummy import Dummy
+
+	class Importer(object):
+		def find_module(self, fullname, path=None):
+			if fullname == 'fife' or fullname.startswith('fife.') or \
+			   fullname == 'horizons.gui' or fullname.startswith('horizons.gui.'):
+				return self
+			return None
+
+		def load_module(self, name):
+			return sys.modules.setdefault(name, Dummy)
+
+	sys.meta_path.insert(0, Importer())
+
+	import horizons.globals
+	import fife
+	horizons.globals.fife = fife.fife
+
 def init_environment(use_fife):
 	"""Sets up everything. Use in any program that requires access to FIFE and uh modules.
 	It will parse sys.args, so this var has to contain only valid uh options."""
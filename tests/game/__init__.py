@@ -39,6 +39,7 @@ from horizons.spsession import SPSession
 from horizons.util.dbreader import DbReader
 from horizons.util.difficultysettings import DifficultySettings
 from horizons.util.savegameaccessor import SavegameAccessor
+from horizons.util.savegamewriter import SavegameSnapshot, SavegameWriter
 from horizons.util.startgameoptions import StartGameOptions
 from horizons.util.color import Color
 from horizons.component.storagecomponent import StorageComponent
@@ -83,10 +84,15 @@ def _dbreader_convert_dummy_objects():
 			return func(self, command, *args)
 		return wrapper
 
-	original = DbReader.__call__
-	DbReader.__call__ = deco(DbReader.__call__)
+	# savegames are written by SavegameWriter, which collects the rows before passing them on,
+	# or recorded by SavegameSnapshot to be written later
+	classes = (DbReader, SavegameWriter, SavegameSnapshot)
+	original = [cls.__call__ for cls in classes]
+	for cls in classes:
+		cls.__call__ = deco(cls.__call__)
 	yield
-	DbReader.__call__ = original
+	for cls, func in zip(classes, original):
+		cls.__call__ = func
 
 
 class SPTestSession(SPSession):
@@ -109,6 +115,14 @@ class SPTestSession(SPSession):
 			with _dbreader_convert_dummy_objects():
 				return super(SPTestSession, self).save(*args, **kwargs)
 
+	def save_in_background(self, savegamename, callback=None):
+		"""
+		Save the game like the autosave does, see Session._do_save_in_background.
+		"""
+		with mock.patch('horizons.session.SavegameManager._write_screenshot'):
+			with _dbreader_convert_dummy_objects():
+				self._do_save_in_background(savegamename, callback)
+
 	def load(self, savegame, players, is_ai_test, is_map):
 		# keep a reference on the savegame, so we can cleanup in `end`
 		self.savegame = savegame
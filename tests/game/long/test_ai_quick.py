@@ -20,6 +20,10 @@
 # ###################################################
 
 from functools import partial
+
+from mock import patch
+
+from horizons.constants import GAME
 from horizons.util.random_map import generate_map_from_seed
 from tests.game import game_test
 
@@ -39,3 +43,14 @@ def run_ai_quick(seed):
 # this disables the test in general and only makes it being run when
 # called like this: run_tests.py -a long
 test_ai_quick.long = True
+
+def test_ai_quick_bitset_caches():
+	for seed in [5, 6, 7, 8, 9]:
+		yield run_ai_quick_bitset_caches, seed
+
+def run_ai_quick_bitset_caches(seed):
+	"""Like run_ai_quick with the bit array representation of the buildability caches."""
+	with patch.object(GAME, 'BITSET_BUILDABILITY_CACHES', True):
+		run_ai_quick(seed)
+
+test_ai_quick_bitset_caches.long = True
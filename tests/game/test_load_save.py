@@ -21,12 +21,20 @@
 
 import os
 import bz2
+import shutil
 import tempfile
+from functools import partial
 
-from horizons.command.building import Build
+from mock import patch
+
+from horizons.ai.aiplayer import AIPlayer
+from horizons.command.building import Build, Tear
 from horizons.command.production import ToggleActive
 from horizons.command.unit import CreateUnit
 from horizons.constants import BUILDINGS, PRODUCTION, UNITS, RES, GAME
+from horizons.util.dbreader import DbReader
+from horizons.util.python.callback import Callback
+from horizons.util.random_map import generate_map_from_seed
 from horizons.util.shapes import Point
 from horizons.util.worldobject import WorldObject
 from horizons.world.production.producer import Producer
@@ -86,6 +94,33 @@ def test_load_inactive_production():
 
 	session.end()
 
+@game_test(manual_session=True)
+def test_save_in_background():
+	"""
+	The game continues while the savegame is written, the savegame contains the state of
+	the game when saving started.
+	"""
+	session, player = new_session()
+	settlement, island = settle(session)
+	lj = Build(BUILDINGS.LUMBERJACK, 30, 30, island, settlement=settlement)(player)
+	worldid = lj.worldid
+
+	fd, filename = tempfile.mkstemp()
+	os.close(fd)
+	results = []
+	session.save_in_background(savegamename=filename, callback=results.append)
+
+	# changes after the snapshot aren't saved
+	Tear(lj)(player)
+	session.run(seconds=1)
+	session.wait_for_background_save()
+	assert results == [True]
+	session.end(keep_map=True)
+
+	session = load_session(filename)
+	assert WorldObject.get_object_by_id(worldid)
+	session.end()
+
 def create_lumberjack_production_session():
 	"""Create a saved game with a producing production and then load it."""
 	session, player = new_session()
@@ -280,3 +315,87 @@ def test_settler_level_save_load(s, p):
 
 		# should have leveled up
 		assert settler.level == level + 1
+
+
+def _get_ai_player(session):
+	return [player for player in session.world.players if isinstance(player, AIPlayer)][0]
+
+def _finish_ai_round(session, player):
+	"""Run the session until the AI player's current round of settlement handling is finished.
+	Returns the (goal class name, settlement manager id) pairs of the goals that were executed."""
+	executed_goals = []
+	execute_goals = AIPlayer._execute_goals
+	def record_goals(self, goals):
+		if self is player:
+			executed_goals.extend(sorted((goal.__class__.__name__,
+				goal.settlement_manager.worldid if hasattr(goal, 'settlement_manager') else None) for goal in goals))
+		execute_goals(self, goals)
+
+	with patch.object(AIPlayer, '_execute_goals', autospec=True, side_effect=record_goals):
+		while player._pending_settlement_managers:
+			session.run()
+	return executed_goals
+
+def _save_during_ai_round(session):
+	"""Save the game when the AI player has started a round of settlement handling but used up the
+	work budget of the tick before ticking any settlement manager. Returns the filename of the savegame."""
+	player = _get_ai_player(session)
+	assert player.settlement_managers and not player._pending_settlement_managers
+	# AI.WORK_UNITS_PER_TICK is bound into the AIPlayer methods, so the state is set up like handle_settlements does
+	player._pending_goals = []
+	player._add_goals(player._pending_goals)
+	player._pending_settlement_managers = list(player.settlement_managers)
+	Scheduler().add_new_object(Callback(player._continue_handling_settlements), player, run_in=1)
+
+	fd, filename = tempfile.mkstemp()
+	os.close(fd)
+	assert session.save(savegamename=filename)
+	return filename
+
+@game_test(manual_session=True, timeout=120)
+def test_ai_settlement_handling_save_load():
+	"""The round of the AI's settlement handling that is in progress continues after loading"""
+	session, _ = new_session(mapgen=partial(generate_map_from_seed, 2), human_player=False, ai_players=1)
+	session.run(seconds=120)
+	filename = _save_during_ai_round(session)
+	player = _get_ai_player(session)
+	pending_ids = [settlement_manager.worldid for settlement_manager in player._pending_settlement_managers]
+	expected_goals = _finish_ai_round(session, player)
+	assert any(settlement_manager_id in pending_ids for (_, settlement_manager_id) in expected_goals)
+	session.end()
+
+	session = load_session(filename)
+	player = _get_ai_player(session)
+	assert [settlement_manager.worldid for settlement_manager in player._pending_settlement_managers] == pending_ids
+	assert player._pending_goals is None
+	assert _finish_ai_round(session, player) == expected_goals
+	session.end()
+
+@game_test(manual_session=True, timeout=120)
+def test_ai_savegame_upgrade_rev70():
+	"""A savegame of revision 70 has no pending settlement managers"""
+	session, _ = new_session(mapgen=partial(generate_map_from_seed, 2), human_player=False, ai_players=1)
+	session.run(seconds=120)
+	filename = _save_during_ai_round(session)
+	session.end()
+
+	# turn the savegame into one of revision 70
+	db = DbReader(filename)
+	db('DROP TABLE ai_player_pending_settlement_manager')
+	db('DROP TABLE ai_village_builder_pending_plan')
+	db("UPDATE metadata SET value = ? WHERE name = 'savegamerev'", 70)
+	db.close()
+	upgraded_filename = filename + '.rev70'
+	shutil.copyfile(filename, upgraded_filename)
+
+	session = load_session(upgraded_filename)
+	player = _get_ai_player(session)
+	assert not player._pending_settlement_managers
+	session.run(seconds=30)
+	session.end()
+
+	# the upgrader works on a copy
+	db = DbReader(filename)
+	assert not db("SELECT name FROM sqlite_master WHERE name = 'ai_player_pending_settlement_manager'")
+	db.close()
+	os.remove(filename)
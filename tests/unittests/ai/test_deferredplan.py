@@ -0,0 +1,68 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+import os
+from functools import partial
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from horizons.ai.aiplayer.deferredplan import DeferredPlan
+from horizons.constants import AI
+from horizons.scheduler import Scheduler
+
+
+class TestDeferredPlan(TestCase):
+
+	def setUp(self):
+		Scheduler.create_instance(Mock())
+		self.addCleanup(Scheduler.destroy_instance)
+		self.addCleanup(DeferredPlan.stop_pool)
+
+	def test_without_pool(self):
+		with patch.object(AI, 'PLAN_WORKER_PROCESSES', 0):
+			DeferredPlan.start_pool()
+		self.assertEqual(None, DeferredPlan._pool)
+
+		callback = Mock()
+		plan = DeferredPlan(os.getpid, callback)
+		plan._apply()
+		callback.assert_called_once_with(os.getpid())
+
+	def test_pool(self):
+		with patch.object(AI, 'PLAN_WORKER_PROCESSES', 1):
+			DeferredPlan.start_pool()
+			pool = DeferredPlan._pool
+			self.assertNotEqual(None, pool)
+			DeferredPlan.start_pool()
+			self.assertTrue(DeferredPlan._pool is pool)
+
+		plan = DeferredPlan(os.getpid, Mock())
+		self.assertNotEqual(os.getpid(), plan.get_result())
+		self.assertEqual(6, DeferredPlan(partial(sum, [1, 2, 3]), Mock()).get_result())
+
+		DeferredPlan.stop_pool()
+		self.assertEqual(None, DeferredPlan._pool)
+		DeferredPlan.stop_pool()
+
+		# without the pool the plans are created in the game process
+		self.assertEqual(os.getpid(), DeferredPlan(os.getpid, Mock()).get_result())
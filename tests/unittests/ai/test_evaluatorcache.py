@@ -0,0 +1,82 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from horizons.ai.aiplayer.evaluatorcache import EvaluatorCache
+from horizons.entities import Entities
+
+
+class TestEvaluatorCache(TestCase):
+
+	def setUp(self):
+		self.settlement = Mock()
+		self.settlement.ground_map = dict.fromkeys((x, y) for x in xrange(50) for y in xrange(50))
+		self.cache = EvaluatorCache(self.settlement)
+		self.evaluator_class = Mock()
+		self.evaluator_class.create.side_effect = lambda area_builder, x, y, orientation: (x, y, orientation) if x % 2 else None
+		# a 2x2 building with radius 3 depends on the area up to 4 tiles around it
+		patcher = patch.object(Entities, 'buildings', {1: Mock(radius=3, size=(2, 2))}, create=True)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def get(self, x, y, orientation=0):
+		return self.cache.get(self.evaluator_class, None, 1, x, y, orientation)
+
+	def test_get(self):
+		self.assertEqual(self.get(11, 20), (11, 20, 0))
+		self.assertEqual(self.get(10, 20), None)
+		self.assertEqual(self.get(11, 20, 1), (11, 20, 1))
+		self.assertEqual(self.evaluator_class.create.call_count, 3)
+
+		self.assertEqual(self.get(11, 20), (11, 20, 0))
+		self.assertEqual(self.get(10, 20), None)
+		self.assertEqual(self.evaluator_class.create.call_count, 3)
+
+	def test_invalidate(self):
+		self.get(11, 20)
+		self.get(30, 30)
+
+		# outside of the influence area
+		self.cache.invalidate(6, 20)
+		self.cache.invalidate(11, 26)
+		self.get(11, 20)
+		self.assertEqual(self.evaluator_class.create.call_count, 2)
+
+		# the corners of the influence area
+		for coords in [(7, 16), (16, 25)]:
+			self.cache.invalidate(*coords)
+			self.get(11, 20)
+		self.assertEqual(self.evaluator_class.create.call_count, 4)
+
+		self.cache.invalidate_coords_list([(30, 30)])
+		self.get(30, 30)
+		self.get(11, 20)
+		self.assertEqual(self.evaluator_class.create.call_count, 5)
+
+	def test_ground_map_change(self):
+		self.get(11, 20)
+		self.settlement.ground_map[(50, 50)] = None
+		self.get(11, 20)
+		self.get(11, 20)
+		self.assertEqual(self.evaluator_class.create.call_count, 2)
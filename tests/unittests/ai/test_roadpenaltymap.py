@@ -0,0 +1,100 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from unittest import TestCase
+from unittest import TestCase
+
+from mock import Mock
+
+from horizons.ai.aiplayer.constants import BUILDING_PURPOSE
+from horizons.ai.aiplayer.personality.default import DefaultPersonality
+from horizons.ai.aiplayer.roadpenaltymap import RoadPenaltyMap
+from horizons.util.shapes import Rect
+
+
+class TestRoadPenaltyMap(TestCase):
+	"""The incrementally updated map has to be the same as a new one."""
+
+	def setUp(self):
+		# a 20x20 island with the village area left of x = 8 and a lake in the production area
+		self.area_builder = Mock()
+		island = self.area_builder.island
+		island.position = Rect.init_from_topleft_and_size(0, 0, 20, 20)
+		island.path_nodes.nodes = dict(((x, y), 1) for x in xrange(20) for y in xrange(20) if not (12 <= x < 15 and 5 <= y < 9))
+		island.path_nodes.walkability_listeners = []
+		self.area_builder.settlement.ground_map = dict.fromkeys(island.path_nodes.nodes)
+		self.area_builder.personality = DefaultPersonality.ProductionBuilder
+
+		land_manager = self.area_builder.land_manager
+		land_manager.coastline = set()
+		land_manager.roads = set()
+		land_manager.village = dict.fromkeys(coords for coords in island.path_nodes.nodes if coords[0] < 8)
+		land_manager.production = dict.fromkeys(coords for coords in island.path_nodes.nodes if coords[0] >= 8)
+		self.land_manager = land_manager
+		self.area_builder.plan = dict.fromkeys(land_manager.production, (BUILDING_PURPOSE.NONE, None))
+
+		self.road_penalty_map = RoadPenaltyMap(self.area_builder)
+
+	def assert_up_to_date(self):
+		nodes = self.road_penalty_map.get()
+		expected = RoadPenaltyMap(self.area_builder).get()
+		self.assertEqual(dict(nodes), dict(expected))
+		self.assertEqual(nodes.penalties, expected.penalties)
+
+	def test_plan_change(self):
+		self.road_penalty_map.get()
+		for y in xrange(20):
+			self.area_builder.plan[(10, y)] = (BUILDING_PURPOSE.ROAD, None)
+			self.road_penalty_map.register_change((10, y))
+		self.area_builder.plan[(16, 3)] = (BUILDING_PURPOSE.FARM, None)
+		self.road_penalty_map.register_change((16, 3))
+		self.assert_up_to_date()
+
+	def test_walkability_change(self):
+		self.road_penalty_map.get()
+		for coords in [(12, 5), (16, 16)]:
+			nodes = self.area_builder.island.path_nodes.nodes
+			if coords in nodes:
+				del nodes[coords]
+			else:
+				nodes[coords] = 1
+			for listener in self.area_builder.island.path_nodes.walkability_listeners:
+				listener(coords)
+		self.assert_up_to_date()
+
+	def test_village_roads(self):
+		# village roads are added to land_manager.roads without telling the map
+		self.road_penalty_map.get()
+		self.land_manager.roads.update((x, 4) for x in xrange(8))
+		self.assert_up_to_date()
+
+	def test_area_change(self):
+		# like LandManager.add_to_production, this changes the boundary of the neighbouring tiles
+		self.road_penalty_map.get()
+		for y in xrange(10):
+			self.land_manager.production[(7, y)] = self.land_manager.village.pop((7, y))
+		self.assert_up_to_date()
+
+	def test_end(self):
+		listeners = self.area_builder.island.path_nodes.walkability_listeners
+		self.assertEqual(len(listeners), 1)
+		self.road_penalty_map.end()
+		self.assertEqual(listeners, [])
@@ -0,0 +1,82 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from unittest import TestCase
+
+from mock import Mock
+
+from horizons.ai.aiplayer.roadplanner import PathNodeGrid, RoadPlanner
+from horizons.util.shapes import Rect
+
+
+class TestRoadPlanner(TestCase):
+
+	def setUp(self):
+		self.personality = Mock(turn_penalty=5)
+		# a 10x10 area with a wall at x = 5 that has a gap at y = 8
+		self.nodes = {}
+		for x in xrange(10):
+			for y in xrange(10):
+				if x != 5 or y == 8:
+					self.nodes[(x, y)] = 1
+
+	def plan(self, source, destination, path_nodes=None, **kwargs):
+		beacon = Rect.init_from_borders(destination[0], destination[1], destination[0], destination[1])
+		path_nodes = self.nodes if path_nodes is None else path_nodes
+		return RoadPlanner()(self.personality, [source], [destination], beacon, path_nodes, **kwargs)
+
+	def test_straight(self):
+		path = self.plan((0, 2), (4, 2))
+		self.assertEqual(path, [(4, 2), (3, 2), (2, 2), (1, 2), (0, 2)])
+
+	def test_through_gap(self):
+		path = self.plan((0, 8), (9, 8))
+		self.assertEqual(path, [(x, 8) for x in xrange(9, -1, -1)])
+		path = self.plan((0, 0), (9, 0))
+		self.assertTrue((5, 8) in path)
+		# the cheapest path turns only twice
+		self.assertEqual(len(path), 9 + 2 * 8 + 1)
+
+	def test_blocked(self):
+		self.assertEqual(self.plan((0, 0), (9, 0), blocked_coords=set([(5, 8)])), None)
+		self.assertEqual(self.plan((0, 0), (5, 0)), None)
+
+	def test_max_expansions(self):
+		self.assertEqual(self.plan((0, 0), (9, 0), max_expansions=10), None)
+		self.assertNotEqual(self.plan((0, 0), (9, 0), max_expansions=1000), None)
+
+	def test_grid(self):
+		grid = PathNodeGrid.create_from_dict(self.nodes)
+		self.assertEqual(grid, self.nodes)
+		self.assertEqual(self.plan((0, 0), (9, 0), grid), self.plan((0, 0), (9, 0)))
+
+		del grid[(5, 8)]
+		self.assertEqual(self.plan((0, 0), (9, 0), grid), None)
+		grid[(5, 8)] = 1
+		self.assertEqual(self.plan((0, 0), (9, 0), grid), self.plan((0, 0), (9, 0)))
+
+	def test_grid_index_order(self):
+		grid = PathNodeGrid(Rect.init_from_borders(3, 4, 12, 9))
+		coords = [(x, y) for x in xrange(3, 13) for y in xrange(4, 10)]
+		indices = [grid.get_index(c) for c in coords]
+		self.assertEqual(indices, sorted(indices))
+		self.assertEqual(grid.get_index((2, 4)), None)
+		self.assertEqual(grid.get_index((12, 10)), None)
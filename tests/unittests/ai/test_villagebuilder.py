@@ -0,0 +1,83 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from unittest import TestCase
+
+from mock import Mock
+
+from horizons.ai.aiplayer.areabuilder import AreaBuilder
+from horizons.ai.aiplayer.constants import BUILDING_PURPOSE
+from horizons.ai.aiplayer.personality.default import DefaultPersonality
+from horizons.ai.aiplayer.roadpenaltymap import RoadPenaltyMap
+from horizons.ai.aiplayer.villagebuilder import VillageBuilder
+from horizons.util.shapes import Rect
+from horizons.util.worldobject import WorldObject
+
+
+class TestVillageBuilder(TestCase):
+
+	def setUp(self):
+		# a 20x20 island with the village area left of x = 8
+		island = Mock()
+		island.position = Rect.init_from_topleft_and_size(0, 0, 20, 20)
+		island.path_nodes.nodes = dict(((x, y), 1) for x in xrange(20) for y in xrange(20))
+		island.path_nodes.walkability_listeners = []
+
+		land_manager = Mock(island=island, feeder_island=True)
+		land_manager.settlement.ground_map = dict.fromkeys(island.path_nodes.nodes)
+		land_manager.coastline = set()
+		land_manager.roads = set()
+		land_manager.village = dict.fromkeys(coords for coords in island.path_nodes.nodes if coords[0] < 8)
+		land_manager.production = dict.fromkeys(coords for coords in island.path_nodes.nodes if coords[0] >= 8)
+		def add_to_production(coords):
+			land_manager.production[coords] = land_manager.village.pop(coords)
+		land_manager.add_to_production = add_to_production
+
+		settlement_manager = Mock(land_manager=land_manager)
+		self.production_builder = AreaBuilder(settlement_manager)
+		self.production_builder.personality = DefaultPersonality.ProductionBuilder
+		self.production_builder.plan = dict.fromkeys(land_manager.production, (BUILDING_PURPOSE.NONE, None))
+		self.production_builder.handle_new_area = Mock()
+		settlement_manager.production_builder = self.production_builder
+
+		self.village_builder = VillageBuilder(settlement_manager)
+		for name in ('_recreate_tent_queue', '_create_special_village_building_assignments', 'display'):
+			setattr(self.village_builder, name, Mock())
+
+	def tearDown(self):
+		WorldObject.reset()
+
+	def test_use_plan_updates_production_path_nodes(self):
+		# the plan is created in the background, the production builder has used its path nodes meanwhile
+		self.production_builder.get_path_nodes()
+
+		plan = {}
+		for x in xrange(8):
+			plan[(x, 4)] = (BUILDING_PURPOSE.ROAD, (1, None))
+			for y in (2, 3, 5, 6):
+				plan[(x, y)] = (BUILDING_PURPOSE.RESIDENCE, (1, x * 4 + y))
+		self.village_builder._use_plan((plan, 1))
+
+		self.assertEqual(sorted(self.production_builder.land_manager.village), sorted(plan))
+		nodes = self.production_builder.get_path_nodes()
+		expected = RoadPenaltyMap(self.production_builder).get()
+		self.assertEqual(dict(nodes), dict(expected))
+		self.assertTrue((0, 4) in nodes)
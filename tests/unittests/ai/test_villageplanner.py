@@ -0,0 +1,61 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+import cPickle
+from unittest import TestCase
+
+from horizons.ai.aiplayer.constants import BUILDING_PURPOSE
+from horizons.ai.aiplayer.personality.default import DefaultPersonality
+from horizons.ai.aiplayer.villageplanner import PersonalityValues, VillagePlanner
+from horizons.constants import BUILDINGS
+
+
+class TestVillagePlanner(TestCase):
+
+	buildings = {
+		BUILDINGS.RESIDENTIAL: ((2, 2), 12),
+		BUILDINGS.MAIN_SQUARE: ((6, 6), 0),
+		BUILDINGS.TAVERN: ((2, 2), 6),
+	}
+
+	def create_planner(self, seed):
+		village = [(x, y) for x in xrange(10, 40) for y in xrange(20, 40)]
+		usable = set(village)
+		return VillagePlanner(village, usable, (8, 18, 2, 2), PersonalityValues(DefaultPersonality.VillageBuilder),
+			self.buildings, seed)
+
+	def test_plan(self):
+		plan, num_sections = self.create_planner(1)()
+		self.assertEqual(num_sections, 2)
+		purposes = [purpose for purpose, _ in plan.itervalues()]
+		self.assertEqual(purposes.count(BUILDING_PURPOSE.MAIN_SQUARE), num_sections)
+		self.assertTrue(purposes.count(BUILDING_PURPOSE.RESIDENCE) > 10)
+		self.assertTrue(BUILDING_PURPOSE.ROAD in purposes)
+		for coords in plan:
+			self.assertTrue(10 <= coords[0] < 40 and 20 <= coords[1] < 40)
+
+	def test_deterministic(self):
+		self.assertEqual(self.create_planner(5)(), self.create_planner(5)())
+
+	def test_pickle(self):
+		# the planner is sent to a worker process
+		planner = cPickle.loads(cPickle.dumps(self.create_planner(5), cPickle.HIGHEST_PROTOCOL))
+		self.assertEqual(planner(), self.create_planner(5)())
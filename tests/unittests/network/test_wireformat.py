@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+from unittest import TestCase
+
+from horizons.network import NetworkException
+from horizons.network.packets import WireFormat, unserialize
+from horizons.network.packets.client import game_data
+
+
+class Packet(object):
+	network_fields = ('tick', 'items')
+
+	def __init__(self, tick, items):
+		self.tick = tick
+		self.items = items
+
+class Command(object):
+	def __init__(self, **kwargs):
+		self.__dict__.update(kwargs)
+
+class UnknownCommand(Command):
+	pass
+
+WireFormat.add(Packet)
+WireFormat.add(Command)
+
+
+class TestWireFormat(TestCase):
+
+	def roundtrip(self, value):
+		return WireFormat.loads(WireFormat.dumps(value))
+
+	def test_values(self):
+		values = [None, True, False, 0, 1, -1, 63, 64, -65, 2**31, -2**40, 2**63 + 5, 2**64 - 1, 2**70, -2**70,
+		          0.5, 'abc', '', u'\xe4\u20ac', (), (1, (2, 'x')), [1, [None]], set([3, 1, 2]),
+		          {1: 'a', 'b': [2]}]
+		for value in values:
+			result = self.roundtrip(value)
+			self.assertEqual(value, result)
+			self.assertEqual(type(value), type(result))
+
+	def test_objects(self):
+		packet = Packet(1234, [Command(obj_id=5, method='go', args=(1, 2), kwargs={}), Command()])
+		result = self.roundtrip(packet)
+		self.assertEqual(Packet, result.__class__)
+		self.assertEqual(1234, result.tick)
+		self.assertEqual([Command, Command], [command.__class__ for command in result.items])
+		self.assertEqual(packet.items[0].__dict__, result.items[0].__dict__)
+		self.assertEqual({}, result.items[1].__dict__)
+
+	def test_fields(self):
+		# extra attributes are sent with their names
+		packet = Packet(1, [])
+		packet.extra = 'x'
+		self.assertEqual(packet.__dict__, self.roundtrip(packet).__dict__)
+		self.assertTrue(len(WireFormat.dumps(Packet(1, []))) < len(WireFormat.dumps(packet)))
+
+	def test_unknown_class(self):
+		self.assertRaises(TypeError, WireFormat.dumps, UnknownCommand())
+		data = WireFormat.dumps(Command())
+		# change the class id
+		data = data[:3] + chr(ord(data[3]) ^ 1) + data[4:]
+		self.assertRaises(NetworkException, WireFormat.loads, data)
+
+	def test_malformed(self):
+		data = WireFormat.dumps(Packet(1234, ['abc', 2**40]))
+		for end in xrange(len(data)):
+			self.assertRaises(NetworkException, WireFormat.loads, data[:end])
+		self.assertRaises(NetworkException, WireFormat.loads, data + 'N')
+		header = WireFormat.dumps(None)[:-1]
+		self.assertRaises(NetworkException, WireFormat.loads, header + '?')
+		# deeply nested lists
+		self.assertRaises(NetworkException, WireFormat.loads, header + '[\x01' * 40 + '[\x00')
+
+	def test_game_data(self):
+		packet = game_data(Packet(1, [Command(x=1)]))
+		packet.sid = 'abc'
+		data = packet.serialize()
+		self.assertTrue(WireFormat.is_encoded(data))
+		self.assertEqual(Packet, unserialize(data).data.__class__)
+
+		# data the wire format can't encode is pickled
+		packet = game_data(Packet(1, [1.5j]))
+		packet.sid = 'abc'
+		self.assertFalse(WireFormat.is_encoded(packet.serialize()))
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+from collections import defaultdict
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from horizons.manager import MPManager, MPPacketmanager, CommandPacket
+from horizons.timer import Timer
+
+
+class SimulatedTimer(object):
+	"""Runs the tests and calls of the MPManager like Timer.check_tick, one try per step"""
+	ticks_per_second = 16
+
+	def __init__(self):
+		self.tick_next_id = 0
+		self.tests = []
+		self.calls = []
+
+	def add_test(self, call):
+		self.tests.append(call)
+
+	def add_call(self, call):
+		self.calls.append(call)
+
+	def step(self):
+		for test in self.tests:
+			if test(self.tick_next_id) == Timer.TEST_SKIP:
+				return
+		for call in self.calls:
+			call(self.tick_next_id)
+		self.tick_next_id += 1
+
+
+class SimulatedNetwork(object):
+	"""Delivers the packets of every player to all other players after its latency (in steps)"""
+
+	def __init__(self, player_ids):
+		self.player_ids = player_ids
+		self.latency = dict.fromkeys(player_ids, 0)
+		self.step = 0
+		self.queues = defaultdict(list) # {receiver: [(arrival step, packet)]}
+
+	def send(self, sender, packet):
+		for receiver in self.player_ids:
+			if receiver != sender:
+				arrival = self.step + max(self.latency[sender], self.latency[receiver])
+				self.queues[receiver].append((arrival, packet))
+
+	def receive(self, receiver):
+		arrived = [packet for (arrival, packet) in self.queues[receiver] if arrival <= self.step]
+		self.queues[receiver] = [(arrival, packet) for (arrival, packet) in self.queues[receiver] if arrival > self.step]
+		return arrived
+
+
+class SimulatedNetworkInterface(object):
+	def __init__(self, network, player_id):
+		self.network = network
+		self.player_id = player_id
+
+	def send_packet(self, packet):
+		self.network.send(self.player_id, packet)
+
+	def receive_all(self):
+		return self.network.receive(self.player_id)
+
+
+class TestMPManager(TestCase):
+
+	PLAYER_IDS = (1, 2, 3)
+
+	def setUp(self):
+		self.step = 0
+		self.timePatcher = patch('horizons.manager.time')
+		clock = self.timePatcher.start()
+		clock.time.side_effect = lambda: self.step / float(SimulatedTimer.ticks_per_second)
+		self.worldObjectPatcher = patch('horizons.manager.WorldObject')
+		self.worldObjectPatcher.start()
+
+		self.network = SimulatedNetwork(self.PLAYER_IDS)
+		self.executed = defaultdict(list) # {player_id of the client: [(tick, command number)]}
+		self.current_player_id = None # client that is ticking
+		players = [Mock(worldid=player_id) for player_id in self.PLAYER_IDS]
+		self.managers = {}
+		for player in players:
+			session = Mock()
+			session.timer = SimulatedTimer()
+			session.world.player = player
+			session.world.players = players
+			session.world.get_checkup_hash.return_value = (1, 2, 3)
+			self.managers[player.worldid] = MPManager(session, SimulatedNetworkInterface(self.network, player.worldid))
+
+	def tearDown(self):
+		self.timePatcher.stop()
+		self.worldObjectPatcher.stop()
+
+	def make_command(self, number):
+		def command(issuer):
+			timer = self.managers[self.current_player_id].session.timer
+			self.executed[self.current_player_id].append((timer.tick_next_id, number))
+		return command
+
+	def run_steps(self, steps):
+		for i in xrange(steps):
+			self.step += 1
+			self.network.step = self.step
+			for player_id, manager in sorted(self.managers.iteritems()):
+				if self.step % 7 == player_id:
+					manager.execute(self.make_command(self.step))
+				self.current_player_id = player_id
+				manager.session.timer.step()
+
+	def get_ticks(self):
+		return [manager.session.timer.tick_next_id for manager in self.managers.itervalues()]
+
+	def get_delays(self):
+		return set(manager.execution_delay for manager in self.managers.itervalues())
+
+	def assert_same_execution(self):
+		tick = min(self.get_ticks())
+		executed = [[(t, n) for (t, n) in self.executed[player_id] if t < tick] for player_id in self.PLAYER_IDS]
+		self.assertTrue(executed[0])
+		for other in executed[1:]:
+			self.assertEqual(executed[0], other)
+
+	def test_lan(self):
+		self.run_steps(500)
+		self.assertTrue(min(self.get_ticks()) > 480)
+		self.assertTrue(max(self.get_delays()) <= MPManager.EXECUTIONDELAY)
+		self.assert_same_execution()
+
+	def test_delay_adapts(self):
+		self.network.latency[3] = 10
+		self.run_steps(300)
+		self.assertEqual(len(self.get_delays()), 1)
+		self.assertTrue(min(self.get_delays()) > 10)
+
+		# once adapted, the game runs without stalls
+		ticks = min(self.get_ticks())
+		self.run_steps(200)
+		self.assertTrue(min(self.get_ticks()) - ticks >= 195)
+		self.assert_same_execution()
+
+		self.network.latency[3] = 0
+		self.run_steps(1000)
+		self.assertTrue(max(self.get_delays()) <= MPManager.EXECUTIONDELAY)
+		self.assert_same_execution()
+
+	def test_statistics(self):
+		self.network.latency[2] = 6
+		self.run_steps(100)
+		stats = self.managers[1].get_statistics()
+		self.assertEqual(stats['execution_delay'], self.managers[1].execution_delay)
+		self.assertTrue(stats['players'][2]['latency'] > stats['players'][3]['latency'])
+		self.assertTrue(stats['players'][2]['stalls'] > 0)
+		self.assertTrue(stats['players'][2]['stall_time'] > 0)
+		self.assertEqual(stats['players'][3]['stalls'], 0)
+
+
+class TestMPPacketmanager(TestCase):
+
+	def setUp(self):
+		mpmanager = Mock()
+		mpmanager.get_player_count.return_value = 2
+		mpmanager.session.world.players = [Mock(worldid=1), Mock(worldid=2)]
+		self.manager = MPPacketmanager(mpmanager)
+		self.worldObjectPatcher = patch('horizons.manager.WorldObject')
+		self.worldObjectPatcher.start()
+
+	def tearDown(self):
+		self.worldObjectPatcher.stop()
+
+	def add(self, tick, player_id):
+		packet = CommandPacket(tick, player_id, [])
+		self.manager.add_packet(packet)
+		return packet
+
+	def test_tick_ready(self):
+		self.add(5, 2)
+		self.assertFalse(self.manager.is_tick_ready(5))
+		self.assertEqual(self.manager.get_missing_players(5), [1])
+		self.add(5, 1)
+		self.add(6, 1)
+		self.assertTrue(self.manager.is_tick_ready(5))
+		self.assertFalse(self.manager.is_tick_ready(6))
+
+	def test_get_packets_for_tick(self):
+		p2 = self.add(5, 2)
+		p1 = self.add(5, 1)
+		self.assertEqual(self.manager.get_packets_for_tick(5, remove_returned_commands=False), [p1, p2])
+		self.assertEqual(self.manager.get_packets_for_tick(5), [p1, p2])
+		self.assertEqual(self.manager.get_packets_for_tick(5), [])
+		self.assertEqual(self.manager.get_packets_from_player(1), [])
+
+	def test_get_packets_from_player(self):
+		p7 = self.add(7, 1)
+		p6 = self.add(6, 1)
+		self.add(6, 2)
+		self.assertEqual(self.manager.get_packets_from_player(1), [p6, p7])
+		self.manager.get_packets_for_tick(6)
+		self.assertEqual(self.manager.get_packets_from_player(1), [p7])
+
+	def test_passed_ticks_are_dropped(self):
+		self.add(3, 1)
+		self.add(4, 1)
+		p6 = self.add(6, 1)
+		self.manager.get_packets_for_tick(5)
+		self.assertEqual(self.manager.get_packets_for_tick(3), [])
+		self.assertEqual(self.manager.get_packets_from_player(1), [p6])
+		# packets for passed ticks are ignored
+		self.add(5, 1)
+		self.assertEqual(self.manager.get_packets_from_player(1), [p6])
@@ -218,3 +218,68 @@ class TestScheduler(TestCase):
 		self.assertEqual(2, self.scheduler.get_remaining_ticks(instance, self.callback))
 		self.scheduler.tick(Scheduler.FIRST_TICK_ID+2)
 		self.assertEqual(1, self.scheduler.get_remaining_ticks(instance, self.callback))
+
+	def test_remove_call_keeps_calls_of_other_callbacks(self):
+		self.scheduler.before_ticking()
+		instance = Mock()
+		callback2 = Mock()
+		self.scheduler.add_new_object(self.callback, instance, run_in=1)
+		self.scheduler.add_new_object(callback2, instance, run_in=2)
+		self.assertEqual(1, self.scheduler.rem_call(instance, self.callback))
+		self.assertEqual(0, self.scheduler.rem_call(instance, self.callback))
+
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID)
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID+1)
+		self.assertFalse(self.callback.called)
+		callback2.assert_called_once_with()
+
+	def test_remove_same_tick_call_from_callback(self):
+		self.scheduler.before_ticking()
+		instance1 = Mock()
+		instance2 = Mock()
+		callback2 = Mock()
+		self.callback.side_effect = lambda: self.scheduler.rem_all_classinst_calls(instance2)
+		self.scheduler.add_new_object(self.callback, instance1, run_in=1)
+		self.scheduler.add_new_object(callback2, instance2, run_in=1)
+
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID)
+		self.callback.assert_called_once_with()
+		self.assertFalse(callback2.called)
+
+	def test_remove_periodic_callback_from_itself(self):
+		self.scheduler.before_ticking()
+		instance = Mock()
+		self.callback.side_effect = lambda: self.scheduler.rem_all_classinst_calls(instance)
+		self.scheduler.add_new_object(self.callback, instance, run_in=1, loops=-1)
+
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID)
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID+1)
+		self.callback.assert_called_once_with()
+		self.assertEqual({}, self.scheduler.get_classinst_calls(instance))
+
+	def test_callbacks_of_same_tick_run_in_order_of_addition(self):
+		self.scheduler.before_ticking()
+		order = []
+		def add(name, run_in, loops=1, loop_interval=None):
+			self.scheduler.add_new_object(lambda: order.append(name), None, run_in=run_in,
+			                              loops=loops, loop_interval=loop_interval)
+
+		add('a', 2)
+		add('periodic', 1, loops=2, loop_interval=1)
+		add('b', 2)
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID)
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID+1)
+		self.assertEqual(['periodic', 'a', 'b', 'periodic'], order)
+
+	def test_finish_callback_called_after_last_loop(self):
+		self.scheduler.before_ticking()
+		instance = Mock()
+		finish_callback = Mock()
+		self.scheduler.add_new_object(self.callback, instance, run_in=1, loops=2,
+		                              finish_callback=finish_callback)
+
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID)
+		self.assertFalse(finish_callback.called)
+		self.scheduler.tick(Scheduler.FIRST_TICK_ID+1)
+		finish_callback.assert_called_once_with()
+		self.assertEqual({}, self.scheduler.get_classinst_calls(instance))
@@ -171,3 +171,26 @@ class TestTimer(TestCase):
 		self.timer.add_test(self.test)
 		self.timer.check_tick()
 		self.assertFalse(self.callback.called)
+
+	def test_fast_forward_max_ticks(self):
+		ticks = self.timer.fast_forward(max_ticks=self.TICK_START + 3)
+		self.assertEqual(ticks, 3)
+		expected = [((self.TICK_START,),), ((self.TICK_START + 1,),), ((self.TICK_START + 2,),)]
+		self.assertEquals(expected, self.callback.call_args_list)
+
+	def test_fast_forward_max_time(self):
+		def advance_clock(tick_id):
+			self.clock.return_value += 1
+		self.callback.side_effect = advance_clock
+		self.timer.fast_forward(max_time=2)
+		self.assertEqual(self.callback.call_count, 2)
+
+	def test_fast_forward_condition(self):
+		self.timer.fast_forward(condition=lambda: self.callback.call_count == 5)
+		self.assertEqual(self.callback.call_count, 5)
+
+	def test_fast_forward_test_func_skip(self):
+		self.test.return_value = Timer.TEST_SKIP
+		self.timer.add_test(self.test)
+		self.assertEqual(self.timer.fast_forward(), 0)
+		self.assertFalse(self.callback.called)
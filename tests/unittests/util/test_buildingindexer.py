@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+import random
+from unittest import TestCase
+
+from horizons.util.buildingindexer import BuildingIndexer
+from horizons.util.shapes import Rect
+
+
+class Building(object):
+	def __init__(self, position):
+		self.position = position
+
+
+class TestBuildingIndexer(TestCase):
+
+	def setUp(self):
+		self.rng = random.Random(3)
+		self.coords = set((x, y) for x in xrange(40) for y in xrange(30) if (x + y) % 7)
+		self.buildings = []
+		for i in xrange(60):
+			self.buildings.append(self.create_building())
+		self.indexer = BuildingIndexer(5, self.coords, random.Random(2), buildings=self.buildings)
+		# used like the rng of the indexer
+		self.choice_rng = random.Random(2)
+
+	def create_building(self):
+		# buildings don't overlap
+		while True:
+			size = self.rng.randint(1, 3)
+			position = Rect.init_from_topleft_and_size(self.rng.randint(-3, 40), self.rng.randint(-3, 30), size, size)
+			if not any(building.position.intersects(position) for building in self.buildings):
+				return Building(position)
+
+	def expected(self, coords):
+		if coords not in self.coords:
+			return []
+		in_range = [building for building in self.buildings
+		            if coords in building.position.get_radius_coordinates(5, include_self=True)]
+		def key(building):
+			pos = building.position
+			x_diff = max(pos.left - coords[0], coords[0] - pos.right, 0)
+			y_diff = max(pos.top - coords[1], coords[1] - pos.bottom, 0)
+			return (x_diff ** 2 + y_diff ** 2, pos.top, pos.bottom, pos.left, pos.right)
+		return sorted(in_range, key=key)
+
+	def check_queries(self):
+		for i in xrange(30):
+			coords = (self.rng.randint(-2, 42), self.rng.randint(-2, 32))
+			expected = self.expected(coords)
+			self.assertEqual(expected, self.indexer.get_buildings_in_range(coords))
+			self.assertEqual(len(expected), self.indexer.get_num_buildings_in_range(coords) or 0)
+			# the rng has to be used like random.choice on the sorted list
+			if expected:
+				self.assertEqual(self.choice_rng.choice(expected), self.indexer.get_random_building_in_range(coords))
+			else:
+				self.assertEqual(None, self.indexer.get_random_building_in_range(coords))
+
+	def test_queries(self):
+		self.check_queries()
+
+	def test_add_and_remove(self):
+		for i in xrange(25):
+			if self.rng.randint(0, 1):
+				building = self.create_building()
+				self.buildings.append(building)
+				self.indexer.add(building)
+			else:
+				building = self.rng.choice(self.buildings)
+				self.buildings.remove(building)
+				self.indexer.remove(building)
+			self.check_queries()
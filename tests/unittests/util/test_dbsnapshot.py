@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from horizons.util import dbsnapshot
+from horizons.util.dbreader import DbReader
+
+
+class TestDbSnapshot(TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.old_snapshot_dir = dbsnapshot.SNAPSHOT_DIR
+		dbsnapshot.SNAPSHOT_DIR = os.path.join(self.directory, 'cache')
+		self.db_files = (self.write('a.sql', "CREATE TABLE a (x INT, y TEXT); INSERT INTO a VALUES(1, 'one');"),
+		                 self.write('b.sql', "CREATE TABLE b (z INT); CREATE INDEX b_z ON b(z); INSERT INTO b VALUES(2);"))
+
+	def tearDown(self):
+		dbsnapshot.SNAPSHOT_DIR = self.old_snapshot_dir
+		shutil.rmtree(self.directory)
+
+	def write(self, name, sql):
+		path = os.path.join(self.directory, name)
+		with open(path, 'w') as f:
+			f.write(sql)
+		return path
+
+	def test_copy(self):
+		path = dbsnapshot.get_snapshot(self.db_files)
+		self.assertTrue(os.path.exists(path))
+		db = DbReader(':memory:')
+		dbsnapshot.copy_snapshot(path, db)
+		self.assertEqual(db("SELECT x, y FROM a"), [(1, u'one')])
+		self.assertEqual(db("SELECT z FROM b"), [(2, )])
+		self.assertEqual(db("SELECT name FROM sqlite_master WHERE type = 'index'"), [(u'b_z', )])
+		self.assertEqual(db("PRAGMA database_list")[1:], []) # snapshot was detached
+
+	def test_changed_script_replaces_snapshot(self):
+		old_path = dbsnapshot.get_snapshot(self.db_files)
+		self.assertEqual(dbsnapshot.get_snapshot(self.db_files), old_path)
+
+		self.write('b.sql', "CREATE TABLE b (z INT); INSERT INTO b VALUES(3);")
+		new_path = dbsnapshot.get_snapshot(self.db_files)
+		self.assertNotEqual(new_path, old_path)
+		self.assertEqual(os.listdir(dbsnapshot.SNAPSHOT_DIR), [os.path.basename(new_path)])
+		self.assertEqual(DbReader(new_path)("SELECT z FROM b"), [(3, )])
+
+	def test_broken_script(self):
+		self.write('b.sql', "CREATE TABLE b (z INT); INSERT INTO c VALUES(3);")
+		self.assertEqual(dbsnapshot.get_snapshot(self.db_files), None)
+		self.assertEqual(os.listdir(dbsnapshot.SNAPSHOT_DIR), [])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+import random
+from collections import deque
+from unittest import TestCase
+
+from horizons.util.pathfinding.distancefield import DistanceField
+
+
+def bfs(nodes, sources, base_distance):
+	distance = dict.fromkeys(sources, base_distance)
+	queue = deque(sources)
+	while queue:
+		x, y = queue.popleft()
+		for dx, dy in DistanceField.moves:
+			coords = (x + dx, y + dy)
+			if coords in nodes and coords not in distance:
+				distance[coords] = distance[(x, y)] + 1
+				queue.append(coords)
+	return distance
+
+
+class TestDistanceField(TestCase):
+
+	def setUp(self):
+		self.rng = random.Random(4)
+		self.coords = [(x, y) for x in xrange(30) for y in xrange(20)]
+		self.nodes = set(coords for coords in self.coords if self.rng.random() < 0.7)
+		sources = self.rng.sample(self.coords, 5)
+		self.field = DistanceField(self.nodes, sources, 1)
+
+	def check(self):
+		self.assertEqual(self.field.distance, bfs(self.nodes, self.field.sources, 1))
+
+	def test_init(self):
+		self.check()
+
+	def test_update(self):
+		for i in xrange(300):
+			old_distance = dict(self.field.distance)
+			changes = self.rng.sample(self.coords, self.rng.randint(1, 8))
+			for coords in changes:
+				if self.rng.random() < 0.2:
+					if coords in self.field.sources:
+						self.field.remove_source(coords)
+					else:
+						self.field.add_source(coords)
+				elif coords in self.nodes:
+					self.nodes.remove(coords)
+				else:
+					self.nodes.add(coords)
+
+			self.field.changed.clear()
+			self.field.update(changes)
+			self.check()
+			changed = set(coords for coords in set(old_distance).union(self.field.distance)
+			              if old_distance.get(coords) != self.field.distance.get(coords))
+			self.assertEqual(self.field.changed, changed)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+import random
+import unittest
+
+from horizons.util.pathfinding.pathcache import PathCache
+from horizons.util.pathfinding.pathfinding import FindPath
+from horizons.util.pathfinding.pathgrid import PathGrid
+from horizons.util.shapes import Point, Rect
+
+class TestPathGrid(unittest.TestCase):
+
+	def setUp(self):
+		self.grid = PathGrid(Rect.init_from_borders(-2, 3, 5, 7))
+
+	def test_add_and_remove(self):
+		self.grid.add((-2, 3), 1.0)
+		self.grid.add((5, 7), 2.0)
+		self.assertTrue((-2, 3) in self.grid)
+		self.assertEqual(2.0, self.grid.get((5, 7)))
+		self.assertEqual(2, len(self.grid))
+
+		self.grid.remove((-2, 3))
+		self.assertFalse((-2, 3) in self.grid)
+		self.assertEqual(None, self.grid.get((-2, 3)))
+		self.assertEqual([(5, 7)], list(self.grid))
+
+	def test_outside_of_grid(self):
+		self.assertFalse((6, 7) in self.grid)
+		self.assertEqual(0, self.grid.get((-3, 3), 0))
+		self.assertEqual(None, self.grid.get_index((0, 8)))
+
+	def test_index_preserves_coords_order(self):
+		coords = list(Rect.init_from_borders(-2, 3, 5, 7).tuple_iter())
+		indices = [self.grid.get_index(c) for c in coords]
+		self.assertEqual(sorted(indices), indices)
+		self.assertEqual(coords, [self.grid.get_coords(i) for i in indices])
+
+
+class TestGridPathfinding(unittest.TestCase):
+	"""The grid based search has to find exactly the same paths as the dict based one,
+	games (especially multiplayer games) depend on it."""
+
+	def _create_nodes(self, rng, width, height, walkable_percent):
+		return dict(((x, y), 1.0) for x in xrange(width) for y in xrange(height)
+		            if rng.randint(0, 99) < walkable_percent)
+
+	def _compare(self, nodes, grid, source, destination, blocked, diagonal, make_target_walkable):
+		path = FindPath()(source, destination, nodes, blocked, diagonal, make_target_walkable)
+		grid_path = FindPath()(source, destination, grid, blocked, diagonal, make_target_walkable)
+		self.assertEqual(path, grid_path)
+		return path
+
+	def test_same_paths_as_dict(self):
+		rng = random.Random(42)
+		found = 0
+		for walkable_percent in (60, 75, 90):
+			nodes = self._create_nodes(rng, 40, 30, walkable_percent)
+			grid = PathGrid(Rect.init_from_borders(0, 0, 39, 29), nodes)
+			coords = sorted(nodes)
+			for i in xrange(60):
+				source = Point(*rng.choice(coords))
+				if i % 2:
+					destination = Point(*rng.choice(coords))
+				else:
+					x, y = rng.choice(coords)
+					destination = Rect.init_from_borders(x, y, min(x + 2, 39), min(y + 1, 29))
+				blocked = dict.fromkeys(rng.sample(coords, 20))
+				blocked.pop(source.to_tuple(), None)
+				for diagonal in (False, True):
+					for make_target_walkable in (False, True):
+						if self._compare(nodes, grid, source, destination, blocked,
+						                 diagonal, make_target_walkable) is not None:
+							found += 1
+		self.assertTrue(found > 0)
+
+	def test_source_outside_of_grid(self):
+		nodes = dict(((x, 0), 1.0) for x in xrange(10))
+		grid = PathGrid(Rect.init_from_borders(0, 0, 9, 0), nodes)
+		path = self._compare(nodes, grid, Point(0, 1), Point(9, 0), [], True, False)
+		self.assertEqual((0, 1), path[0])
+		self.assertEqual((9, 0), path[-1])
+
+	def test_no_path(self):
+		nodes = dict(((x, 0), 1.0) for x in xrange(10))
+		del nodes[(5, 0)]
+		grid = PathGrid(Rect.init_from_borders(0, 0, 9, 0), nodes)
+		self.assertEqual(None, self._compare(nodes, grid, Point(0, 0), Point(9, 0), [], False, True))
+
+
+class TestPathCache(unittest.TestCase):
+
+	def setUp(self):
+		# two water bodies, separated by the column x = 5
+		self.nodes = dict(((x, y), 1.0) for x in xrange(10) for y in xrange(10) if x != 5)
+		self.grid = PathGrid(Rect.init_from_borders(0, 0, 9, 9), self.nodes)
+		regions = dict((coords, int(coords[0] > 5)) for coords in self.nodes)
+		self.cache = PathCache(self.grid, regions)
+
+	def _find_path(self, source, destination, blocked=None, path_cache=None):
+		return FindPath()(source, destination, self.grid, blocked, True, False, path_cache)
+
+	def test_different_regions(self):
+		self.assertEqual(None, self._find_path(Point(0, 0), Point(9, 9), path_cache=self.cache))
+		self.assertEqual(0, self.cache.misses)
+
+	def test_cached_path_is_exact(self):
+		source, destination = Point(0, 0), Point(4, 9)
+		path = self._find_path(source, destination, path_cache=self.cache)
+		self.assertEqual(path, self._find_path(source, destination, path_cache=self.cache))
+		self.assertEqual(1, self.cache.hits)
+
+		# blocking a reached node makes the cache search again
+		blocked = {path[3]: None}
+		expected = self._find_path(source, destination, blocked)
+		self.assertNotEqual(path, expected)
+		self.assertEqual(expected, self._find_path(source, destination, blocked, self.cache))
+		self.assertEqual(1, self.cache.hits)
+
+		# nodes far away don't influence the search
+		blocked = {(9, 0): None}
+		self.assertEqual(path, self._find_path(source, destination, blocked, self.cache))
+		self.assertEqual(2, self.cache.hits)
+
+	def test_reached_nodes_bound(self):
+		source, far, near = Point(0, 0), Point(4, 9), Point(1, 1)
+		self._find_path(source, far, path_cache=self.cache)
+		far_reached = self.cache._reached_nodes
+		self._find_path(source, near, path_cache=self.cache)
+		near_reached = self.cache._reached_nodes - far_reached
+		self.assertTrue(far_reached > near_reached)
+
+		# the oldest route is dropped when the nodes of both don't fit
+		self.cache = PathCache(self.grid)
+		self.cache.MAX_REACHED_NODES = far_reached + near_reached - 1
+		self._find_path(source, far, path_cache=self.cache)
+		self._find_path(source, near, path_cache=self.cache)
+		self.assertEqual(near_reached, self.cache._reached_nodes)
+		self._find_path(source, near, path_cache=self.cache)
+		self._find_path(source, far, path_cache=self.cache)
+		self.assertEqual(1, self.cache.hits)
+
+		# routes that reach too many nodes aren't kept at all
+		self.cache = PathCache(self.grid)
+		self.cache.MAX_REACHED_NODES = far_reached - 1
+		self._find_path(source, far, path_cache=self.cache)
+		self.assertEqual(0, self.cache._reached_nodes)
+
+	def test_grid_change_invalidates(self):
+		source, destination = Point(0, 0), Point(4, 9)
+		path = self._find_path(source, destination, path_cache=self.cache)
+		self.grid.remove(path[3])
+		self.nodes.pop(path[3])
+		self.assertEqual(FindPath()(source, destination, self.nodes, None, True, False),
+		                 self._find_path(source, destination, path_cache=self.cache))
+		self.assertEqual(0, self.cache.hits)
+
+
+class TestPathCacheRegions(unittest.TestCase):
+	"""The regions are updated incrementally when roads are built and torn down,
+	they must never make the cache miss an existing path."""
+
+	def test_incremental_regions(self):
+		rng = random.Random(7)
+		area = Rect.init_from_borders(0, 0, 19, 19)
+		grid = PathGrid(area)
+		cache = PathCache(grid, regions={}, diagonal=False)
+		nodes = {}
+		skipped = 0
+		failed = 0
+		for i in xrange(1500):
+			coords = (rng.randint(0, 19), rng.randint(0, 19))
+			if coords in nodes and rng.randint(0, 2) == 0:
+				del nodes[coords]
+				grid.remove(coords)
+				cache.remove_node(coords)
+			elif coords not in nodes:
+				nodes[coords] = 1.0
+				grid.add(coords, 1.0)
+				cache.add_node(coords)
+
+			# buildings that are reached via the roads next to them
+			source = Rect.init_from_topleft_and_size(rng.randint(0, 18), rng.randint(0, 18), 1, 1)
+			destination = Rect.init_from_topleft_and_size(rng.randint(0, 17), rng.randint(0, 17), 2, 2)
+			expected = FindPath()(source, destination, nodes)
+			self.assertEqual(expected, FindPath()(source, destination, grid, path_cache=cache))
+			failed += expected is None
+			if expected is None and cache.misses == 0:
+				skipped += 1
+			cache.misses = 0
+		# the regions are exact, a search that fails always fails in the region check
+		self.assertTrue(failed > 100)
+		self.assertEqual(failed, skipped)
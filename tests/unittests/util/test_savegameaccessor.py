@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+from collections import defaultdict, deque
+from unittest import TestCase
+
+from horizons.util.savegameaccessor import SavegameAccessor
+
+
+class TestSavegameAccessor(TestCase):
+
+	def setUp(self):
+		self.db = SavegameAccessor('content/maps/test-map-tiny.sqlite', True)
+		self.db("INSERT INTO building(rowid, type, x, y, location, rotation, level) VALUES(?, ?, ?, ?, ?, ?, ?)", 5, 1, 2, 3, 4, 0, 1)
+		self.db("INSERT INTO settlement(rowid, owner, island) VALUES(?, ?, ?)", 7, 1, 2)
+		# inserted in no particular order, like the game saves them
+		self.state_history = [(10, 1, 30, 2), (10, 2, 5, 1), (10, 1, 20, 1), (11, 1, 5, 0), (10, 1, 25, 3)]
+		for object_id, production, tick, state in self.state_history:
+			self.db("INSERT INTO production_state_history(object_id, production, tick, state) VALUES(?, ?, ?, ?)",
+			        object_id, production, tick, state)
+		self.job_history = [(3, 40, 0.5), (4, 10, 1.0), (3, 20, 0.25)]
+		for collector, tick, utilisation in self.job_history:
+			self.db("INSERT INTO building_collector_job_history(collector, tick, utilisation) VALUES(?, ?, ?)",
+			        collector, tick, utilisation)
+
+	def tearDown(self):
+		if not self.db._closed:
+			self.db.close()
+
+	def test_lazy_loading(self):
+		self.assertFalse('_building' in self.db.__dict__)
+		self.assertEqual(self.db.get_building_row(5), (2, 3, 4, 0, 1))
+		self.assertTrue('_building' in self.db.__dict__)
+		self.assertFalse('_settlement' in self.db.__dict__)
+		self.assertEqual(self.db.get_settlement_owner(7), 1)
+		self.assertEqual(self.db.get_settlement_owner(8), None)
+		self.assertRaises(AttributeError, getattr, self.db, '_no_such_table')
+
+	def test_production_state_history(self):
+		# the deques that the accessor created before the history was kept in arrays
+		expected = defaultdict(deque)
+		for object_id, production, tick, state in sorted(self.state_history):
+			expected[object_id, production].append((tick, state))
+		for object_id, production in [(10, 1), (10, 2), (11, 1), (11, 2), (12, 1)]:
+			self.assertEqual(self.db.get_production_state_history(object_id, production), expected[object_id, production])
+		# every call returns a new deque
+		history = self.db.get_production_state_history(10, 1)
+		history.popleft()
+		self.assertEqual(self.db.get_production_state_history(10, 1), expected[10, 1])
+
+	def test_building_collector_job_history(self):
+		expected = defaultdict(deque)
+		for collector, tick, utilisation in sorted(self.job_history):
+			expected[collector].append((tick, utilisation))
+		for collector in (3, 4, 5):
+			self.assertEqual(self.db.get_building_collector_job_history(collector), expected[collector])
+
+	def test_access_after_close(self):
+		self.assertEqual(self.db.get_building_row(5), (2, 3, 4, 0, 1))
+		self.db.close()
+		# loaded data stays available, other tables can't be loaded anymore
+		self.assertEqual(self.db.get_building_row(5), (2, 3, 4, 0, 1))
+		self.assertRaises(RuntimeError, self.db.get_settlement_owner, 7)
+		self.assertRaises(RuntimeError, self.db.get_production_state_history, 10, 1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import tempfile
+from unittest import TestCase
+
+from horizons.util.dbreader import DbReader
+from horizons.util.savegamewriter import SavegameWriter
+
+
+class TestSavegameWriter(TestCase):
+
+	def setUp(self):
+		fd, self.filename = tempfile.mkstemp()
+		os.close(fd)
+		self.db = SavegameWriter(self.filename)
+		self.db.execute_script("CREATE TABLE a (x INT, y INT); CREATE TABLE b (z INT);")
+
+	def tearDown(self):
+		self.db.close()
+		os.remove(self.filename)
+
+	def read(self, query):
+		db = DbReader(self.filename)
+		try:
+			return db(query)
+		finally:
+			db.close()
+
+	def test_inserts_are_collected(self):
+		self.db("BEGIN")
+		self.db("INSERT INTO a(x, y) VALUES(?, ?)", 1, 2)
+		self.db("INSERT INTO b VALUES(?)", 3)
+		self.assertEqual(self.db.cur.execute("SELECT COUNT(*) FROM a").fetchall(), [(0, )])
+		self.db("COMMIT")
+		self.assertEqual(self.read("SELECT rowid, x, y FROM a"), [(1, 1, 2)])
+		self.assertEqual(self.read("SELECT z FROM b"), [(3, )])
+
+	def test_insert_order_per_table(self):
+		self.db("INSERT INTO a(x, y) VALUES(?, ?)", 1, 1)
+		self.db("INSERT INTO b VALUES(?)", 1)
+		self.db("INSERT INTO a(y, x) VALUES(?, ?)", 2, 2)
+		self.db("INSERT INTO b VALUES(?)", 2)
+		self.db("INSERT INTO a(x, y) VALUES(?, ?)", 3, 3)
+		self.db.flush()
+		self.assertEqual(self.read("SELECT rowid, x, y FROM a"), [(1, 1, 1), (2, 2, 2), (3, 3, 3)])
+		self.assertEqual(self.read("SELECT rowid, z FROM b"), [(1, 1), (2, 2)])
+
+	def test_other_statements_see_inserts(self):
+		self.db("INSERT INTO a(x, y) VALUES(?, ?)", 1, 1)
+		self.db("UPDATE a SET y = ? WHERE x = ?", 5, 1)
+		self.assertEqual(self.db("SELECT x, y FROM a"), [(1, 5)])
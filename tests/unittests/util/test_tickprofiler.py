@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import csv
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from horizons.scheduler import Scheduler
+from horizons.util.python.callback import Callback
+from horizons.util.tickprofiler import TickProfiler
+
+
+class Example(object):
+	def method(self):
+		pass
+
+
+class TestTickProfiler(TestCase):
+
+	def setUp(self):
+		TickProfiler.create_instance(history=3)
+		self.profiler = TickProfiler()
+
+	def tearDown(self):
+		TickProfiler.destroy_instance()
+
+	def test_disabled_by_default(self):
+		TickProfiler.destroy_instance()
+		self.assertEqual(TickProfiler(), None)
+
+	def test_names(self):
+		obj = Example()
+		self.assertEqual(self.profiler.get_name(obj.method), 'Example.method')
+		self.assertEqual(self.profiler.get_name(Callback(obj.method)), 'Example.method')
+		self.assertEqual(self.profiler.get_name(os.path.join), 'posixpath.join')
+
+	def test_ticks(self):
+		self.profiler.add('message', 'Foo', 1.0)
+		self.profiler.add('message', 'Foo', 2.0)
+		self.profiler.add('pathfinding', 'dict', 0.5, work=10)
+		self.profiler.end_tick(1, 4.0)
+		self.profiler.end_tick(2, 1.0)
+		self.profiler.add('message', 'Foo', 1.0)
+		self.profiler.end_tick(3, 5.0)
+		self.profiler.end_tick(4, 0.0)
+
+		# only the last 3 ticks are kept, the totals include all of them
+		self.assertEqual([tick_id for tick_id, sections in self.profiler.ticks], [2, 3, 4])
+		self.assertEqual(self.profiler.ticks[1][1][('message', 'Foo')], [1, 1.0, 0, 1.0])
+		self.assertEqual(self.profiler.totals[('message', 'Foo')], [3, 4.0, 0, 4.0])
+		self.assertEqual(self.profiler.totals[('pathfinding', 'dict')], [1, 0.5, 10, 0.5])
+		self.assertEqual(self.profiler.get_slowest_ticks(2), [(3, 5.0), (2, 1.0)])
+
+	def test_scheduler_calls(self):
+		callback = Mock()
+		Scheduler.create_instance(Mock())
+		try:
+			Scheduler().add_new_object(Callback(callback), None, run_in=1)
+			Scheduler().tick(Scheduler.FIRST_TICK_ID)
+		finally:
+			Scheduler.destroy_instance()
+
+		callback.assert_called_once_with()
+		tick_id, sections = self.profiler.ticks[-1]
+		self.assertEqual(tick_id, Scheduler.FIRST_TICK_ID)
+		self.assertEqual(sections[('scheduler', 'Mock')][0], 1)
+		self.assertEqual(sections[('tick', 'tick')][0], 1)
+
+	def test_nested_sections(self):
+		clock = [0.0]
+		with patch('time.time', lambda: clock[0]):
+			def callback():
+				clock[0] += 1.0
+				self.profiler.begin_section()
+				clock[0] += 2.0
+				self.profiler.end_section('pathfinding', 'dict', 5)
+				self.profiler.begin_section()
+				clock[0] += 3.0
+				self.profiler.end_section('message', 'Foo')
+			self.profiler.call('scheduler', callback)
+			self.profiler.end_tick(1, 6.0)
+
+		sections = self.profiler.ticks[-1][1]
+		self.assertEqual(sections[('scheduler', self.profiler.get_name(callback))][1:], [6.0, 0, 1.0])
+		self.assertEqual(sections[('pathfinding', 'dict')][1:], [2.0, 5, 2.0])
+		self.assertEqual(sections[('message', 'Foo')][1:], [3.0, 0, 3.0])
+		self.assertEqual(self.profiler._open_sections, [])
+
+	def test_save(self):
+		self.profiler.add('message', 'Foo', 1.0)
+		self.profiler.end_tick(1, 1.0)
+		fd, path = tempfile.mkstemp(suffix='.csv')
+		os.close(fd)
+		try:
+			self.profiler.save(path)
+			with open(path, 'rb') as f:
+				rows = list(csv.reader(f))
+			self.assertEqual(tuple(rows[0]), TickProfiler.CSV_COLUMNS)
+			self.assertEqual(rows[1], ['1', 'message', 'Foo', '1', '1.0', '0', '1.0'])
+
+			path_json = path[:-4] + '.json'
+			self.profiler.save(path_json)
+			with open(path_json) as f:
+				data = json.load(f)
+			os.remove(path_json)
+			self.assertEqual(data['totals'][0]['name'], 'Foo')
+			self.assertEqual(data['ticks'][0]['tick'], 1)
+		finally:
+			os.remove(path)
@@ -0,0 +1,164 @@
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+import random
+
+from mock import Mock, patch
+
+from tests.unittests import TestCase
+
+from horizons.constants import GAME
+from horizons.util.shapes import Rect
+from horizons.world.buildability.binarycache import BinaryBuildabilityCache
+from horizons.world.buildability.bitsetcache import (BitGrid, BitsetBinaryBuildabilityCache, BitsetTerrainBuildabilityCache,
+                                                     CoordsBitset, create_binary_cache, create_terrain_cache)
+from horizons.world.buildability.settlementcache import SettlementBuildabilityCache
+from horizons.world.buildability.terraincache import TerrainBuildabilityCache, TerrainRequirement
+
+class MockTile(object):
+	def __init__(self, classes):
+		self.classes = classes
+
+class MockIsland(object):
+	def __init__(self, rng, width, height):
+		self.position = Rect.init_from_topleft_and_size(10, 20, width, height)
+		self.ground_map = {}
+		for (x, y) in self.position.tuple_iter():
+			value = rng.random()
+			if value < 0.8:
+				self.ground_map[(x, y)] = MockTile(['constructible'])
+			elif value < 0.9:
+				self.ground_map[(x, y)] = MockTile(['coastline'])
+
+class TestBitsetBuildabilityCache(TestCase):
+	"""The bit array representation has to give exactly the same results as the sets."""
+
+	def setUp(self):
+		super(TestBitsetBuildabilityCache, self).setUp()
+		self.rng = random.Random(1)
+		self.island = MockIsland(self.rng, 30, 25)
+
+	def test_bit_grid(self):
+		grid = BitGrid(self.island.position)
+		coords_list = sorted(self.island.ground_map)
+		self.assertEquals(coords_list, sorted(grid.get_coords(grid.get_bits(coords_list))))
+		self.assertEquals([], grid.get_coords(grid.get_bits([])))
+		self.assertEquals(None, grid.get_index((9, 20)))
+
+	def test_coords_bitset(self):
+		grid = BitGrid(self.island.position)
+		coords_list = sorted(self.island.ground_map)
+		sets = [frozenset(self.rng.sample(coords_list, 200)) for i in xrange(2)]
+		sets.append(frozenset(list(sets[0])[:50]))
+		bitsets = [CoordsBitset(grid, grid.get_bits(coords_set)) for coords_set in sets]
+
+		for a, bitset_a in zip(sets, bitsets):
+			for coords in coords_list + [(9, 20), (10, 19), (40, 20), (10, 45)]:
+				self.assertEquals(coords in a, coords in bitset_a)
+			self.assertEquals(bitset_a, a)
+			self.assertEquals(hash(bitset_a), hash(a))
+			for b, bitset_b in zip(sets, bitsets):
+				for other in (b, bitset_b):
+					self.assertEquals(a & b, bitset_a & other)
+					self.assertEquals(a | b, bitset_a | other)
+					self.assertEquals(a - b, bitset_a - other)
+					self.assertEquals(a ^ b, bitset_a ^ other)
+					self.assertEquals(a.symmetric_difference(b), bitset_a.symmetric_difference(other))
+					self.assertEquals(a.issubset(b), bitset_a.issubset(other))
+					self.assertEquals(a.issuperset(b), bitset_a.issuperset(other))
+					self.assertEquals(a.isdisjoint(b), bitset_a.isdisjoint(other))
+					self.assertEquals(a <= b, bitset_a <= other)
+					self.assertEquals(a < b, bitset_a < other)
+					self.assertEquals(a >= b, bitset_a >= other)
+					self.assertEquals(a > b, bitset_a > other)
+				self.assertEquals(a & b, a & bitset_b)
+				self.assertEquals(a | b, a | bitset_b)
+				self.assertEquals(a - b, a - bitset_b)
+				self.assertEquals(a ^ b, a ^ bitset_b)
+
+		self.assertEquals(1, len(set([bitsets[0], CoordsBitset(grid, bitsets[0].bits), sets[0]])))
+		self.assertRaises(TypeError, lambda: bitsets[0] & list(sets[1]))
+
+	def test_terrain_cache(self):
+		expected = TerrainBuildabilityCache(self.island)
+		terrain_cache = BitsetTerrainBuildabilityCache(self.island)
+		self.assertEquals(sorted(expected.cache), sorted(terrain_cache.cache))
+		for terrain_type, layers in expected.cache.iteritems():
+			self.assertEquals(sorted(layers), sorted(terrain_cache.cache[terrain_type]))
+			for size, layer in layers.iteritems():
+				self.assertEquals(layer, set(terrain_cache.cache[terrain_type][size]))
+
+	def test_binary_cache(self):
+		expected = BinaryBuildabilityCache(TerrainBuildabilityCache(self.island))
+		terrain_cache = BitsetTerrainBuildabilityCache(self.island)
+		binary_cache = BitsetBinaryBuildabilityCache(terrain_cache)
+		land_or_coast = sorted(terrain_cache.land_or_coast)
+		area = set()
+		for i in xrange(50):
+			if self.rng.random() < 0.6:
+				coords_list = list(set(self.rng.sample(land_or_coast, 30)) - area)
+				expected.add_area(coords_list)
+				binary_cache.add_area(coords_list)
+				area.update(coords_list)
+			else:
+				coords_list = self.rng.sample(sorted(area), min(20, len(area)))
+				expected.remove_area(coords_list)
+				binary_cache.remove_area(coords_list)
+				area.difference_update(coords_list)
+
+			for size, layer in expected.cache.iteritems():
+				self.assertEquals(set(layer), set(binary_cache.cache[size]))
+				coords = self.rng.choice(land_or_coast)
+				self.assertEquals(coords in layer, coords in binary_cache.cache[size])
+
+			intersection = terrain_cache.get_buildability_intersection(TerrainRequirement.LAND, (3, 3), binary_cache)
+			self.assertEquals(expected.cache[(3, 3)].intersection(terrain_cache.cache[TerrainRequirement.LAND][(3, 3)]), set(intersection))
+
+	def test_switch(self):
+		with patch.object(GAME, 'BITSET_BUILDABILITY_CACHES', False):
+			terrain_cache = create_terrain_cache(self.island)
+			self.assertEquals(TerrainBuildabilityCache, type(terrain_cache))
+			self.assertEquals(BinaryBuildabilityCache, type(create_binary_cache(terrain_cache)))
+		with patch.object(GAME, 'BITSET_BUILDABILITY_CACHES', True):
+			terrain_cache = create_terrain_cache(self.island)
+			self.assertEquals(BitsetTerrainBuildabilityCache, type(terrain_cache))
+			self.assertEquals(BitsetBinaryBuildabilityCache, type(create_binary_cache(terrain_cache)))
+
+	def test_settlement_cache(self):
+		land_or_coast = sorted(TerrainBuildabilityCache(self.island).land_or_coast)
+		settlement_ground_map = {}
+		for coords in self.rng.sample(land_or_coast, 300):
+			settlement_ground_map[coords] = Mock(object=None)
+
+		caches = []
+		for terrain_cache in (TerrainBuildabilityCache(self.island), BitsetTerrainBuildabilityCache(self.island)):
+			cache = SettlementBuildabilityCache(terrain_cache, settlement_ground_map)
+			cache.modify_area(settlement_ground_map.keys())
+			caches.append(cache)
+
+		blocked = self.rng.sample(sorted(settlement_ground_map), 40)
+		for coords in blocked:
+			settlement_ground_map[coords].object = Mock(buildable_upon=False)
+		for cache in caches:
+			cache.modify_area(blocked)
+		for size, layer in caches[0].cache.iteritems():
+			self.assertEquals(set(layer), set(caches[1].cache[size]))
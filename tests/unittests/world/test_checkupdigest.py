@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+from unittest import TestCase
+
+from horizons.util.shapes import Point
+from horizons.world.checkupdigest import CheckupDigest, get_weight, MASK
+from horizons.world.storage import PositiveSizedSlotStorage
+
+
+class Dummy(object):
+	def __init__(self, worldid, **kwargs):
+		self.worldid = worldid
+		self.__dict__.update(kwargs)
+
+
+class TestCheckupDigest(TestCase):
+
+	def setUp(self):
+		self.digest = CheckupDigest()
+
+	def get_inventory_value(self, key, storage):
+		return sum(get_weight((key, res)) * amount for res, amount in storage.itercontents()) & MASK
+
+	def test_storage(self):
+		storage = PositiveSizedSlotStorage(30)
+		storage.alter(1, 10)
+		storage.set_checkup_digest(self.digest, 5)
+		self.assertEqual(self.get_inventory_value(5, storage), self.digest.get_values()[CheckupDigest.INVENTORIES])
+
+		storage.alter(2, 40)
+		storage.alter(1, -15)
+		storage.alter(3, 7)
+		storage.adjust_limit(-25)
+		storage.reset(2)
+		storage.alter(4, 2)
+		self.assertEqual(self.get_inventory_value(5, storage), self.digest.get_values()[CheckupDigest.INVENTORIES])
+
+		storage.reset_all()
+		self.assertEqual(0, self.digest.get_values()[CheckupDigest.INVENTORIES])
+
+	def test_buildings(self):
+		settlement = Dummy(1)
+		building1 = Dummy(2, inhabitants=3, running_costs=10, last_tax_payed=0)
+		building2 = Dummy(3, inhabitants=0, running_costs=5)
+		self.digest.add_building(settlement, building1)
+		self.digest.add_building(settlement, building2)
+		value = self.digest.get_values()[CheckupDigest.SETTLEMENTS]
+
+		building1.inhabitants += 1
+		building1.last_tax_payed = 20
+		self.digest.update_building(building1)
+		self.assertNotEqual(value, self.digest.get_values()[CheckupDigest.SETTLEMENTS])
+
+		# the same state in a different order must give the same digest
+		other = CheckupDigest()
+		other.add_building(settlement, building2)
+		other.add_building(settlement, building1)
+		self.assertEqual(other.get_values(), self.digest.get_values())
+
+		self.digest.remove_building(building1)
+		self.digest.remove_building(building2)
+		self.assertEqual(0, self.digest.get_values()[CheckupDigest.SETTLEMENTS])
+
+		# buildings outside of settlements are ignored
+		self.digest.update_building(building1)
+		self.assertEqual(0, self.digest.get_values()[CheckupDigest.SETTLEMENTS])
+
+	def test_ships(self):
+		ship = Dummy(1, position=Point(3, 4))
+		self.digest.add_ship(ship)
+		value = self.digest.get_values()[CheckupDigest.SHIPS]
+
+		old_position = ship.position
+		ship.position = Point(4, 4)
+		self.digest.move_ship(ship, old_position)
+		self.assertNotEqual(value, self.digest.get_values()[CheckupDigest.SHIPS])
+
+		ship.position = old_position
+		self.digest.move_ship(ship, Point(4, 4))
+		self.assertEqual(value, self.digest.get_values()[CheckupDigest.SHIPS])
+
+		self.digest.remove_ship(ship)
+		self.assertEqual(0, self.digest.get_values()[CheckupDigest.SHIPS])
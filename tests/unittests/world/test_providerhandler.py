@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+import random
+from unittest import TestCase
+
+from horizons.util.shapes import Rect, RadiusRect
+from horizons.world.providerhandler import ProviderHandler
+
+
+class Provider(object):
+	def __init__(self, worldid, position, provided_resources, owner):
+		self.worldid = worldid
+		self.position = position
+		self.provided_resources = provided_resources
+		self.owner = owner
+
+
+class TestProviderHandler(TestCase):
+
+	def setUp(self):
+		self.handler = ProviderHandler()
+		self.rng = random.Random(42)
+		self.providers = []
+		for worldid in xrange(1, 300):
+			self.add_provider(worldid)
+
+	def add_provider(self, worldid):
+		size = self.rng.randint(1, 4)
+		position = Rect.init_from_topleft_and_size(self.rng.randint(-5, 80), self.rng.randint(-5, 80), size, size)
+		resources = self.rng.sample([1, 2, 3, 4], self.rng.randint(0, 2))
+		provider = Provider(worldid, position, resources, self.rng.choice(['a', 'b']))
+		# insert in random order, the result must not depend on it
+		self.providers.insert(self.rng.randint(0, len(self.providers)), provider)
+		self.handler.append(provider)
+
+	def expected(self, radiusrect, resources, player):
+		return sorted((provider for provider in self.providers
+		               if (None in resources or set(resources) & set(provider.provided_resources)) and
+		                  (player is None or provider.owner == player) and
+		                  provider.position.distance(radiusrect.center) <= radiusrect.radius),
+		              key=lambda provider: provider.worldid)
+
+	def check_queries(self):
+		for i in xrange(100):
+			radiusrect = RadiusRect(Rect.init_from_topleft_and_size(self.rng.randint(-10, 90), self.rng.randint(-10, 90), 3, 3),
+			                        self.rng.randint(0, 30))
+			resources = self.rng.choice([(None, ), (1, ), (2, 3), (1, 2, 3, 4), (5, )])
+			player = self.rng.choice([None, 'a'])
+			self.assertEqual(self.handler.get_providers_in_range(radiusrect, resources, player),
+			                 self.expected(radiusrect, resources, player))
+
+	def test_get_providers_in_range(self):
+		self.check_queries()
+
+	def test_remove(self):
+		for provider in self.rng.sample(self.providers, 150):
+			self.providers.remove(provider)
+			self.handler.remove(provider)
+		self.check_queries()
+		for provider in list(self.providers):
+			self.handler.remove(provider)
+		self.assertEqual(self.handler.get_providers_in_range(RadiusRect(Rect.init_from_topleft_and_size(0, 0, 1, 1), 100)), [])
+
+	def test_get_changes(self):
+		for i in xrange(100):
+			radiusrect = RadiusRect(Rect.init_from_topleft_and_size(self.rng.randint(-10, 90), self.rng.randint(-10, 90), 3, 3),
+			                        self.rng.randint(0, 30))
+			resources = self.rng.choice([(1, ), (2, 3), (1, 2, 3, 4)])
+			provider = self.rng.choice(self.providers)
+			before = self.handler.get_changes(radiusrect, resources)
+			self.handler.provider_changed(provider)
+			# a change of a provider in range has to be noticed
+			if self.expected(radiusrect, resources, None).count(provider):
+				self.assertNotEqual(self.handler.get_changes(radiusrect, resources), before)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+# ###################################################
+# Copyright (C) 2012 The Unknown Horizons Team
+# team@unknown-horizons.org
+# This file is part of Unknown Horizons.
+#
+# Unknown Horizons is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the
+# Free Software Foundation, Inc.,
+# 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# ###################################################
+
+
+import random
+from unittest import TestCase
+
+from horizons.util.shapes import Circle, Point
+from horizons.world.unitgrid import UnitGrid
+
+
+class Unit(object):
+	def __init__(self, worldid, position):
+		self.worldid = worldid
+		self.position = position
+
+
+class TestUnitGrid(TestCase):
+
+	def setUp(self):
+		self.grid = UnitGrid()
+		self.rng = random.Random(42)
+		self.units = []
+		for worldid in xrange(1, 200):
+			unit = Unit(worldid, self.random_point())
+			# insert in random order, the result must not depend on it
+			self.units.insert(self.rng.randint(0, len(self.units)), unit)
+			self.grid.add(unit)
+
+	def random_point(self):
+		return Point(self.rng.randint(-10, 100), self.rng.randint(-10, 100))
+
+	def check_queries(self):
+		for i in xrange(100):
+			circle = Circle(self.random_point(), self.rng.choice([0, 1, 3, 7.5, 12, 40, 200]))
+			expected = sorted((unit for unit in self.units if circle.contains(unit.position)),
+			                  key=lambda unit: unit.worldid)
+			self.assertEqual(expected, self.grid.get_units_in_circle(circle))
+
+	def test_queries(self):
+		self.check_queries()
+
+	def test_move(self):
+		for unit in self.units:
+			unit.position = Point(unit.position.x + self.rng.randint(-10, 10), unit.position.y + self.rng.randint(-10, 10))
+			self.grid.update(unit)
+		self.check_queries()
+
+	def test_remove(self):
+		for unit in self.units[::2]:
+			self.grid.remove(unit)
+			self.assertFalse(unit in self.grid)
+		self.units = self.units[1::2]
+		self.assertEqual(len(self.units), len(self.grid))
+		self.check_queries()